@@ -58,8 +58,15 @@ def create_app(config_class=Config):
     def health_check():
         return {'status': 'healthy', 'message': 'MovieHub Backend is running!'}
 
+    # Preloaded by the gunicorn master (gunicorn.conf.py): load synchronously before
+    # workers fork so they all share one model instead of each training their own
+    if os.getenv('ML_EAGER_INIT', '0') == '1' and os.getenv('ML_PRELOAD', '0') == '1':
+        print("🤖 Loading ML Recommendation System before forking workers...")
+        from app.services.recommendation_service import RecommendationService
+        RecommendationService()._initialize_system(defer_full_load=True)
+
     # Initialize ML system on startup in background thread if eager init is enabled
-    if os.getenv('ML_EAGER_INIT', '0') == '1':
+    elif os.getenv('ML_EAGER_INIT', '0') == '1':
         import threading
         
         def init_ml_system():
@@ -84,7 +91,11 @@ def create_app(config_class=Config):
         ml_thread = threading.Thread(target=init_ml_system, daemon=True)
         ml_thread.start()
         print("🚀 ML system initializing in background...")
-        print("📍 Server will be ready immediately, ML will be available in ~5-10 minutes\n")
+        from ml_engine.artifact import find_artifacts
+        if find_artifacts(os.getenv('MODEL_PATH', 'models/')):
+            print("📍 Server will be ready immediately, ML will be available in a few seconds (saved model found)\n")
+        else:
+            print("📍 Server will be ready immediately, ML will be available in ~5-10 minutes\n")
 
     return app
 
@@ -1,4 +1,6 @@
+from flask_login import current_user, login_required
 from flask_restful import Resource, Api
+from app.models.favorite import Favorite
 from app.services.recommendation_service import RecommendationService
 
 
@@ -23,6 +25,66 @@ class SimilarMoviesResource(Resource):
         return result, 200 if result['success'] else 400
 
 
+class BatchSimilarMoviesResource(Resource):
+    """Resource for getting similar movies for several movies at once"""
+
+    # Seeds accepted per request
+    MAX_MOVIES = 50
+    # Recommendations per seed
+    MAX_LIMIT = 50
+
+    def __init__(self):
+        self.recommendation_service = RecommendationService()
+
+    def post(self):
+        """POST /api/ml/recommendations/similar/batch - Similar movies for a list of ids or titles"""
+        from flask import request
+
+        data = request.get_json(silent=True) or {}
+        movie_ids = data.get('movie_ids') or data.get('titles')
+        limit = data.get('limit', 10)
+
+        if not isinstance(movie_ids, list) or not movie_ids:
+            return {'error': 'movie_ids or titles list is required'}, 400
+        if len(movie_ids) > self.MAX_MOVIES:
+            return {'error': f'At most {self.MAX_MOVIES} movies per request'}, 400
+        # bool is an int subclass: reject true/false explicitly
+        if isinstance(limit, bool) or not isinstance(limit, int) or not 1 <= limit <= self.MAX_LIMIT:
+            return {'error': f'limit must be an integer between 1 and {self.MAX_LIMIT}'}, 400
+
+        result = self.recommendation_service.get_similar_movies_batch(
+            [str(movie_id) for movie_id in movie_ids], limit=limit)
+        return result, 200 if result['success'] else 400
+
+
+class UserRecommendationsResource(Resource):
+    """Resource for recommendations from the current user's favourites"""
+
+    method_decorators = [login_required]
+
+    # Recommendations per request
+    MAX_LIMIT = 50
+
+    def __init__(self):
+        self.recommendation_service = RecommendationService()
+
+    def get(self):
+        """GET /api/ml/recommendations/user - Recommendations for the logged-in user's favourites"""
+        from flask import request
+
+        limit = request.args.get('limit', 10, type=int)
+        if not 1 <= limit <= self.MAX_LIMIT:
+            return {'error': f'limit must be an integer between 1 and {self.MAX_LIMIT}'}, 400
+
+        favorites = Favorite.get_user_favorites(current_user.id)
+        if not favorites:
+            return {'error': 'No favourites to build recommendations from'}, 400
+
+        result = self.recommendation_service.get_user_recommendations(
+            current_user.id, favorites, limit=limit)
+        return result, 200 if result['success'] else 400
+
+
 class MovieRecommendationsResource(Resource):
     """Resource for getting movie recommendations by title"""
 
@@ -59,11 +121,9 @@ class SearchMoviesResource(Resource):
         try:
             # Use the ML system to search movies
             if self.recommendation_service.system_initialized and self.recommendation_service.recommendation_system:
-                all_titles = self.recommendation_service.recommendation_system.movies_data['title'].tolist(
-                )
-                import difflib
-                matches = difflib.get_close_matches(
-                    query, all_titles, n=limit, cutoff=0.3)
+                # Shared title index owned by the trained model
+                matches = self.recommendation_service.recommendation_system.search_titles(
+                    query, limit=limit, cutoff=0.3)
 
                 return {
                     'success': True,
@@ -93,6 +153,8 @@ class ModelStatusResource(Resource):
 def init_app(api):
     """Initialize recommendation API resources"""
     api.add_resource(SimilarMoviesResource, '/ml/recommendations/similar')
+    api.add_resource(BatchSimilarMoviesResource, '/ml/recommendations/similar/batch')
+    api.add_resource(UserRecommendationsResource, '/ml/recommendations/user')
     api.add_resource(MovieRecommendationsResource,
                      '/ml/recommendations/movie/<movie_title>')
     api.add_resource(SearchMoviesResource, '/ml/search')
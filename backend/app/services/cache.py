@@ -0,0 +1,366 @@
+"""
+Result caches for the services (in-process LRU by default, Redis when configured)
+and request coalescing
+"""
+import json
+import os
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Dict, Hashable, Optional
+
+
+def estimate_size(value: Any) -> int:
+    """Approximate size of a JSON-like value in bytes (its serialized length)"""
+    return len(json.dumps(value, default=str, separators=(',', ':')).encode('utf-8'))
+
+
+class LRUCache:
+    """
+    Thread-safe LRU cache with TTL expiry and size accounting
+
+    Entries are evicted least recently used first once either max_entries or
+    max_bytes is exceeded, and expire ttl_seconds after they were stored.
+    """
+
+    # Entries are private to this process
+    shared = False
+
+    def __init__(self, max_entries: int = 10000, max_bytes: int = 64 << 20,
+                 ttl_seconds: float = 900, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._entries = OrderedDict()  # key -> (value, size, expires_at)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Cached value, or None when missing or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry[2] <= self._clock():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def peek(self, key: Hashable) -> Optional[Any]:
+        """Like get(), without touching the counters or the LRU order"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[2] <= self._clock():
+                return None
+            return entry[0]
+
+    def set(self, key: Hashable, value: Any, size: Optional[int] = None):
+        """
+        Store a value (replacing any entry under `key`)
+
+        Args:
+            key: Hashable key
+            value: Value to cache; not copied, so callers must not mutate it
+            size: Size in bytes (default: estimate_size(value))
+        """
+        size = estimate_size(value) if size is None else size
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            if size > self.max_bytes:
+                return
+            now = self._clock()
+            self._entries[key] = (value, size, now + self.ttl_seconds)
+            self._bytes += size
+            self._evict(now)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def discard(self, predicate):
+        """Remove every entry whose key matches `predicate`; returns how many"""
+        with self._lock:
+            keys = [key for key in self._entries if predicate(key)]
+            for key in keys:
+                self._remove(key)
+            return len(keys)
+
+    def keys(self):
+        """Snapshot of the keys, most recently used first"""
+        with self._lock:
+            return list(reversed(self._entries))
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def nbytes(self) -> int:
+        return self._bytes
+
+    def stats(self) -> Dict:
+        """Counters for status endpoints"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'backend': 'memory',
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'ttl_seconds': self.ttl_seconds,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+            }
+
+    def _remove(self, key):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def _evict(self, now):
+        # Expired entries at the LRU end go first (not counted as evictions)
+        while self._entries:
+            key, (_, _, expires_at) = next(iter(self._entries.items()))
+            if expires_at > now:
+                break
+            self._remove(key)
+            self.expirations += 1
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            key = next(iter(self._entries))
+            self._remove(key)
+            self.evictions += 1
+
+
+# Values at least this long (serialized) are zlib-compressed in Redis
+COMPRESS_MIN_BYTES = 512
+
+
+def encode_value(value: Any) -> bytes:
+    """Compact JSON, zlib-compressed when large; the first byte says which"""
+    raw = json.dumps(value, separators=(',', ':')).encode('utf-8')
+    if len(raw) >= COMPRESS_MIN_BYTES:
+        return b'z' + zlib.compress(raw, 1)
+    return b'j' + raw
+
+
+def decode_value(data: bytes) -> Any:
+    raw = zlib.decompress(data[1:]) if data[:1] == b'z' else data[1:]
+    return json.loads(raw)
+
+
+class RedisCache:
+    """
+    Cache shared by every worker and replica through Redis
+
+    Same interface as LRUCache. Values must be JSON-serializable; Redis handles
+    expiry (SET EX) and eviction (its maxmemory policy). Redis errors are
+    treated as misses so requests fall back to computing results.
+    """
+
+    # Entries are visible to other processes
+    shared = True
+
+    def __init__(self, client, prefix: str, ttl_seconds: float = 900,
+                 max_recent: int = 10000):
+        """
+        Args:
+            client: redis.Redis (or a compatible client providing get/set/delete)
+            prefix: Key prefix separating this cache from others in the database
+            ttl_seconds: Entry lifetime
+            max_recent: Keys remembered locally for keys() (e.g. cache pre-warming)
+        """
+        self.client = client
+        self.prefix = prefix
+        self.ttl_seconds = ttl_seconds
+        self.max_recent = max_recent
+        self._recent = OrderedDict()  # keys this process used, least recent first
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self.bytes_written = 0
+
+    def _redis_key(self, key: Hashable) -> str:
+        parts = key if isinstance(key, tuple) else (key,)
+        return ':'.join([self.prefix] + [str(part) for part in parts])
+
+    def _touch(self, key):
+        with self._lock:
+            self._recent[key] = None
+            self._recent.move_to_end(key)
+            while len(self._recent) > self.max_recent:
+                self._recent.popitem(last=False)
+
+    def _error(self, action, error):
+        with self._lock:
+            self.errors += 1
+            first = self.errors == 1
+        if first:
+            print(f"⚠️ Redis cache {action} failed, serving uncached: {error}")
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        value = self.peek(key)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        if value is not None:
+            self._touch(key)
+        return value
+
+    def peek(self, key: Hashable) -> Optional[Any]:
+        try:
+            data = self.client.get(self._redis_key(key))
+            return decode_value(data) if data is not None else None
+        except Exception as e:
+            self._error('read', e)
+            return None
+
+    def set(self, key: Hashable, value: Any, size: Optional[int] = None):
+        try:
+            data = encode_value(value)
+            self.client.set(self._redis_key(key), data, ex=max(1, int(self.ttl_seconds)))
+        except Exception as e:
+            self._error('write', e)
+            return
+        with self._lock:
+            self.bytes_written += len(data)
+        self._touch(key)
+
+    def discard(self, predicate):
+        """
+        Forget matching keys locally
+
+        Entries stay in Redis (other replicas may still be serving that model)
+        and expire on their TTL.
+        """
+        with self._lock:
+            keys = [key for key in self._recent if predicate(key)]
+            for key in keys:
+                del self._recent[key]
+        return 0
+
+    def keys(self):
+        """Keys this process used, most recently used first"""
+        with self._lock:
+            return list(reversed(self._recent))
+
+    def clear(self):
+        """Delete the entries this process knows about"""
+        keys = self.keys()
+        if keys:
+            try:
+                self.client.delete(*[self._redis_key(key) for key in keys])
+            except Exception as e:
+                self._error('delete', e)
+        with self._lock:
+            self._recent.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'backend': 'redis',
+                'ttl_seconds': self.ttl_seconds,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'errors': self.errors,
+                'bytes_written': self.bytes_written,
+            }
+
+
+def create_cache(prefix: str, max_entries: int = 10000, max_bytes: int = 64 << 20,
+                 ttl_seconds: float = 900):
+    """
+    Cache backend selected by CACHE_TYPE (Flask-Caching naming)
+
+    'simple' (default) keeps entries in this process; 'redis' shares them through
+    the server at CACHE_REDIS_URL. Falls back to the in-process cache when the
+    redis package is missing.
+
+    Args:
+        prefix: Redis key prefix, e.g. 'moviehub:recommendations'
+        max_entries: In-process entry limit
+        max_bytes: In-process size limit
+        ttl_seconds: Entry lifetime
+    """
+    cache_type = os.environ.get('CACHE_TYPE', 'simple').lower()
+    if cache_type in ('redis', 'rediscache'):
+        url = os.environ.get('CACHE_REDIS_URL', 'redis://localhost:6379/0')
+        try:
+            import redis
+            return RedisCache(redis.Redis.from_url(url), prefix, ttl_seconds, max_entries)
+        except ImportError:
+            print("⚠️ CACHE_TYPE=redis but the redis package is not installed, using in-process cache")
+    return LRUCache(max_entries, max_bytes, ttl_seconds)
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key
+
+    The first caller (the leader) runs the work; callers arriving while it is in
+    flight wait for and share its result or exception. Nothing is kept once the
+    call completes, so this complements a cache rather than replacing it.
+    """
+
+    def __init__(self):
+        self._calls = {}  # key -> Future of the call in flight
+        self._lock = threading.Lock()
+        self.coalesced = 0
+
+    def begin(self, key: Hashable):
+        """
+        Join or start the call for `key`
+
+        Returns:
+            (future, leader): the leader must call finish(key, ...) exactly once
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                self.coalesced += 1
+                return future, False
+            future = Future()
+            self._calls[key] = future
+            return future, True
+
+    def finish(self, key: Hashable, result: Any = None, error: Optional[BaseException] = None):
+        """Publish the leader's result (or error) to every waiting caller"""
+        with self._lock:
+            future = self._calls.pop(key)
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def do(self, key: Hashable, func):
+        """Result of func(), shared with concurrent callers using the same key"""
+        future, leader = self.begin(key)
+        if not leader:
+            return future.result()
+        try:
+            result = func()
+        except BaseException as e:
+            self.finish(key, error=e)
+            raise
+        self.finish(key, result)
+        return result
@@ -1,13 +1,32 @@
 import requests
 import os
+import threading
 from typing import Dict, List, Optional
 
+from app.services.cache import create_cache
+
 class MovieService:
     """Service class for handling movie-related operations"""
+
+    # OMDB responses, shared by the per-request instances (see _get_cache)
+    _cache = None
+    _cache_lock = threading.Lock()
     
     def __init__(self):
         self.api_key = os.environ.get('OMDB_API_KEY', '18e217aa')
         self.base_url = 'http://www.omdbapi.com/'
+
+    @classmethod
+    def _get_cache(cls):
+        """Cache of successful OMDB responses, created on first use"""
+        with cls._cache_lock:
+            if cls._cache is None:
+                cls._cache = create_cache(
+                    'moviehub:omdb:v1',
+                    max_entries=int(os.environ.get('OMDB_CACHE_MAX_ENTRIES', '5000')),
+                    max_bytes=int(float(os.environ.get('OMDB_CACHE_MAX_MB', '16')) * (1 << 20)),
+                    ttl_seconds=int(os.environ.get('OMDB_CACHE_TTL', '3600')))
+            return cls._cache
     
     def search_movies(self, query: str, page: int = 1) -> Dict:
         """
@@ -20,6 +39,11 @@ class MovieService:
         Returns:
             Dict: Search results with movies and metadata
         """
+        cache_key = ('search', query.strip().lower(), page)
+        cached = self._get_cache().get(cache_key)
+        if cached:
+            return cached
+
         try:
             params = {
                 'apikey': self.api_key,
@@ -34,13 +58,15 @@ class MovieService:
             data = response.json()
             
             if data.get('Response') == 'True':
-                return {
+                result = {
                     'success': True,
                     'movies': data.get('Search', []),
                     'total_results': int(data.get('totalResults', 0)),
                     'page': page,
                     'total_pages': (int(data.get('totalResults', 0)) + 9) // 10
                 }
+                self._get_cache().set(cache_key, result)
+                return result
             else:
                 return {
                     'success': False,
@@ -80,6 +106,11 @@ class MovieService:
         Returns:
             Dict: Movie details
         """
+        cache_key = ('details', imdb_id)
+        cached = self._get_cache().get(cache_key)
+        if cached:
+            return cached
+
         try:
             params = {
                 'apikey': self.api_key,
@@ -93,10 +124,12 @@ class MovieService:
             data = response.json()
             
             if data.get('Response') == 'True':
-                return {
+                result = {
                     'success': True,
                     'movie': data
                 }
+                self._get_cache().set(cache_key, result)
+                return result
             else:
                 return {
                     'success': False,
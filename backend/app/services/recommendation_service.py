@@ -1,11 +1,18 @@
 # Defer importing the ML system until initialization to avoid path issues at import time
 import sys
 import json
+import hashlib
+import itertools
 import os
+import shutil
+from datetime import datetime, timezone
 from typing import Dict, List, Optional
 import time
+import numpy as np
 # The ML engine is in the root directory in Docker
 from ml_engine.movie_recommendation_optimized import MovieRecommendationSystem as _MRS
+from ml_engine.artifact import artifact_name, dataset_fingerprint, find_artifacts
+from app.services.cache import SingleFlight, create_cache
 MovieRecommendationSystem = _MRS
 
 
@@ -15,6 +22,8 @@ class RecommendationService:
     """Service class for handling ML-based movie recommendations (Singleton)"""
     _instance = None
     _lock = threading.Lock()
+    # Every model swapped in gets the next id; cache keys start with it
+    _generations = itertools.count(1)
 
     def __new__(cls):
         with cls._lock:
@@ -24,20 +33,88 @@ class RecommendationService:
                 cls._instance.model_path = os.environ.get('MODEL_PATH', 'models/')
                 cls._instance.data_path = os.environ.get('DATA_PATH', 'data/')
                 cls._instance.model_loaded = False
-                cls._instance.recommendation_system = None
                 cls._instance.system_initialized = False
+                # 'artifact' when booted from a saved model, 'csv' when trained at startup
+                cls._instance.model_source = None
+                cls._instance.artifact_path = None
                 cls._instance._is_initializing = False
-                cls._instance._similar_cache = {}
-                cls._instance._cache_ttl_seconds = int(os.environ.get('ML_CACHE_TTL', '900'))
+                # Similar-movie and profile results, keyed on resolved catalog rows
+                cls._instance._cache = create_cache(
+                    'moviehub:recommendations:v1',
+                    max_entries=int(os.environ.get('ML_CACHE_MAX_ENTRIES', '10000')),
+                    max_bytes=int(float(os.environ.get('ML_CACHE_MAX_MB', '64')) * (1 << 20)),
+                    ttl_seconds=int(os.environ.get('ML_CACHE_TTL', '900')))
+                # Candidates are computed (and cached) for at least this many results;
+                # every limit up to it is re-ranked from them
+                cls._instance._cache_top_k = int(os.environ.get('ML_CACHE_TOP_K', '30'))
+                # Concurrent identical resolutions and computations run once
+                cls._instance._flights = SingleFlight()
+                # (model, cache namespace) read together by requests so both always match
+                cls._instance._serving = (None, 0)
+                cls._instance._generation = 0
+                # Lists probed per ANN query (None: the index default, 0: exact search)
+                nprobe = os.environ.get('ML_ANN_NPROBE')
+                cls._instance._ann_nprobe = int(nprobe) if nprobe else None
+                # Favourites lose half their weight in a profile every this many days
+                cls._instance._profile_half_life_days = float(
+                    os.environ.get('ML_PROFILE_HALF_LIFE_DAYS', '90'))
         return cls._instance
 
     def __init__(self):
         # State is already initialized in __new__
         pass
 
+    @property
+    def recommendation_system(self):
+        return self._serving[0]
 
-    def _initialize_system(self):
-        """Initialize the ML recommendation system with tiered loading"""
+    @recommendation_system.setter
+    def recommendation_system(self, system):
+        self._serve(system)
+
+    @property
+    def model_generation(self) -> int:
+        return self._generation
+
+    def _namespace(self, system, generation: int):
+        """
+        First element of the cache keys of a model
+
+        The generation for an in-process cache; for a shared cache, the model's
+        build identity, so every worker and replica serving that build shares entries.
+        """
+        if self._cache.shared and system is not None and system.is_trained:
+            return artifact_name(system.build_config())
+        return generation
+
+    def _serve(self, system, generation: Optional[int] = None):
+        """
+        Swap in a model under a new cache namespace
+
+        Requests that started on the previous model finish on it and cache under
+        its namespace, which this process never reads again.
+
+        Args:
+            system: Model to serve
+            generation: Id allocated in advance (e.g. for pre-warmed entries)
+        """
+        generation = generation or next(self._generations)
+        namespace = self._namespace(system, generation)
+        self._serving = (system, namespace)
+        self._generation = generation
+        dropped = self._cache.discard(lambda key: key[0] != namespace)
+        if dropped:
+            print(f"🧹 Dropped {dropped:,} cached results of the previous model")
+
+
+    def _initialize_system(self, defer_full_load=False):
+        """
+        Initialize the ML recommendation system with tiered loading
+
+        Args:
+            defer_full_load: Leave Phase 2 to an explicit start_full_dataset_loading() call
+                (used when preloading in the gunicorn master, where threads do not survive fork)
+        """
         if self.system_initialized or self._is_initializing:
             return
             
@@ -54,7 +131,15 @@ class RecommendationService:
             if MovieRecommendationSystem is None:
                 from ml_engine.movie_recommendation_optimized import MovieRecommendationSystem as _MRS
                 MovieRecommendationSystem = _MRS
-            
+
+            quick_start_limit = int(os.environ.get('ML_QUICK_START_LIMIT', '100000'))
+
+            # Prebuilt model for this dataset: memory-mapped in seconds, no training
+            if self.load_model():
+                if not defer_full_load:
+                    self.start_full_dataset_loading()
+                return
+
             # PHASE 1: Quick Start - Load 100K most popular movies
             print("\n📊 PHASE 1: Quick Start (100K most popular movies)")
             print("=" * 60)
@@ -63,19 +148,20 @@ class RecommendationService:
                 use_large_dataset=use_large)
 
             # Load 100K movies for quick start
-            quick_start_limit = int(os.environ.get('ML_QUICK_START_LIMIT', '100000'))
-            
             if self.recommendation_system.load_data(limit=quick_start_limit):
-                if self.recommendation_system.train_model(sample_size=None):
+                if self.recommendation_system.train_model(sample_size=None, **self._training_options()):
+                    # Serve again now that the trained model's build identity is known
+                    self._serve(self.recommendation_system)
                     self.model_loaded = True
                     self.system_initialized = True
-                    print(f"✅ PHASE 1 Complete! Quick recommendations ready ({len(self.recommendation_system.movies_data):,} movies)")
+                    self.model_source = 'csv'
+                    print(f"✅ PHASE 1 Complete! Quick recommendations ready ({self.recommendation_system.num_movies:,} movies)")
                     print("=" * 60)
-                    
+                    self._save_artifact(self.recommendation_system)
+
                     # PHASE 2: Background loading of full dataset
-                    full_limit = int(os.environ.get('ML_LOAD_LIMIT', '1500000'))
-                    if full_limit > quick_start_limit:
-                        self._start_full_dataset_loading(full_limit)
+                    if not defer_full_load:
+                        self.start_full_dataset_loading()
                 else:
                     print("❌ Failed to train quick-start model")
             else:
@@ -88,7 +174,61 @@ class RecommendationService:
         finally:
             self._is_initializing = False
     
-    def _start_full_dataset_loading(self, full_limit):
+    def start_full_dataset_loading(self, on_complete=None):
+        """
+        Start Phase 2 unless the current model already covers ML_LOAD_LIMIT
+
+        Args:
+            on_complete: Called with the new system after it has been swapped in
+
+        Returns:
+            threading.Thread running Phase 2, or None if nothing to load
+        """
+        full_limit = self.pending_full_limit()
+        if full_limit is None:
+            return None
+        return self._start_full_dataset_loading(full_limit, on_complete)
+
+    def pending_full_limit(self) -> Optional[int]:
+        """ML_LOAD_LIMIT when the current model does not cover it yet (Phase 2 pending), else None"""
+        full_limit = int(os.environ.get('ML_LOAD_LIMIT', '1500000'))
+        system = self.recommendation_system
+        if system is None or self._covers_limit(system, full_limit):
+            return None
+        return full_limit
+
+    def _build_full_system(self, full_limit):
+        """
+        Phase 2 model: the current model extended to `full_limit` rows, or a full refit
+
+        An extended model gets its neighbour table recomputed when ML_NEIGHBORS is set.
+
+        Returns:
+            MovieRecommendationSystem, or None on failure
+        """
+        full_system = None
+        # Extend the Phase 1 model with the remaining rows instead of refitting
+        if os.environ.get('ML_PHASE2_MODE', 'incremental') == 'incremental' and self.recommendation_system:
+            full_system = self.recommendation_system.extended(full_limit)
+
+        if full_system is None:
+            # Create new instance for full dataset
+            from ml_engine.movie_recommendation_optimized import MovieRecommendationSystem as _MRS
+            full_system = _MRS(use_large_dataset=True)
+            if not full_system.load_data(limit=full_limit):
+                print("❌ Phase 2: Failed to load full data")
+                return None
+            if not full_system.train_model(sample_size=None, **self._training_options()):
+                print("❌ Phase 2: Failed to train full model")
+                return None
+
+        options = self._training_options()
+        if options['neighbor_k'] and full_system.neighbors is None:
+            # extended() drops the table; without it every request would run a live search
+            full_system.rebuild_neighbors(options['neighbor_k'], options['n_jobs'])
+        return full_system
+
+    def _start_full_dataset_loading(self, full_limit, on_complete=None):
         """Load full dataset in background (Phase 2)"""
         import threading
         
@@ -96,29 +236,35 @@ class RecommendationService:
             try:
                 print("\n📊 PHASE 2: Loading full dataset in background...")
                 print("=" * 60)
-                
-                # Create new instance for full dataset
-                from ml_engine.movie_recommendation_optimized import MovieRecommendationSystem as _MRS
-                full_system = _MRS(use_large_dataset=True)
-                
-                if full_system.load_data(limit=full_limit):
-                    if full_system.train_model(sample_size=None):
-                        # Atomically replace the recommendation system
-                        self.recommendation_system = full_system
-                        print(f"✅ PHASE 2 Complete! Full dataset ready ({len(full_system.movies_data):,} movies)")
-                        print("=" * 60)
-                    else:
-                        print("❌ Phase 2: Failed to train full model")
-                else:
-                    print("❌ Phase 2: Failed to load full data")
-                    
+
+                full_system = self._build_full_system(full_limit)
+                if full_system is None:
+                    return
+
+                # Optionally recompute the hottest results before going live
+                generation = next(self._generations)
+                prewarm = int(os.environ.get('ML_CACHE_PREWARM', '0'))
+                if prewarm > 0:
+                    self._prewarm(full_system, self._namespace(full_system, generation), prewarm)
+
+                # Atomically replace the recommendation system (and cache namespace)
+                self._serve(full_system, generation)
+                self.model_source = 'csv'
+                self.artifact_path = None
+                print(f"✅ PHASE 2 Complete! Full dataset ready ({full_system.num_movies:,} movies)")
+                print("=" * 60)
+                self._save_artifact(full_system)
+                if on_complete:
+                    on_complete(full_system)
+
             except Exception as e:
                 print(f"❌ Phase 2 error: {e}")
-        
+
         # Start background loading
         thread = threading.Thread(target=load_full_dataset, daemon=True)
         thread.start()
         print("🔄 Phase 2 started in background (loading remaining movies)...")
+        return thread
 
     # Removed user-based recommendations stub to keep service minimal
 
@@ -146,135 +292,540 @@ class RecommendationService:
             }
 
         try:
-            # Simple in-memory cache to speed up repeated requests
-            cache_key = f"{movie_id}:{limit}"
-            now = time.time()
-            cached = self._similar_cache.get(cache_key)
-            if cached and now - cached['ts'] < self._cache_ttl_seconds:
-                return cached['data']
-            # Accept movie title directly (from favourites) or map id->title
-            movie_title = self._get_movie_title_from_id(movie_id)
-            if not movie_title:
-                return {
-                    'success': False,
-                    'error': f'Movie not found: {movie_id}',
-                    'movie_id': movie_id,
-                    'similar_movies': [],
-                    'model_status': 'error'
-                }
+            # Resolve once against the current model; a Phase 2 swap mid-request must not mix models
+            system, namespace = self._serving
+            # Accept movie title directly (from favourites) or map id->row
+            movie_row = self._resolve_shared(system, namespace, movie_id)
+            if movie_row is None:
+                return self._movie_not_found(movie_id)
+
+            # Any cached entry with candidates for at least `limit` results answers the request
+            cached = self._cached_entry((namespace, 'similar', movie_row), limit)
+            if cached:
+                return self._similar_response(system, movie_id, movie_row, cached, limit)
+
+            # Concurrent misses for the same movie wait for one computation
+            depth = self._similar_depth(system, limit)
+            entry = self._flights.do(
+                (namespace, 'similar', movie_row, depth),
+                lambda: self._compute_similar(system, namespace, movie_row, depth))
+            if entry is None:
+                return self._no_results(movie_id, system.title_at(movie_row))
+            return self._similar_response(system, movie_id, movie_row, entry, limit)
+
+        except Exception as e:
+            return {
+                'success': False,
+                'error': f'Error getting recommendations: {str(e)}',
+                'movie_id': movie_id,
+                'similar_movies': [],
+                'model_status': 'error'
+            }
+
+    def get_similar_movies_batch(self, movie_ids: List[str], limit: int = 10) -> Dict:
+        """
+        Get movies similar to each of several movies
+
+        Movies not already cached are scored together (one pass over the catalog
+        per block of seeds, see get_recommendations_batch).
+
+        Args:
+            movie_ids (List[str]): Movie identifiers or titles
+            limit (int): Number of similar movies to return per movie
+
+        Returns:
+            Dict: One get_similar_movies() result per movie, in request order
+        """
+        if not self.system_initialized:
+            self._initialize_system()
+        if not self.system_initialized:
+            return {
+                'success': False,
+                'error': 'ML system not initialized',
+                'results': [],
+                'model_status': 'not_ready'
+            }
+
+        try:
+            system, namespace = self._serving
+            results = [None] * len(movie_ids)
+            pending = {}  # resolved row -> positions of the movies to score
+            for i, movie_id in enumerate(movie_ids):
+                movie_row = self._resolve_shared(system, namespace, movie_id)
+                if movie_row is None:
+                    results[i] = self._movie_not_found(movie_id)
+                    continue
+                cached = self._cached_entry((namespace, 'similar', movie_row), limit)
+                if cached:
+                    results[i] = self._similar_response(system, movie_id, movie_row, cached, limit)
+                else:
+                    pending.setdefault(movie_row, []).append(i)
+
+            if pending:
+                depth = self._similar_depth(system, limit)
+                # Score the rows nobody else is computing; wait for the rest
+                entries, waiting, claimed = {}, {}, []
+                for row in pending:
+                    future, leader = self._flights.begin((namespace, 'similar', row, depth))
+                    if leader:
+                        claimed.append(row)
+                    else:
+                        waiting[row] = future
+                if claimed:
+                    try:
+                        batch = system.similar_candidates_batch(
+                            claimed, depth, nprobe=self._ann_nprobe)
+                        for row, candidates in zip(claimed, batch):
+                            entries[row] = self._store_similar(
+                                system, namespace, row, candidates, depth)
+                    except Exception as e:
+                        for row in claimed:
+                            self._flights.finish((namespace, 'similar', row, depth), error=e)
+                        raise
+                    for row in claimed:
+                        self._flights.finish((namespace, 'similar', row, depth), entries[row])
+                for row, future in waiting.items():
+                    entries[row] = future.result()
+
+                for row, positions in pending.items():
+                    for i in positions:
+                        if entries[row]:
+                            results[i] = self._similar_response(
+                                system, movie_ids[i], row, entries[row], limit)
+                        else:
+                            results[i] = self._no_results(movie_ids[i], system.title_at(row))
+
+            return {
+                'success': any(result['success'] for result in results),
+                'results': results,
+                'total_found': sum(result.get('total_found', 0) for result in results),
+                'model_status': 'ready'
+            }
+
+        except Exception as e:
+            return {
+                'success': False,
+                'error': f'Error getting recommendations: {str(e)}',
+                'results': [],
+                'model_status': 'error'
+            }
+
+    def get_user_recommendations(self, user_id: int, favorites: List, limit: int = 10) -> Dict:
+        """
+        Get recommendations for a user's taste profile, built from their favourites
+
+        Favourites are weighted by recency (half-life ML_PROFILE_HALF_LIFE_DAYS)
+        and searched as one profile; results are cached per favourites version, so
+        adding or removing a favourite invalidates them.
 
-            # Get recommendations using our ML system
-            recommendations = self.recommendation_system.get_recommendations(
-                movie_title, limit)
+        Args:
+            user_id (int): User the favourites belong to
+            favorites (List): Favorite rows (imdb_id, movie_title, added_at)
+            limit (int): Number of recommendations to return
 
-            if not recommendations:
+        Returns:
+            Dict: Recommendations, each naming the favourite that led to it
+        """
+        if not self.system_initialized:
+            self._initialize_system()
+        if not self.system_initialized:
+            return {
+                'success': False,
+                'error': 'ML system not initialized',
+                'user_id': user_id,
+                'recommendations': [],
+                'model_status': 'not_ready'
+            }
+
+        try:
+            system, namespace = self._serving
+            version = self._favorites_version(favorites)
+            cache_key = (namespace, 'user', user_id, version)
+            now = time.time()
+            cached = self._cached_entry(cache_key, limit)
+            if cached:
+                return self._user_response(system, user_id, version, cached, limit)
+
+            rows, weights = [], []
+            for favorite in favorites:
+                # IMDb id first (exact lookup only), then the stored title
+                row = self._resolve_id_row(system, favorite.imdb_id) if favorite.imdb_id else None
+                if row is None and favorite.movie_title:
+                    row = self._resolve_movie_row(system, favorite.movie_title)
+                if row is not None and row not in rows:
+                    rows.append(row)
+                    weights.append(self._recency_weight(favorite.added_at, now))
+
+            if not rows:
                 return {
                     'success': False,
-                    'error': f'No recommendations found for {movie_title}',
-                    'movie_id': movie_id,
-                    'similar_movies': [],
+                    'error': 'None of the favourites are in the catalog',
+                    'user_id': user_id,
+                    'recommendations': [],
                     'model_status': 'no_results'
                 }
 
-            # Format the response
-            similar_movies = []
-            for rec in recommendations:
-                similar_movies.append({
-                    'title': rec['title'],
-                    'similarity_score': rec['similarity_score'],
-                    'rank': rec['rank']
-                })
-
-            result = {
-                'success': True,
-                'movie_id': movie_id,
-                'movie_title': movie_title,
-                'similar_movies': similar_movies,
-                'total_found': len(similar_movies),
-                'model_status': 'ready'
-            }
-            # store to cache
-            self._similar_cache[cache_key] = {'ts': now, 'data': result}
-            return result
+            depth = max(limit, self._cache_top_k)
+
+            def compute():
+                candidate_rows, scores, closest = system.profile_candidates(
+                    rows, weights, depth, nprobe=self._ann_nprobe)
+                entry = dict(self._candidate_lists(candidate_rows, scores),
+                             limit=depth, seed_rows=rows, closest=closest.tolist())
+                if entry['rows']:
+                    self._cache.set(cache_key, entry)
+                return entry
+
+            entry = self._flights.do(cache_key + (depth,), compute)
+            return self._user_response(system, user_id, version, entry, limit)
 
         except Exception as e:
             return {
                 'success': False,
                 'error': f'Error getting recommendations: {str(e)}',
-                'movie_id': movie_id,
-                'similar_movies': [],
+                'user_id': user_id,
+                'recommendations': [],
                 'model_status': 'error'
             }
 
-    def _get_movie_title_from_id(self, movie_id: str) -> Optional[str]:
-        """Get movie title from ID or return the ID if it's already a title"""
-        if not self.recommendation_system:
+    def _user_response(self, system, user_id: int, version: str, entry: Dict, limit: int) -> Dict:
+        """API response for `limit` recommendations ranked from a cached profile entry"""
+        rows, scores = self._candidate_arrays(entry)
+        recommendations = system.rank_profile(entry['seed_rows'], rows, scores,
+                                              np.asarray(entry['closest']), limit)
+        return {
+            'success': bool(recommendations),
+            'user_id': user_id,
+            'favorites_version': version,
+            'favorites_used': len(entry['seed_rows']),
+            'recommendations': recommendations,
+            'total_found': len(recommendations),
+            'model_status': 'ready' if recommendations else 'no_results'
+        }
+
+    def _cached_entry(self, key, limit: int) -> Optional[Dict]:
+        """Cached entry under `key` if it was computed at least `limit` deep"""
+        entry = self._cache.get(key)
+        if entry and entry['limit'] >= limit:
+            return entry
+        return None
+
+    def _resolve_shared(self, system, namespace, movie_id: str) -> Optional[int]:
+        """_resolve_movie_row(), shared by concurrent requests for the same identifier"""
+        return self._flights.do((namespace, 'resolve', movie_id),
+                                lambda: self._resolve_movie_row(system, movie_id))
+
+    def _similar_depth(self, system, limit: int) -> int:
+        """
+        Results a similar-movie entry is computed for: ML_CACHE_TOP_K, or `limit` if
+        larger, capped at the model's neighbour table so cached entries come from it
+        """
+        top_k = self._cache_top_k
+        if system.neighbors is not None and system.neighbor_k:
+            top_k = min(top_k, system.neighbor_k)
+        return max(limit, top_k)
+
+    def _compute_similar(self, system, namespace, row: int, depth: int) -> Optional[Dict]:
+        """Cache entry for a movie's candidates up to `depth` results (None: no results)"""
+        # A computation that finished just before this one started already stored it
+        cached = self._cache.peek((namespace, 'similar', row))
+        if cached and cached['limit'] >= depth:
+            return cached
+        candidates = system.similar_candidates(row, depth, nprobe=self._ann_nprobe)
+        return self._store_similar(system, namespace, row, candidates, depth)
+
+    def _store_similar(self, system, namespace, row: int, candidates, depth: int) -> Optional[Dict]:
+        """Cache a movie's (rows, scores) candidates; returns the entry (None: no results)"""
+        if not len(candidates[0]):
+            return None
+        entry = self._similar_entry(system.title_at(row), candidates, depth)
+        self._cache.set((namespace, 'similar', row), entry)
+        return entry
+
+    @staticmethod
+    def _candidate_lists(rows, scores) -> Dict:
+        """Candidate arrays as JSON-safe lists (cached values may go to Redis)"""
+        scores = np.asarray(scores)
+        # Re-ranking adds genre boosts to the scores, so they keep their dtype
+        return {'rows': np.asarray(rows).tolist(), 'scores': scores.tolist(),
+                'dtype': scores.dtype.str}
+
+    @staticmethod
+    def _candidate_arrays(entry: Dict):
+        """(rows, scores) arrays of a cache entry written by _candidate_lists"""
+        return (np.asarray(entry['rows'], dtype=np.intp),
+                np.asarray(entry['scores'], dtype=entry['dtype']))
+
+    @staticmethod
+    def _favorites_version(favorites: List) -> str:
+        """Digest of a user's favourites; changes whenever one is added or removed"""
+        entries = sorted(f"{favorite.imdb_id}@{favorite.added_at}" for favorite in favorites)
+        return hashlib.sha1('\n'.join(entries).encode('utf-8')).hexdigest()[:16]
+
+    def _recency_weight(self, added_at, now: float) -> float:
+        """Profile weight of a favourite added at `added_at` (1.0 when just added)"""
+        if not added_at or self._profile_half_life_days <= 0:
+            return 1.0
+        # added_at is stored as naive UTC (datetime.utcnow)
+        if added_at.tzinfo is not None:
+            added_at = added_at.astimezone(timezone.utc).replace(tzinfo=None)
+        current = datetime.fromtimestamp(now, timezone.utc).replace(tzinfo=None)
+        age_days = max(0.0, (current - added_at).total_seconds() / 86400)
+        return 0.5 ** (age_days / self._profile_half_life_days)
+
+    @staticmethod
+    def _movie_not_found(movie_id: str) -> Dict:
+        return {
+            'success': False,
+            'error': f'Movie not found: {movie_id}',
+            'movie_id': movie_id,
+            'similar_movies': [],
+            'model_status': 'error'
+        }
+
+    def _similar_entry(self, movie_title: str, candidates, depth: int) -> Dict:
+        """
+        Cache entry for one movie's raw candidates, enough for `depth` results
+
+        The candidates are cached rather than the ranked results: the genre re-rank
+        of a shorter list is not a prefix of a longer one, so each limit is ranked
+        from them (see MovieRecommendationSystem.rank_similar).
+        """
+        return dict(self._candidate_lists(*candidates), limit=depth, movie_title=movie_title)
+
+    def _similar_response(self, system, movie_id: str, row: int, entry: Dict, limit: int) -> Dict:
+        """API response for `limit` similar movies ranked from a cache entry"""
+        recommendations = system.rank_similar(row, *self._candidate_arrays(entry), limit)
+        if not recommendations:
+            return self._no_results(movie_id, entry['movie_title'])
+        similar_movies = [
+            {'title': rec['title'], 'similarity_score': rec['similarity_score'],
+             'rank': rec['rank']}
+            for rec in recommendations
+        ]
+        return {
+            'success': True,
+            'movie_id': movie_id,
+            'movie_title': entry['movie_title'],
+            'similar_movies': similar_movies,
+            'total_found': len(similar_movies),
+            'model_status': 'ready'
+        }
+
+    @staticmethod
+    def _no_results(movie_id: str, movie_title: str) -> Dict:
+        return {
+            'success': False,
+            'error': f'No recommendations found for {movie_title}',
+            'movie_id': movie_id,
+            'similar_movies': [],
+            'model_status': 'no_results'
+        }
+
+    def _prewarm(self, system, namespace, count: int) -> int:
+        """
+        Compute the most recently used similar-movie results on a new model
+
+        Entries go under `namespace` before the model is served, so the first
+        requests after a swap hit the cache. Profile results are not pre-warmed.
+
+        Args:
+            system: Incoming model
+            namespace: Cache namespace it will be served under (see _namespace)
+            count: Most recently used similar-movie entries to recompute
+
+        Returns:
+            int: Entries cached
+        """
+        try:
+            current, current_namespace = self._serving
+            if current is None:
+                return 0
+            rows = []
+            for key in self._cache.keys():
+                if key[0] != current_namespace or key[1] != 'similar':
+                    continue
+                row = key[2]
+                # Catalog rows are dataset positions, so they carry over when the title matches
+                if row < len(system.catalog.titles) and system.title_at(row) == current.title_at(row):
+                    rows.append(row)
+                if len(rows) >= count:
+                    break
+            if not rows:
+                return 0
+
+            started = time.time()
+            depth = self._similar_depth(system, 1)
+            batch = system.similar_candidates_batch(rows, depth, nprobe=self._ann_nprobe)
+            cached = 0
+            for row, candidates in zip(rows, batch):
+                if self._store_similar(system, namespace, row, candidates, depth):
+                    cached += 1
+            print(f"🔥 Pre-warmed {cached:,} cached results in {time.time() - started:.1f}s")
+            return cached
+        except Exception as e:
+            print(f"⚠️ Cache pre-warm failed: {e}")
+            return 0
+
+    def _resolve_id_row(self, system, movie_id: str) -> Optional[int]:
+        """Resolve a TMDB or IMDb id to a row of the model's matching dataset, never by title"""
+        if not system:
             return None
 
         try:
-            # Prefer full dataset for robust matching if available
-            source_df = None
-            if hasattr(self.recommendation_system, 'full_movies_data') and self.recommendation_system.full_movies_data is not None:
-                source_df = self.recommendation_system.full_movies_data
-            elif self.recommendation_system.movies_data is not None:
-                source_df = self.recommendation_system.movies_data
-            else:
-                return None
+            return system.resolve_id(movie_id)
 
-            # Check if it's a numeric ID
-            if movie_id.isdigit():
-                if 'id' in source_df.columns:
-                    movie_data = source_df[source_df['id'] == int(movie_id)]
-                else:
-                    movie_data = None
-                if not movie_data.empty:
-                    return movie_data.iloc[0]['title']
-
-            # Check if it's a title
-            movie_data = source_df[source_df['title'] == movie_id]
-            if not movie_data.empty:
-                return movie_id
-
-            # Some OMDB ids start with tt...; small dataset may not have ids, so fallback to fuzzy title match
-            if movie_id.startswith('tt'):
-                # With only title info available, return None here and rely on fuzzy match fallback below
-                pass
-
-            # Try fuzzy matching
-            all_titles = source_df['title'].tolist()
-            import difflib
-            matches = difflib.get_close_matches(
-                movie_id, all_titles, n=1, cutoff=0.3)
-            if matches:
-                return matches[0]
+        except Exception as e:
+            print(f"Error resolving movie: {e}")
+            return None
 
+    def _resolve_movie_row(self, system, movie_id: str) -> Optional[int]:
+        """Resolve a movie ID or title to a row of the model's matching dataset"""
+        if not system:
             return None
 
+        try:
+            # TMDB id and IMDb 'tt' id are constant-time table lookups;
+            # titles go through the shared index (exact, then fuzzy, then substring)
+            return system.resolve_movie(movie_id, cutoff=0.3)
+
         except Exception as e:
-            print(f"Error getting movie title: {e}")
+            print(f"Error resolving movie: {e}")
             return None
 
     # Removed training and preprocessing endpoints to keep minimal
 
     def load_model(self) -> bool:
         """
-        Load the trained recommendation model
+        Load the largest saved model in MODEL_PATH trained on the current dataset
+        with the current build options (see _training_options)
+
+        When the dataset CSV is not present (model-only deploys) any saved model is
+        accepted, with a warning if it was built with other options.
 
         Returns:
             bool: True if model loaded successfully
         """
-        # TODO: Implement model loading
-        # This will load pre-trained models from disk
-
         try:
-            # Placeholder for model loading logic
-            self.model_loaded = True
-            return True
+            use_large = os.environ.get('ML_USE_LARGE_DATASET', '1') == '1'
+            system = MovieRecommendationSystem(use_large_dataset=use_large)
+            fingerprint = None
+            if os.path.isfile(system.dataset_path):
+                fingerprint = dataset_fingerprint(system.dataset_path)
+
+            artifacts = find_artifacts(self.model_path, fingerprint)
+            usable = [(path, manifest) for path, manifest in artifacts
+                      if self._matches_build_options(manifest)]
+            if len(usable) < len(artifacts):
+                print(f"⚠️ Ignoring {len(artifacts) - len(usable)} saved model(s) built with "
+                      f"other ML_* build options than {self._training_options()}")
+            if not usable and fingerprint is None:
+                # Nothing to train from: serve what was shipped
+                usable = artifacts
+
+            for path, _ in usable:
+                if system.load_model(path):
+                    self.recommendation_system = system
+                    self.model_loaded = True
+                    self.system_initialized = True
+                    self.model_source = 'artifact'
+                    self.artifact_path = path
+                    print(f"✅ Model ready from {path} ({system.num_movies:,} movies)")
+                    return True
+
+            print(f"ℹ️ No saved model for this dataset in {self.model_path}, training from CSV")
+            return False
         except Exception as e:
             print(f"Error loading model: {e}")
-            self.model_loaded = False
             return False
 
+    def load_newer_model(self) -> bool:
+        """
+        Swap in the largest saved model if it is not the one being served
+        (e.g. a full model another process saved, see build_full_artifact)
+
+        Returns:
+            bool: True if a different model was loaded
+        """
+        fingerprint = None
+        if self.recommendation_system is not None and self.recommendation_system.dataset_fingerprint:
+            fingerprint = self.recommendation_system.dataset_fingerprint
+        artifacts = [path for path, manifest in find_artifacts(self.model_path, fingerprint)
+                     if self._matches_build_options(manifest)]
+        if not artifacts or artifacts[0] == self.artifact_path:
+            return False
+        return self.load_model()
+
+    @staticmethod
+    def _training_options() -> Dict:
+        """
+        train_model() arguments from ML_FEATURE_BACKEND, ML_FIT_JOBS (0: all cores),
+        ML_ANN_LISTS, ML_EMBEDDING_DIM, ML_EMBEDDING_DTYPE and ML_NEIGHBORS
+        """
+        ann_lists = os.environ.get('ML_ANN_LISTS')
+        embedding_dim = os.environ.get('ML_EMBEDDING_DIM')
+        neighbor_k = os.environ.get('ML_NEIGHBORS')
+        return {
+            'feature_backend': os.environ.get('ML_FEATURE_BACKEND', 'tfidf'),
+            'n_jobs': int(os.environ.get('ML_FIT_JOBS', '1')),
+            'ann_lists': int(ann_lists) if ann_lists else None,
+            'embedding_dim': int(embedding_dim) if embedding_dim else None,
+            'embedding_dtype': os.environ.get('ML_EMBEDDING_DTYPE', 'float32'),
+            'neighbor_k': int(neighbor_k) if neighbor_k else None,
+        }
+
+    @classmethod
+    def _matches_build_options(cls, manifest: Dict) -> bool:
+        """Whether a saved model was built with the current _training_options()"""
+        options = cls._training_options()
+        embedding = None
+        if options['embedding_dim']:
+            embedding = {'dim': options['embedding_dim'], 'dtype': options['embedding_dtype']}
+        return (manifest.get('vectorizer', {}).get('type', 'tfidf') == options['feature_backend']
+                and manifest.get('ann_lists') == options['ann_lists']
+                and manifest.get('embedding') == embedding
+                and (manifest.get('neighbor_k') or None) == options['neighbor_k'])
+
+    @staticmethod
+    def _covers_limit(system, limit) -> bool:
+        """Whether a model was trained on at least `limit` CSV rows"""
+        return system.load_limit is None or system.load_limit >= limit
+
+    def _save_artifact(self, system) -> bool:
+        """Persist a freshly trained model to MODEL_PATH so the next start skips training"""
+        if os.environ.get('ML_SAVE_MODEL', '1') != '1' or not system.dataset_fingerprint:
+            return False
+        path = os.path.join(self.model_path, artifact_name(system.build_config()))
+        if system.save_model(path):
+            self.artifact_path = path
+            self._prune_artifacts(path, system)
+            return True
+        return False
+
+    def _prune_artifacts(self, saved_path: str, system) -> int:
+        """
+        Delete saved models that load_model() would no longer choose over `saved_path`:
+        other datasets, other build options, and smaller models of the same build
+
+        Processes still serving a deleted model keep their memory-mapped pages.
+
+        Returns:
+            int: Artifacts removed
+        """
+        removed = 0
+        for path, manifest in find_artifacts(self.model_path):
+            if os.path.abspath(path) == os.path.abspath(saved_path):
+                continue
+            if (manifest.get('dataset_fingerprint') == system.dataset_fingerprint
+                    and self._matches_build_options(manifest)
+                    and manifest.get('catalog_size', 0) > len(system.catalog)):
+                continue
+            shutil.rmtree(path, ignore_errors=True)
+            removed += 1
+        if removed:
+            print(f"🧹 Removed {removed} superseded model(s) from {self.model_path}")
+        return removed
+
     def get_model_status(self) -> Dict:
         """
         Get the current status of the ML model
@@ -287,12 +838,14 @@ class RecommendationService:
             'system_initialized': self.system_initialized,
             'model_path': self.model_path,
             'data_path': self.data_path,
+            'model_source': self.model_source,
+            'artifact_path': self.artifact_path,
             'status': 'development' if not self.model_loaded else 'ready'
         }
 
         # Add ML system info if available
         if self.recommendation_system:
-            movies_count = len(self.recommendation_system.movies_data) if self.recommendation_system.movies_data is not None else 0
+            movies_count = self.recommendation_system.num_movies
             
             # Determine loading phase
             quick_start_limit = int(os.environ.get('ML_QUICK_START_LIMIT', '100000'))
@@ -313,6 +866,13 @@ class RecommendationService:
                 'features_used': self.recommendation_system.feature_columns if hasattr(self.recommendation_system, 'feature_columns') else [],
                 'dataset_type': 'TMDB Large Dataset' if self.recommendation_system.use_large_dataset else 'Original Dataset',
                 'is_trained': self.recommendation_system.is_trained,
+                'ann_lists': (self.recommendation_system.ann_index.nlist
+                              if self.recommendation_system.ann_index is not None else 0),
+                'embedding': self.recommendation_system.embedding_params,
+                'neighbor_k': (self.recommendation_system.neighbor_k
+                               if self.recommendation_system.neighbors is not None else 0),
+                'model_generation': self.model_generation,
+                'cache': dict(self._cache.stats(), coalesced=self._flights.coalesced),
                 'loading_phase': loading_phase,
                 'phase_message': phase_message
             })
@@ -320,3 +880,32 @@ class RecommendationService:
         return status_info
 
     # Removed preprocess stub
+
+
+def build_full_artifact(full_limit: int, notify_pid: Optional[int] = None) -> bool:
+    """
+    Phase 2 in a separate process: build the full model from the saved Phase 1
+    model (or from scratch) and save it to MODEL_PATH
+
+    Used under gunicorn, where the master must not run threads while it forks
+    workers; the master loads the artifact on its main thread when signalled.
+
+    Args:
+        full_limit: Rows to load (ML_LOAD_LIMIT)
+        notify_pid: Process sent SIGHUP once the artifact is saved
+
+    Returns:
+        bool: True if the full model was saved
+    """
+    import signal
+    service = RecommendationService()
+    service.load_model()
+    print("\n📊 PHASE 2: Building full model in a separate process...")
+    full_system = service._build_full_system(full_limit)
+    if full_system is None or not service._save_artifact(full_system):
+        print("❌ Phase 2: Full model was not saved")
+        return False
+    print(f"✅ PHASE 2 Complete! Full model saved ({full_system.num_movies:,} movies)")
+    if notify_pid:
+        os.kill(notify_pid, signal.SIGHUP)
+    return True
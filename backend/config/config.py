@@ -19,8 +19,9 @@ class Config:
     MODEL_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'models')
     DATA_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data')
     
-    # Caching configuration
-    CACHE_TYPE = "simple"
+    # Caching configuration ("simple": per-process, "redis": shared via CACHE_REDIS_URL)
+    CACHE_TYPE = os.environ.get('CACHE_TYPE') or "simple"
+    CACHE_REDIS_URL = os.environ.get('CACHE_REDIS_URL') or 'redis://localhost:6379/0'
     CACHE_DEFAULT_TIMEOUT = 300
     
     # JWT configuration (for future authentication)
@@ -0,0 +1,67 @@
+"""
+Gunicorn configuration for MovieHub
+The recommendation model is loaded once in the master before workers fork, so every
+worker shares it (copy-on-write, and memory-mapped artifact pages via the page cache)
+instead of each running its own load and TF-IDF fit.
+"""
+
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '5001')}"
+workers = int(os.environ.get('WEB_CONCURRENCY', '2'))
+timeout = 600
+preload_app = True
+
+# Read by create_app: load the model synchronously in the master (threads do not survive fork)
+os.environ.setdefault('ML_PRELOAD', '1')
+
+
+def when_ready(server):
+    """
+    Start Phase 2 in a separate process that saves the full model to MODEL_PATH
+
+    It must not run as a thread in the master: workers are forked (and respawned)
+    while it would be running, and could inherit locks it holds. The process sends
+    SIGHUP when the model is saved; on_reload then loads it before new workers fork.
+    It is not a daemon process, because training spawns its own worker pools
+    (ML_FIT_JOBS, refits, neighbour tables); on_exit stops it instead.
+    """
+    if os.environ.get('ML_EAGER_INIT', '0') != '1':
+        return
+    from app.services.recommendation_service import RecommendationService, build_full_artifact
+
+    full_limit = RecommendationService().pending_full_limit()
+    if full_limit is None:
+        return
+    if os.environ.get('ML_SAVE_MODEL', '1') != '1':
+        server.log.warning("ML_SAVE_MODEL=0: Phase 2 needs a writable MODEL_PATH under gunicorn, skipping")
+        return
+    process = multiprocessing.get_context('spawn').Process(
+        target=build_full_artifact, args=(full_limit, os.getpid()))
+    process.start()
+    # The config module is re-executed on reload; the arbiter object persists
+    server.ml_phase2_process = process
+    server.log.info("Phase 2 building the full model in process %s", process.pid)
+
+
+def on_reload(server):
+    """On HUP, before new workers fork: swap in the full model once Phase 2 saved it"""
+    if os.environ.get('ML_EAGER_INIT', '0') != '1':
+        return
+    from app.services.recommendation_service import RecommendationService
+
+    service = RecommendationService()
+    if service.pending_full_limit() is not None and service.load_newer_model():
+        # With preload_app, HUP forks fresh workers from the master without reloading the app
+        server.log.info("Full model ready (%s movies), restarting workers",
+                        service.recommendation_system.num_movies)
+
+
+def on_exit(server):
+    """Stop a Phase 2 build still running when the master shuts down"""
+    process = getattr(server, 'ml_phase2_process', None)
+    if process is not None and process.exitcode is None:
+        server.log.info("Stopping Phase 2 process %s", process.pid)
+        process.terminate()
+        process.join(timeout=10)
@@ -0,0 +1,285 @@
+"""
+Approximate nearest-neighbour search for the movie recommendation system
+An inverted-file (IVF) index over the L2-normalized feature rows: every row is filed
+under its nearest of `nlist` sparse centroids (spherical k-means), and a query rescores
+only the rows of its `nprobe` nearest lists exactly. Lists hold about ROWS_PER_LIST
+rows, so per-query work stays the same as the catalog grows.
+"""
+
+import numpy as np
+from scipy.sparse import csr_matrix, vstack
+from sklearn.preprocessing import normalize
+
+
+# Target inverted list length; nlist = rows / ROWS_PER_LIST
+ROWS_PER_LIST = 1000
+# Lists that end up longer than this (e.g. thousands of plain "Drama" movies)
+# are clustered again into lists of about ROWS_PER_LIST
+MAX_LIST_ROWS = 4 * ROWS_PER_LIST
+# Lists probed per query: the recall/latency knob
+DEFAULT_NPROBE = 8
+# Terms kept per centroid, so centroids stay sparse for any feature space size
+CENTROID_TERMS = 256
+# Rows sampled to fit the centroids, per list
+SAMPLE_PER_LIST = 40
+KMEANS_ITERATIONS = 8
+# Cap on (rows x lists) similarities materialized at once while assigning rows
+ASSIGN_BLOCK_CELLS = 1 << 24
+# Nearest sub-lists remembered per row when a split list is balanced
+BALANCE_CHOICES = 8
+
+
+def default_nlist(n_rows):
+    """Number of lists giving about ROWS_PER_LIST rows each"""
+    return max(1, -(-n_rows // ROWS_PER_LIST))
+
+
+def _truncate_rows(matrix, terms):
+    """Keep the `terms` largest entries of every row, then L2-normalize"""
+    matrix = csr_matrix(matrix)
+    matrix.sum_duplicates()
+    rows = []
+    for i in range(matrix.shape[0]):
+        start, end = matrix.indptr[i], matrix.indptr[i + 1]
+        data, indices = matrix.data[start:end], matrix.indices[start:end]
+        if len(data) > terms:
+            keep = np.sort(np.argpartition(data, -terms)[-terms:])
+            data, indices = data[keep], indices[keep]
+        rows.append((data, indices))
+    indptr = np.zeros(len(rows) + 1, dtype=np.int64)
+    np.cumsum([len(data) for data, _ in rows], out=indptr[1:])
+    truncated = csr_matrix(
+        (np.concatenate([d for d, _ in rows]).astype(np.float32),
+         np.concatenate([i for _, i in rows]).astype(np.int32), indptr),
+        shape=matrix.shape)
+    return normalize(truncated, norm='l2', copy=False)
+
+
+def nearest_lists(matrix, centroids):
+    """Index of the most similar centroid for every row of `matrix`"""
+    block = max(1, ASSIGN_BLOCK_CELLS // max(centroids.shape[0], 1))
+    centroids_t = centroids.T.tocsc()
+    assignment = np.empty(matrix.shape[0], dtype=np.int32)
+    for start in range(0, matrix.shape[0], block):
+        sims = (matrix[start:start + block] @ centroids_t).toarray()
+        assignment[start:start + block] = sims.argmax(axis=1)
+    return assignment
+
+
+def balanced_lists(matrix, centroids, capacity):
+    """
+    Nearest centroid for every row of `matrix`, but no centroid takes more than
+    `capacity` rows
+
+    k-means alone can leave most rows of unstructured text in one cluster. Rows
+    closest to a centroid choose first; a row whose BALANCE_CHOICES nearest
+    centroids are full goes to the emptiest one.
+    """
+    n_rows, parts = matrix.shape[0], centroids.shape[0]
+    choices = min(BALANCE_CHOICES, parts)
+    preference = np.empty((n_rows, choices), dtype=np.int32)
+    best = np.empty(n_rows, dtype=np.float32)
+    block = max(1, ASSIGN_BLOCK_CELLS // parts)
+    centroids_t = centroids.T.tocsc()
+    for start in range(0, n_rows, block):
+        sims = (matrix[start:start + block] @ centroids_t).toarray()
+        top = np.argpartition(-sims, choices - 1, axis=1)[:, :choices]
+        top_sims = np.take_along_axis(sims, top, axis=1)
+        order = np.argsort(-top_sims, axis=1)
+        preference[start:start + block] = np.take_along_axis(top, order, axis=1)
+        best[start:start + block] = top_sims.max(axis=1)
+
+    counts = np.zeros(parts, dtype=np.int64)
+    assignment = np.empty(n_rows, dtype=np.int32)
+    for row in np.argsort(-best, kind='stable'):
+        for list_id in preference[row]:
+            if counts[list_id] < capacity:
+                break
+        else:
+            list_id = int(np.argmin(counts))
+        assignment[row] = list_id
+        counts[list_id] += 1
+    return assignment
+
+
+def _fit_centroids(sample, nlist, iterations, rng):
+    """Spherical k-means on the sampled rows, with sparse (truncated) centroids"""
+    seeds = rng.choice(sample.shape[0], size=nlist, replace=False)
+    centroids = _truncate_rows(sample[seeds], CENTROID_TERMS)
+    for _ in range(iterations):
+        assignment = nearest_lists(sample, centroids)
+        members = csr_matrix(
+            (np.ones(len(assignment), dtype=np.float32),
+             (assignment, np.arange(len(assignment)))),
+            shape=(nlist, sample.shape[0]))
+        updated = _truncate_rows(members @ sample, CENTROID_TERMS)
+        # Lists that lost all their rows keep their previous centroid
+        empty = np.flatnonzero(np.diff(members.indptr) == 0)
+        if len(empty):
+            updated = updated.tolil()
+            updated[empty] = centroids[empty]
+            updated = updated.tocsr()
+        centroids = updated
+    return centroids
+
+
+def _split_large_lists(matrix, centroids, assignment, rng):
+    """Re-cluster the rows of every list longer than MAX_LIST_ROWS (modifies `assignment`)"""
+    sizes = np.bincount(assignment, minlength=centroids.shape[0])
+    large = np.flatnonzero(sizes > MAX_LIST_ROWS)
+    if len(large) == 0:
+        return centroids
+    print(f"🧭 Splitting {len(large)} oversized ANN lists...")
+    blocks = [centroids]
+    next_list = centroids.shape[0]
+    for list_id in large:
+        members = np.flatnonzero(assignment == list_id)
+        parts = default_nlist(len(members))
+        sample = members
+        if len(members) > parts * SAMPLE_PER_LIST:
+            sample = np.sort(rng.choice(members, size=parts * SAMPLE_PER_LIST, replace=False))
+        sub_centroids = _fit_centroids(matrix[sample], parts, KMEANS_ITERATIONS, rng)
+        # Up to twice the target length, which keeps every sub-list under MAX_LIST_ROWS
+        capacity = max(2 * ROWS_PER_LIST, -(-len(members) // parts))
+        sub_assignment = balanced_lists(matrix[members], sub_centroids, capacity)
+        # Sub-list 0 keeps the original list id, the others are appended
+        assignment[members] = np.where(sub_assignment == 0, list_id,
+                                       next_list + sub_assignment - 1)
+        blocks[0] = _replace_row(blocks[0], list_id, sub_centroids[0])
+        blocks.append(sub_centroids[1:])
+        next_list += parts - 1
+    return vstack(blocks, format='csr')
+
+
+def _replace_row(matrix, row, replacement):
+    return vstack([matrix[:row], replacement, matrix[row + 1:]], format='csr')
+
+
+class IVFIndex:
+    """
+    Inverted-file index answering top-k cosine queries against a feature matrix
+
+    The matrix itself is not stored: search() takes the model's feature matrix, so
+    rescoring uses the same (memory-mapped) rows as exact search.
+    """
+
+    def __init__(self, centroids, list_offsets, list_rows, nprobe=DEFAULT_NPROBE):
+        self.centroids = centroids  # (nlist, n_features) sparse, L2-normalized
+        self.list_offsets = list_offsets  # list i holds list_rows[offsets[i]:offsets[i+1]]
+        self.list_rows = list_rows  # matrix rows grouped by list
+        self.nprobe = nprobe
+
+    @classmethod
+    def build(cls, matrix, nlist=None, nprobe=DEFAULT_NPROBE, seed=0):
+        """
+        Fit centroids on a sample of `matrix` and file every row under one list
+
+        Args:
+                matrix: L2-normalized CSR feature matrix
+                nlist: Number of lists (default: default_nlist(rows))
+                nprobe: Default number of lists probed per query
+                seed: Sampling and seeding randomness
+        """
+        n_rows = matrix.shape[0]
+        nlist = min(nlist or default_nlist(n_rows), n_rows)
+        rng = np.random.default_rng(seed)
+        sample_size = min(n_rows, nlist * SAMPLE_PER_LIST)
+        sample = matrix[np.sort(rng.choice(n_rows, size=sample_size, replace=False))]
+        centroids = _fit_centroids(sample, nlist, KMEANS_ITERATIONS, rng)
+        assignment = nearest_lists(matrix, centroids)
+        centroids = _split_large_lists(matrix, centroids, assignment, rng)
+        return cls._from_assignment(centroids, assignment, nprobe)
+
+    @classmethod
+    def _from_assignment(cls, centroids, assignment, nprobe):
+        order = np.argsort(assignment, kind='stable').astype(np.int32)
+        counts = np.bincount(assignment, minlength=centroids.shape[0])
+        offsets = np.zeros(centroids.shape[0] + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+        return cls(centroids, offsets, order, nprobe)
+
+    @property
+    def nlist(self):
+        return self.centroids.shape[0]
+
+    def __len__(self):
+        return len(self.list_rows)
+
+    @property
+    def nbytes(self):
+        return (self.centroids.data.nbytes + self.centroids.indices.nbytes +
+                self.centroids.indptr.nbytes + self.list_offsets.nbytes + self.list_rows.nbytes)
+
+    def extended(self, matrix, start):
+        """
+        New index that also files rows start..matrix.shape[0] of `matrix`
+
+        Centroids are kept as they are (like the vectorizer of an extended model);
+        the new rows go to their nearest existing list, and lists that grow past
+        MAX_LIST_ROWS are split as in build(), so list lengths stay bounded.
+        """
+        assignment = np.empty(matrix.shape[0], dtype=np.int32)
+        list_ids = np.repeat(np.arange(self.nlist, dtype=np.int32), np.diff(self.list_offsets))
+        assignment[self.list_rows] = list_ids
+        assignment[start:] = nearest_lists(matrix[start:], self.centroids)
+        centroids = _split_large_lists(matrix, self.centroids, assignment,
+                                       np.random.default_rng(start))
+        return IVFIndex._from_assignment(centroids, assignment, self.nprobe)
+
+    def candidates(self, query, nprobe=None):
+        """Matrix rows filed under the `nprobe` lists nearest to `query`"""
+        nprobe = min(max(int(nprobe or self.nprobe), 1), self.nlist)
+        scores = (self.centroids @ query.T).toarray().ravel()
+        if nprobe < self.nlist:
+            probed = np.argpartition(scores, -nprobe)[-nprobe:]
+        else:
+            probed = np.arange(self.nlist)
+        return np.concatenate([self.list_rows[self.list_offsets[i]:self.list_offsets[i + 1]]
+                               for i in probed])
+
+    def search(self, matrix, query, k, nprobe=None):
+        """
+        Approximate top-k rows of `matrix` by cosine similarity to `query`
+
+        Args:
+                matrix: The feature matrix the index was built over
+                query: (1, n_features) sparse, L2-normalized row
+                k: Rows wanted
+                nprobe: Lists to probe (default: self.nprobe); more lists, higher recall
+
+        Returns:
+                (rows, scores) best first, or None when the probed lists hold fewer
+                than k rows (the caller should search exactly)
+        """
+        rows = self.candidates(query, nprobe)
+        if len(rows) < k:
+            return None
+        # Dense query: a sparse-matrix/vector product over the gathered rows only
+        dense_query = np.zeros(matrix.shape[1], dtype=matrix.dtype)
+        dense_query[query.indices] = query.data
+        scores = matrix[rows] @ dense_query
+        if k < len(rows):
+            top = np.argpartition(scores, -k)[-k:]
+        else:
+            top = np.arange(len(rows))
+        top = top[np.argsort(scores[top])[::-1]]
+        return rows[top], scores[top]
+
+    def to_arrays(self):
+        """Plain NumPy arrays for persistence"""
+        return {
+            'centroids.data': self.centroids.data,
+            'centroids.indices': self.centroids.indices,
+            'centroids.indptr': self.centroids.indptr,
+            'centroids.shape': np.array(self.centroids.shape, dtype=np.int64),
+            'list_offsets': self.list_offsets,
+            'list_rows': self.list_rows,
+        }
+
+    @classmethod
+    def from_arrays(cls, arrays, nprobe=DEFAULT_NPROBE):
+        """Rebuild an index from to_arrays() output"""
+        centroids = csr_matrix(
+            (arrays['centroids.data'], arrays['centroids.indices'], arrays['centroids.indptr']),
+            shape=tuple(int(n) for n in arrays['centroids.shape']), copy=False)
+        return cls(centroids, arrays['list_offsets'], arrays['list_rows'], nprobe)
@@ -0,0 +1,182 @@
+"""
+On-disk model artifact format for the movie recommendation system
+A directory of raw .npy arrays plus a JSON manifest; arrays are memory-mapped on load
+so startup is near-instant and pages are shared between worker processes
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import uuid
+
+import numpy as np
+
+
+FORMAT_VERSION = 1
+MANIFEST_FILE = 'manifest.json'
+VOCABULARY_FILE = 'vocabulary.txt'
+# Bytes hashed from each end of the dataset when fingerprinting it
+FINGERPRINT_SAMPLE_BYTES = 1 << 20
+
+
+class ArtifactError(Exception):
+    """Raised when an artifact directory is missing, incomplete or of another format version"""
+
+
+def write_artifact(path, manifest, arrays, vocabulary=None):
+    """
+    Write an artifact directory atomically
+
+    Args:
+            path: Target directory (replaced if it exists)
+            manifest: JSON-serializable metadata
+            arrays: Dict of name -> NumPy array, each stored as <name>.npy
+            vocabulary: Optional list of terms, stored one per line in column order
+    """
+    path = os.path.abspath(path)
+    parent = os.path.dirname(path)
+    os.makedirs(parent, exist_ok=True)
+    staging = os.path.join(parent, f".{os.path.basename(path)}.tmp-{uuid.uuid4().hex}")
+    os.makedirs(staging)
+
+    try:
+        for name, array in arrays.items():
+            np.save(os.path.join(staging, f"{name}.npy"), np.ascontiguousarray(array),
+                    allow_pickle=False)
+        if vocabulary is not None:
+            with open(os.path.join(staging, VOCABULARY_FILE), 'w', encoding='utf-8') as f:
+                f.write('\n'.join(vocabulary))
+
+        manifest = dict(manifest)
+        manifest['format_version'] = FORMAT_VERSION
+        manifest['arrays'] = {
+            name: {'dtype': str(array.dtype), 'shape': list(array.shape)}
+            for name, array in arrays.items()
+        }
+        manifest['has_vocabulary'] = vocabulary is not None
+        # Manifest last: a directory without one is never considered complete
+        with open(os.path.join(staging, MANIFEST_FILE), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+
+        # Swap into place; the previous artifact (if any) is removed afterwards
+        backup = None
+        if os.path.exists(path):
+            backup = f"{staging}.old"
+            os.rename(path, backup)
+        os.rename(staging, path)
+        if backup:
+            shutil.rmtree(backup, ignore_errors=True)
+    except Exception:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+
+def read_manifest(path):
+    """Manifest of an artifact directory (raises ArtifactError if unusable)"""
+    manifest_path = os.path.join(path, MANIFEST_FILE)
+    if not os.path.isfile(manifest_path):
+        raise ArtifactError(f"No model manifest at {manifest_path}")
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    if manifest.get('format_version') != FORMAT_VERSION:
+        raise ArtifactError(
+            f"Unsupported model format {manifest.get('format_version')} (expected {FORMAT_VERSION})")
+    return manifest
+
+
+def read_artifact(path, mmap=True):
+    """
+    Open an artifact directory
+
+    Args:
+            path: Artifact directory
+            mmap: Memory-map arrays read-only instead of reading them into RAM
+
+    Returns:
+            (manifest, arrays, vocabulary) where vocabulary is a list of terms or None
+    """
+    manifest = read_manifest(path)
+    arrays = {}
+    for name in manifest['arrays']:
+        array_path = os.path.join(path, f"{name}.npy")
+        if not os.path.isfile(array_path):
+            raise ArtifactError(f"Model array missing: {array_path}")
+        arrays[name] = np.load(array_path, mmap_mode='r' if mmap else None, allow_pickle=False)
+
+    vocabulary = None
+    if manifest.get('has_vocabulary'):
+        with open(os.path.join(path, VOCABULARY_FILE), 'r', encoding='utf-8') as f:
+            content = f.read()
+        vocabulary = content.split('\n') if content else []
+    return manifest, arrays, vocabulary
+
+
+def group(arrays, prefix):
+    """Arrays stored under `prefix.`, with the prefix stripped"""
+    start = len(prefix) + 1
+    return {name[start:]: array for name, array in arrays.items() if name.startswith(prefix + '.')}
+
+
+def prefixed(prefix, arrays):
+    """Inverse of group()"""
+    return {f"{prefix}.{name}": array for name, array in arrays.items()}
+
+
+def dataset_fingerprint(path):
+    """
+    Cheap content fingerprint of a dataset file
+
+    Hashes the size plus the first and last MiB, so it survives copies and
+    mtime changes (e.g. Docker volumes) but changes when the CSV is replaced.
+    """
+    size = os.path.getsize(path)
+    digest = hashlib.sha256(str(size).encode('ascii'))
+    with open(path, 'rb') as f:
+        digest.update(f.read(FINGERPRINT_SAMPLE_BYTES))
+        if size > FINGERPRINT_SAMPLE_BYTES:
+            f.seek(max(FINGERPRINT_SAMPLE_BYTES, size - FINGERPRINT_SAMPLE_BYTES))
+            digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+
+def build_key(config):
+    """Short stable hash of a model's build inputs; equal keys mean equal artifacts"""
+    payload = json.dumps({'format_version': FORMAT_VERSION, 'config': config}, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:12]
+
+
+def artifact_name(config):
+    """Content-addressed directory name for a model built from `config`"""
+    return f"recommender-{config.get('dataset_fingerprint') or 'nodata'}-{build_key(config)}"
+
+
+def find_artifacts(root, fingerprint=None):
+    """
+    Usable artifact directories under `root`
+
+    Args:
+            root: Directory holding one artifact directory per trained model
+            fingerprint: Only return artifacts trained on the dataset with this fingerprint
+
+    Returns:
+            List of (path, manifest), models with the most rows first
+    """
+    if not root or not os.path.isdir(root):
+        return []
+
+    found = []
+    for name in sorted(os.listdir(root)):
+        path = os.path.join(root, name)
+        if name.startswith('.') or not os.path.isdir(path):
+            continue
+        try:
+            manifest = read_manifest(path)
+        except (ArtifactError, ValueError, OSError):
+            continue
+        if fingerprint and manifest.get('dataset_fingerprint') != fingerprint:
+            continue
+        found.append((path, manifest))
+
+    found.sort(key=lambda item: item[1].get('catalog_size', 0), reverse=True)
+    return found
@@ -0,0 +1,256 @@
+"""
+Benchmark of the recommendation feature backends, the ANN index and the embedding mode
+Trains each backend on the same rows and reports fit time, query latency and
+recall@k of the recommended titles against the exact TF-IDF model, then sweeps
+the ANN index's nprobe and the embedding's dimensions against exact search on
+the TF-IDF model
+
+Usage:
+    python -m ml_engine.benchmark --dataset data/tmbd.csv --limit 100000 --queries 200
+    python -m ml_engine.benchmark --embedding-dims 64 128 256 --embedding-dtypes float32 float16
+"""
+
+import argparse
+import copy
+import sys
+import time
+
+import numpy as np
+
+try:
+    from ml_engine.ann import default_nlist
+    from ml_engine.embedding import EMBEDDING_DTYPES, LatentEmbedding
+    from ml_engine.movie_recommendation_optimized import FEATURE_BACKENDS, MovieRecommendationSystem
+except ImportError:  # running from inside ml_engine/
+    from ann import default_nlist
+    from embedding import EMBEDDING_DTYPES, LatentEmbedding
+    from movie_recommendation_optimized import FEATURE_BACKENDS, MovieRecommendationSystem
+
+
+def sample_rows(system, queries, seed=0):
+    """Catalog rows to query, drawn without replacement"""
+    rng = np.random.default_rng(seed)
+    return np.sort(rng.choice(system.num_movies, size=min(queries, system.num_movies),
+                              replace=False))
+
+
+def time_queries(system, rows, k, options=None):
+    """
+    Recommend for every row
+
+    Args:
+            options: Extra get_recommendations arguments (e.g. nprobe)
+
+    Returns:
+            (results, latencies) where results[i] is the list of titles for rows[i]
+            and latencies are seconds per query
+    """
+    results = []
+    latencies = np.empty(len(rows))
+    for i, row in enumerate(rows):
+        started = time.perf_counter()
+        recommendations = system.get_recommendations(None, k, matched_row=int(row),
+                                                     **(options or {}))
+        latencies[i] = time.perf_counter() - started
+        results.append([rec['title'] for rec in recommendations])
+    return results, latencies
+
+
+def recall_at_k(reference, candidate):
+    """Mean share of the reference titles also returned by the candidate"""
+    scores = [len(set(ref) & set(cand)) / len(ref) for ref, cand in zip(reference, candidate) if ref]
+    return float(np.mean(scores)) if scores else 0.0
+
+
+def compare(reference, candidate, rows, k=10, reference_options=None, candidate_options=None):
+    """
+    Recall and latency of `candidate` against `reference` on the same catalog rows
+
+    Args:
+            reference: Trained MovieRecommendationSystem taken as ground truth
+            candidate: Trained MovieRecommendationSystem being evaluated (may be
+                    `reference` itself with other options)
+            rows: Catalog rows to query (see sample_rows)
+            k: Recommendations per query
+            reference_options, candidate_options: get_recommendations arguments
+
+    Returns:
+            Dict with recall_at_k and p50/p95 latencies (ms) of both systems
+    """
+    expected, reference_latency = time_queries(reference, rows, k, reference_options)
+    found, candidate_latency = time_queries(candidate, rows, k, candidate_options)
+    return {
+        'queries': len(rows),
+        'k': k,
+        'recall_at_k': recall_at_k(expected, found),
+        'reference_p50_ms': float(np.percentile(reference_latency, 50) * 1000),
+        'reference_p95_ms': float(np.percentile(reference_latency, 95) * 1000),
+        'p50_ms': float(np.percentile(candidate_latency, 50) * 1000),
+        'p95_ms': float(np.percentile(candidate_latency, 95) * 1000),
+    }
+
+
+def train(system, backend, vectorizer_params=None, n_jobs=1, ann_lists=None):
+    """Train `system` with a feature backend; returns fit seconds, or None on failure"""
+    started = time.perf_counter()
+    if not system.train_model(vectorizer_params=vectorizer_params, feature_backend=backend,
+                              n_jobs=n_jobs, ann_lists=ann_lists):
+        return None
+    return time.perf_counter() - started
+
+
+def ann_sweep(system, rows, k=10, nprobes=(1, 2, 4, 8, 16, 32)):
+    """compare() of ANN search at each nprobe against exact search on the same model"""
+    results = []
+    for nprobe in nprobes:
+        result = compare(system, system, rows, k, {'nprobe': 0}, {'nprobe': nprobe})
+        result['nprobe'] = nprobe
+        results.append(result)
+    return results
+
+
+def embedding_sweep(system, rows, k=10, dims=(64, 128, 256), dtypes=('float32',)):
+    """
+    compare() of the embedding mode at each dimension and dtype against exact
+    sparse search on the same trained model
+
+    Each embedding is fitted on the model's feature matrix and searched through a
+    shallow copy of `system`, so the vocabulary and catalog are shared.
+    """
+    results = []
+    for dim in dims:
+        for dtype in dtypes:
+            started = time.perf_counter()
+            candidate = copy.copy(system)
+            candidate.embedding = LatentEmbedding.fit(system.feature_matrix, dim, dtype)
+            fit_seconds = time.perf_counter() - started
+            result = compare(system, candidate, rows, k, {'nprobe': 0})
+            result.update(dim=dim, dtype=dtype, fit_seconds=fit_seconds,
+                          nbytes=int(candidate.embedding.nbytes))
+            results.append(result)
+    return results
+
+
+def run(dataset_path=None, limit=100000, queries=200, k=10, backends=('hashing',),
+        hashing_params=None, n_jobs=1, ann_lists=None, nprobes=(1, 2, 4, 8, 16, 32),
+        embedding_dims=(), embedding_dtypes=('float32',)):
+    """
+    Benchmark `backends` against the TF-IDF backend, and its ANN index and
+    embeddings against exact search
+
+    Returns:
+            {'backends': backend -> report (fit_seconds, matrix shape/nnz and, for
+            non-reference backends, the compare() results with exact search),
+            'ann': ann_sweep() results or [] without an index,
+            'embedding': embedding_sweep() results or [] without embedding_dims},
+            or None on failure
+    """
+    reference = MovieRecommendationSystem(dataset_path=dataset_path)
+    if not reference.load_data(limit=limit):
+        return None
+    reports = {}
+    if ann_lists is None:
+        # Always sweep nprobe, so recall is known before an index is enabled
+        ann_lists = default_nlist(len(reference.movies_data))
+    fit_seconds = train(reference, 'tfidf', n_jobs=n_jobs, ann_lists=ann_lists)
+    if fit_seconds is None:
+        return None
+    matrix = reference.feature_matrix
+    reports['tfidf'] = {'fit_seconds': fit_seconds,
+                        'shape': list(matrix.shape),
+                        'nnz': int(matrix.nnz),
+                        'nbytes': int(matrix.data.nbytes + matrix.indices.nbytes
+                                      + matrix.indptr.nbytes)}
+    rows = sample_rows(reference, queries)
+
+    for backend in backends:
+        if backend == 'tfidf':
+            continue
+        # Same rows in the same order; only the features differ
+        candidate = MovieRecommendationSystem(dataset_path=dataset_path)
+        if not candidate.load_data(limit=limit):
+            return None
+        fit_seconds = train(candidate, backend,
+                            hashing_params if backend == 'hashing' else None, n_jobs, 0)
+        if fit_seconds is None:
+            return None
+        report = {'fit_seconds': fit_seconds,
+                  'shape': list(candidate.feature_matrix.shape),
+                  'nnz': int(candidate.feature_matrix.nnz)}
+        report.update(compare(reference, candidate, rows, k, {'nprobe': 0}))
+        reports[backend] = report
+        reports['tfidf'].update(p50_ms=report['reference_p50_ms'],
+                                p95_ms=report['reference_p95_ms'], recall_at_k=1.0)
+
+    sweep = ann_sweep(reference, rows, k, nprobes) if reference.ann_index is not None else []
+    embeddings = embedding_sweep(reference, rows, k, embedding_dims, embedding_dtypes)
+    return {'backends': reports, 'ann': sweep, 'embedding': embeddings}
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m ml_engine.benchmark',
+        description='Compare recall and latency of the feature backends against TF-IDF.')
+    parser.add_argument('--dataset', help='Dataset CSV (default: data/tmbd.csv)')
+    parser.add_argument('--limit', type=int, default=100000, help='CSV rows to load')
+    parser.add_argument('--queries', type=int, default=200, help='Movies to query')
+    parser.add_argument('-k', type=int, default=10, help='Recommendations per query')
+    parser.add_argument('--hash-features', type=int, help='Size of the hashed feature space')
+    parser.add_argument('--jobs', type=int, default=1,
+                        help='Worker processes for tokenizing and counting (0: all cores)')
+    parser.add_argument('--ann-lists', type=int,
+                        help='ANN index lists (default: about one per 1,000 movies, 0: no sweep)')
+    parser.add_argument('--nprobe', type=int, nargs='+', default=[1, 2, 4, 8, 16, 32],
+                        help='ANN lists probed per query to compare against exact search')
+    parser.add_argument('--embedding-dims', type=int, nargs='+', default=[],
+                        help='Truncated-SVD embedding dimensions to compare against exact search')
+    parser.add_argument('--embedding-dtypes', choices=EMBEDDING_DTYPES, nargs='+',
+                        default=['float32'], help='Stored embedding row types (default: float32)')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    hashing_params = {}
+    if args.hash_features is not None:
+        hashing_params['n_features'] = args.hash_features
+
+    reports = run(args.dataset, args.limit, args.queries, args.k,
+                  backends=[b for b in FEATURE_BACKENDS if b != 'tfidf'],
+                  hashing_params=hashing_params, n_jobs=args.jobs,
+                  ann_lists=args.ann_lists, nprobes=args.nprobe,
+                  embedding_dims=args.embedding_dims, embedding_dtypes=args.embedding_dtypes)
+    if reports is None:
+        print("❌ Benchmark failed")
+        return 1
+
+    print(f"\n{'backend':<10}{'fit s':>9}{'nnz':>12}{'p50 ms':>9}{'p95 ms':>9}{'recall@k':>10}")
+    for backend, report in reports['backends'].items():
+        print(f"{backend:<10}{report['fit_seconds']:>9.2f}{report['nnz']:>12,}"
+              f"{report.get('p50_ms', float('nan')):>9.2f}{report.get('p95_ms', float('nan')):>9.2f}"
+              f"{report.get('recall_at_k', float('nan')):>10.3f}")
+
+    if reports['ann']:
+        exact = reports['ann'][0]
+        print(f"\nANN vs exact search (exact p50 {exact['reference_p50_ms']:.2f} ms, "
+              f"p95 {exact['reference_p95_ms']:.2f} ms)")
+        print(f"{'nprobe':<10}{'p50 ms':>9}{'p95 ms':>9}{'recall@k':>10}")
+        for result in reports['ann']:
+            print(f"{result['nprobe']:<10}{result['p50_ms']:>9.2f}{result['p95_ms']:>9.2f}"
+                  f"{result['recall_at_k']:>10.3f}")
+
+    if reports['embedding']:
+        exact = reports['embedding'][0]
+        print(f"\nEmbedding vs exact search (exact p50 {exact['reference_p50_ms']:.2f} ms, "
+              f"p95 {exact['reference_p95_ms']:.2f} ms, "
+              f"sparse matrix {reports['backends']['tfidf']['nbytes'] / 1e6:.1f} MB)")
+        print(f"{'dims':<6}{'dtype':<9}{'fit s':>8}{'MB':>9}{'p50 ms':>9}{'p95 ms':>9}{'recall@k':>10}")
+        for result in reports['embedding']:
+            print(f"{result['dim']:<6}{result['dtype']:<9}{result['fit_seconds']:>8.2f}"
+                  f"{result['nbytes'] / 1e6:>9.1f}{result['p50_ms']:>9.2f}{result['p95_ms']:>9.2f}"
+                  f"{result['recall_at_k']:>10.3f}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
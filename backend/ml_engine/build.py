@@ -0,0 +1,183 @@
+"""
+Offline model build for the movie recommendation system
+Trains once and writes a content-addressed artifact directory that web workers only load
+
+Usage:
+    python -m ml_engine.build --dataset data/tmbd.csv --limit 1500000 --output models/
+"""
+
+import argparse
+import os
+import sys
+import time
+
+try:
+    from ml_engine.artifact import artifact_name, dataset_fingerprint, read_manifest
+    from ml_engine.embedding import EMBEDDING_DTYPES
+    from ml_engine.movie_recommendation_optimized import (
+        FEATURE_BACKENDS, MovieRecommendationSystem, artifact_config, make_vectorizer)
+except ImportError:  # running from inside ml_engine/
+    from artifact import artifact_name, dataset_fingerprint, read_manifest
+    from embedding import EMBEDDING_DTYPES
+    from movie_recommendation_optimized import (
+        FEATURE_BACKENDS, MovieRecommendationSystem, artifact_config, make_vectorizer)
+
+
+def build(dataset_path=None, output_dir='models/', load_limit=None, sample_size=None,
+          vectorizer_params=None, use_large_dataset=True, force=False, feature_backend='tfidf',
+          n_jobs=1, ann_lists=None, embedding_dim=None, embedding_dtype='float32',
+          neighbor_k=None):
+    """
+    Train a model and save it under `output_dir`
+
+    The directory name is derived from the dataset fingerprint and the build
+    parameters, so an identical build is reused instead of retrained.
+
+    Args:
+            dataset_path: CSV to train on (default dataset when None)
+            output_dir: Directory holding artifact directories (the service's MODEL_PATH)
+            load_limit: Maximum CSV rows to load (None for the whole file)
+            sample_size: Train on this many most popular movies (None for all loaded)
+            vectorizer_params: Vectorizer overrides
+            use_large_dataset: Use the TMDB dataset column mapping
+            force: Rebuild even if the artifact already exists
+            feature_backend: 'tfidf' or 'hashing'
+            n_jobs: Worker processes for tokenizing and counting (0: all cores)
+            ann_lists: ANN index lists (None or 0: no index, exact search)
+            embedding_dim: Truncated-SVD embedding dimensions (None: sparse search)
+            embedding_dtype: Stored embedding rows ('float32', 'float16' or 'int8')
+            neighbor_k: Precomputed neighbours per movie (None: no neighbour table)
+
+    Returns:
+            Artifact path, or None on failure
+    """
+    system = MovieRecommendationSystem(dataset_path=dataset_path,
+                                       use_large_dataset=use_large_dataset)
+    if not os.path.isfile(system.dataset_path):
+        print(f"❌ Dataset not found: {system.dataset_path}")
+        return None
+
+    config = artifact_config(dataset_fingerprint(system.dataset_path), load_limit,
+                             sample_size, make_vectorizer(vectorizer_params, feature_backend),
+                             ann_lists=ann_lists,
+                             embedding=({'dim': embedding_dim, 'dtype': embedding_dtype}
+                                        if embedding_dim else None),
+                             neighbor_k=neighbor_k)
+    path = os.path.join(output_dir, artifact_name(config))
+    if not force and os.path.isfile(os.path.join(path, 'manifest.json')):
+        try:
+            read_manifest(path)
+            print(f"✅ Artifact already built: {path}")
+            return path
+        except Exception as e:
+            print(f"⚠️ Rebuilding unusable artifact {path}: {e}")
+
+    started = time.perf_counter()
+    if not system.load_data(limit=load_limit):
+        return None
+    loaded = time.perf_counter()
+    if not system.train_model(sample_size=sample_size, vectorizer_params=vectorizer_params,
+                              feature_backend=feature_backend, n_jobs=n_jobs,
+                              ann_lists=ann_lists, embedding_dim=embedding_dim,
+                              embedding_dtype=embedding_dtype, neighbor_k=neighbor_k):
+        return None
+    trained = time.perf_counter()
+
+    timings = {
+        'load_seconds': round(loaded - started, 3),
+        'train_seconds': round(trained - loaded, 3),
+    }
+    if not system.save_model(path, extra={'build': {'timings': timings, 'config': config}}):
+        return None
+
+    print(f"⏱️ Load {timings['load_seconds']:.1f}s, train {timings['train_seconds']:.1f}s, "
+          f"save {time.perf_counter() - trained:.1f}s")
+    return path
+
+
+def _number(value):
+    """'2' -> 2, '0.9' -> 0.9 (sklearn treats int and float document frequencies differently)"""
+    try:
+        return int(value)
+    except ValueError:
+        return float(value)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m ml_engine.build',
+        description='Train the recommendation model once and write a model artifact.')
+    parser.add_argument('--dataset', help='Dataset CSV (default: data/tmbd.csv or data/movies.csv)')
+    parser.add_argument('--output', default=os.environ.get('MODEL_PATH', 'models/'),
+                        help='Artifact root directory (default: $MODEL_PATH or models/)')
+    parser.add_argument('--limit', type=int, default=None,
+                        help='Maximum CSV rows to load (default: whole file)')
+    parser.add_argument('--sample-size', type=int, default=None,
+                        help='Train on the N most popular movies (default: all loaded)')
+    parser.add_argument('--backend', choices=FEATURE_BACKENDS, default='tfidf',
+                        help='Feature backend (default: tfidf)')
+    parser.add_argument('--max-features', type=int, help='TF-IDF vocabulary size (tfidf backend)')
+    parser.add_argument('--hash-features', type=int,
+                        help='Size of the hashed feature space (hashing backend)')
+    parser.add_argument('--jobs', type=int, default=1,
+                        help='Worker processes for tokenizing and counting (0: all cores, default: 1)')
+    parser.add_argument('--ann-lists', type=int,
+                        help='Build an ANN index with N lists, about one per 1,000 movies '
+                             '(default: none, exact search)')
+    parser.add_argument('--embedding-dim', type=int,
+                        help='Search a truncated-SVD embedding of N dimensions (default: sparse search)')
+    parser.add_argument('--embedding-dtype', choices=EMBEDDING_DTYPES, default='float32',
+                        help='Stored embedding rows (default: float32)')
+    parser.add_argument('--neighbors', type=int, metavar='K',
+                        help='Precompute every movie\'s top K neighbours (uses --jobs processes)')
+    parser.add_argument('--min-df', type=_number, help='Minimum document frequency (count or ratio)')
+    parser.add_argument('--max-df', type=_number, help='Maximum document frequency (count or ratio)')
+    parser.add_argument('--ngram-max', type=int, help='Longest word n-gram')
+    parser.add_argument('--small-dataset', action='store_true',
+                        help='Use the original movies.csv column mapping')
+    parser.add_argument('--force', action='store_true', help='Rebuild an existing artifact')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    vectorizer_params = {}
+    if args.max_features is not None:
+        vectorizer_params['max_features'] = args.max_features
+    if args.min_df is not None:
+        vectorizer_params['min_df'] = args.min_df
+    if args.max_df is not None:
+        vectorizer_params['max_df'] = args.max_df
+    if args.ngram_max is not None:
+        vectorizer_params['ngram_range'] = (1, args.ngram_max)
+    if args.backend == 'hashing':
+        if vectorizer_params.pop('max_features', None) is not None:
+            print("⚠️ --max-features is ignored by the hashing backend (use --hash-features)")
+        if args.hash_features is not None:
+            vectorizer_params['n_features'] = args.hash_features
+
+    path = build(
+        dataset_path=args.dataset,
+        output_dir=args.output,
+        load_limit=args.limit,
+        sample_size=args.sample_size,
+        vectorizer_params=vectorizer_params,
+        use_large_dataset=not args.small_dataset,
+        force=args.force,
+        feature_backend=args.backend,
+        n_jobs=args.jobs,
+        ann_lists=args.ann_lists,
+        embedding_dim=args.embedding_dim,
+        embedding_dtype=args.embedding_dtype,
+        neighbor_k=args.neighbors
+    )
+    if path is None:
+        print("❌ Build failed")
+        return 1
+    print(f"📦 {path}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,368 @@
+"""
+Serving catalog for the movie recommendation system
+Columnar, pandas-free store of what responses need (titles, ids, year, popularity, genres)
+plus NumPy-backed id -> row maps, so the request path never touches a DataFrame
+"""
+
+import numpy as np
+import pandas as pd
+
+
+# Use a direct-address table when ids are at most this many times the row count
+DIRECT_ADDRESS_FACTOR = 4
+
+
+def parse_imdb_id(value):
+    """'tt0499549' -> 499549, anything else -> -1"""
+    if isinstance(value, str) and value.startswith('tt') and value[2:].isdigit():
+        return int(value[2:])
+    return -1
+
+
+class _IdMap:
+    """
+    Integer key -> first row holding it
+
+    Dense key ranges get a direct-address table (one array read per lookup);
+    sparse ones fall back to a sorted key array searched with searchsorted.
+    """
+
+    def __init__(self, table=None, keys=None, rows=None):
+        self.table = table
+        self.keys = keys
+        self.rows = rows
+
+    @classmethod
+    def build(cls, keys):
+        keys = np.asarray(keys, dtype=np.int64)
+        valid = np.flatnonzero(keys >= 0)
+        unique_keys, first = np.unique(keys[valid], return_index=True)
+        first_rows = valid[first].astype(np.int32)
+
+        if len(unique_keys) and unique_keys[-1] < DIRECT_ADDRESS_FACTOR * len(keys) + 1024:
+            table = np.full(int(unique_keys[-1]) + 1, -1, dtype=np.int32)
+            table[unique_keys] = first_rows
+            return cls(table=table)
+        return cls(keys=unique_keys, rows=first_rows)
+
+    def get(self, key):
+        if key < 0:
+            return None
+        if self.table is not None:
+            if key >= len(self.table):
+                return None
+            row = self.table[key]
+            return int(row) if row >= 0 else None
+        if self.keys is None:
+            return None
+        pos = np.searchsorted(self.keys, key)
+        if pos < len(self.keys) and self.keys[pos] == key:
+            return int(self.rows[pos])
+        return None
+
+    def to_arrays(self, prefix):
+        if self.table is not None:
+            return {f'{prefix}_table': self.table}
+        return {f'{prefix}_keys': self.keys, f'{prefix}_rows': self.rows}
+
+    @classmethod
+    def from_arrays(cls, arrays, prefix):
+        return cls(
+            table=arrays.get(f'{prefix}_table'),
+            keys=arrays.get(f'{prefix}_keys'),
+            rows=arrays.get(f'{prefix}_rows')
+        )
+
+
+class CatalogLookup:
+    """TMDB id -> row and IMDb `tt` id -> row for the matching dataset"""
+
+    def __init__(self, tmdb, imdb, size):
+        self._tmdb = tmdb
+        self._imdb = imdb
+        self.size = size
+
+    @classmethod
+    def build(cls, ids, imdb_ids=None):
+        """
+        Build lookups from catalog columns
+
+        Args:
+                ids: int64 TMDB ids per row (-1 when missing)
+                imdb_ids: int64 numeric IMDb ids per row (-1 when missing)
+        """
+        size = len(ids)
+        if imdb_ids is None:
+            imdb_ids = np.full(size, -1, dtype=np.int64)
+        return cls(_IdMap.build(ids), _IdMap.build(imdb_ids), size)
+
+    def __len__(self):
+        return self.size
+
+    def row_for_id(self, movie_id):
+        """Row of a TMDB id, or None"""
+        try:
+            return self._tmdb.get(int(movie_id))
+        except (TypeError, ValueError):
+            return None
+
+    def row_for_imdb(self, imdb_id):
+        """Row of an IMDb id such as 'tt0499549', or None"""
+        return self._imdb.get(parse_imdb_id(imdb_id))
+
+    def to_arrays(self):
+        """Plain NumPy arrays for persistence"""
+        arrays = {'size': np.array([self.size], dtype=np.int64)}
+        arrays.update(self._tmdb.to_arrays('tmdb'))
+        arrays.update(self._imdb.to_arrays('imdb'))
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        return cls(
+            _IdMap.from_arrays(arrays, 'tmdb'),
+            _IdMap.from_arrays(arrays, 'imdb'),
+            int(arrays['size'][0])
+        )
+
+
+def split_genres(value):
+    """Genre names from a 'Action, Science Fiction' string (whitespace-separated as a fallback)"""
+    if not isinstance(value, str):
+        return []
+    if ',' in value:
+        return [g.strip() for g in value.split(',') if g.strip()]
+    return [g.strip() for g in value.split() if g.strip()]
+
+
+if hasattr(np, 'bitwise_count'):
+    def _popcount(values):
+        return np.bitwise_count(values)
+else:
+    _POPCOUNT_TABLE = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+    def _popcount(values):
+        counts = _POPCOUNT_TABLE[values.view(np.uint8)]
+        return counts.reshape(values.shape + (8,)).sum(axis=-1, dtype=np.uint8)
+
+
+class GenreEncoder:
+    """
+    Genre vocabulary and per-movie bitmasks
+
+    Each movie's genres are one row of uint64 words (one bit per vocabulary genre),
+    so overlaps for any set of candidates are a single AND + popcount.
+    """
+
+    def __init__(self, vocabulary):
+        self.vocabulary = list(vocabulary)
+        self._bit = {genre: i for i, genre in enumerate(self.vocabulary)}
+        self.words = max(1, (len(self.vocabulary) + 63) // 64)
+
+    @classmethod
+    def fit(cls, genres):
+        """Build the vocabulary from an iterable of genre strings"""
+        vocabulary = set()
+        for value in genres:
+            vocabulary.update(split_genres(value))
+        return cls(sorted(vocabulary))
+
+    def _bits(self, value):
+        bits = 0
+        for genre in split_genres(value):
+            bit = self._bit.get(genre)
+            if bit is not None:
+                bits |= 1 << bit
+        return bits
+
+    def encode_one(self, value):
+        """Bitmask row for one genre string (unknown genres are ignored)"""
+        return self.encode([value])[0]
+
+    def encode(self, genres):
+        """(n_movies, words) uint64 bitmask matrix"""
+        # Genre strings repeat heavily, so parse each distinct one once
+        cache = {}
+        bits = []
+        for value in genres:
+            key = value if isinstance(value, str) else ''
+            mask = cache.get(key)
+            if mask is None:
+                mask = cache[key] = self._bits(key)
+            bits.append(mask)
+
+        masks = np.zeros((len(bits), self.words), dtype=np.uint64)
+        for word in range(self.words):
+            shift = 64 * word
+            masks[:, word] = np.fromiter(
+                ((b >> shift) & 0xFFFFFFFFFFFFFFFF for b in bits),
+                dtype=np.uint64, count=len(bits))
+        return masks
+
+
+def genre_overlap(masks, mask):
+    """Number of shared genres between each row of `masks` and `mask`"""
+    return _popcount(masks & mask).sum(axis=1, dtype=np.int64)
+
+
+class StringColumn:
+    """Strings packed into one contiguous UTF-8 buffer plus an offsets array"""
+
+    def __init__(self, buffer, offsets):
+        self.buffer = buffer
+        self.offsets = offsets
+
+    @classmethod
+    def from_strings(cls, values):
+        encoded = [v.encode('utf-8') if isinstance(v, str) else b'' for v in values]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum(np.fromiter(map(len, encoded), dtype=np.int64, count=len(encoded)),
+                  out=offsets[1:])
+        buffer = np.frombuffer(b''.join(encoded), dtype=np.uint8)
+        return cls(buffer, offsets)
+
+    @classmethod
+    def concat(cls, columns):
+        """One column holding the rows of `columns` in order"""
+        offsets = [np.zeros(1, dtype=np.int64)]
+        base = 0
+        for column in columns:
+            offsets.append(np.asarray(column.offsets[1:], dtype=np.int64) + base)
+            base += int(column.offsets[-1])
+        buffer = np.concatenate([np.asarray(c.buffer) for c in columns]) if columns else \
+            np.empty(0, dtype=np.uint8)
+        return cls(buffer, np.concatenate(offsets))
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, row):
+        return self.buffer[self.offsets[row]:self.offsets[row + 1]].tobytes().decode('utf-8')
+
+    def __iter__(self):
+        data = self.buffer.tobytes()
+        offsets = self.offsets.tolist()
+        for start, end in zip(offsets[:-1], offsets[1:]):
+            yield data[start:end].decode('utf-8')
+
+    @property
+    def nbytes(self):
+        return self.buffer.nbytes + self.offsets.nbytes
+
+    def to_arrays(self, prefix):
+        return {f'{prefix}_buffer': self.buffer, f'{prefix}_offsets': self.offsets}
+
+    @classmethod
+    def from_arrays(cls, arrays, prefix):
+        return cls(arrays[f'{prefix}_buffer'], arrays[f'{prefix}_offsets'])
+
+
+def _numeric_column(movies, column, dtype, default):
+    if column not in movies.columns:
+        return np.full(len(movies), default, dtype=dtype)
+    values = pd.to_numeric(movies[column], errors='coerce').fillna(default)
+    return values.to_numpy(dtype=dtype)
+
+
+class MovieCatalog:
+    """
+    Serving representation of the matching dataset, one entry per row
+
+    Only the columns responses and re-ranking need are kept, as NumPy arrays:
+    titles (UTF-8 buffer + offsets), TMDB id, IMDb id, release year, popularity
+    and a genre bitmask over `genre_encoder.vocabulary`.
+    """
+
+    def __init__(self, titles, ids, imdb_ids, years, popularity, genre_masks, genre_encoder):
+        self.titles = titles
+        self.ids = ids
+        self.imdb_ids = imdb_ids
+        self.years = years
+        self.popularity = popularity
+        self.genre_masks = genre_masks
+        self.genre_encoder = genre_encoder
+
+    @classmethod
+    def from_frame(cls, movies):
+        """Build the catalog from a prepared movies DataFrame (training time only)"""
+        size = len(movies)
+        if 'imdb_id' in movies.columns:
+            imdb_ids = np.fromiter((parse_imdb_id(v) for v in movies['imdb_id']),
+                                   dtype=np.int64, count=size)
+        else:
+            imdb_ids = np.full(size, -1, dtype=np.int64)
+        if 'release_date' in movies.columns:
+            years = pd.to_numeric(movies['release_date'].astype(str).str[:4], errors='coerce')
+            years = years.fillna(0).to_numpy(dtype=np.int16)
+        else:
+            years = np.zeros(size, dtype=np.int16)
+        genres = movies['genres'] if 'genres' in movies.columns else [''] * size
+        genre_encoder = GenreEncoder.fit(genres)
+
+        return cls(
+            titles=StringColumn.from_strings(movies['title']),
+            ids=_numeric_column(movies, 'id', np.int64, -1),
+            imdb_ids=imdb_ids,
+            years=years,
+            popularity=_numeric_column(movies, 'popularity', np.float32, 0),
+            genre_masks=genre_encoder.encode(genres),
+            genre_encoder=genre_encoder
+        )
+
+    def extended(self, movies):
+        """
+        New catalog with the rows of a prepared movies DataFrame appended
+
+        Existing genre bits keep their positions; genres not seen before get new bits.
+        """
+        added = MovieCatalog.from_frame(movies)
+        known = set(self.genre_encoder.vocabulary)
+        encoder = GenreEncoder(self.genre_encoder.vocabulary +
+                               [g for g in added.genre_encoder.vocabulary if g not in known])
+        genres = movies['genres'] if 'genres' in movies.columns else [''] * len(movies)
+        masks = np.zeros((len(self) + len(added), encoder.words), dtype=np.uint64)
+        masks[:len(self), :self.genre_masks.shape[1]] = self.genre_masks
+        masks[len(self):] = encoder.encode(genres)
+
+        return MovieCatalog(
+            titles=StringColumn.concat([self.titles, added.titles]),
+            ids=np.concatenate([self.ids, added.ids]),
+            imdb_ids=np.concatenate([self.imdb_ids, added.imdb_ids]),
+            years=np.concatenate([self.years, added.years]),
+            popularity=np.concatenate([self.popularity, added.popularity]),
+            genre_masks=masks,
+            genre_encoder=encoder
+        )
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def nbytes(self):
+        return (self.titles.nbytes + self.ids.nbytes + self.imdb_ids.nbytes +
+                self.years.nbytes + self.popularity.nbytes + self.genre_masks.nbytes)
+
+    def to_arrays(self):
+        """Plain NumPy arrays for persistence"""
+        arrays = {
+            'ids': self.ids,
+            'imdb_ids': self.imdb_ids,
+            'years': self.years,
+            'popularity': self.popularity,
+            'genre_masks': self.genre_masks,
+        }
+        arrays.update(self.titles.to_arrays('titles'))
+        arrays.update(StringColumn.from_strings(self.genre_encoder.vocabulary).to_arrays('genres'))
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        return cls(
+            titles=StringColumn.from_arrays(arrays, 'titles'),
+            ids=arrays['ids'],
+            imdb_ids=arrays['imdb_ids'],
+            years=arrays['years'],
+            popularity=arrays['popularity'],
+            genre_masks=arrays['genre_masks'],
+            genre_encoder=GenreEncoder(list(StringColumn.from_arrays(arrays, 'genres')))
+        )
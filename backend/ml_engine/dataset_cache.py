@@ -0,0 +1,134 @@
+"""
+Columnar cache of the parsed movie dataset
+An Arrow IPC file next to the CSV, keyed by the CSV's size, mtime and content fingerprint.
+Reads are memory-mapped and column-projected, so cold starts skip the CSV parse.
+pyarrow is optional: without it every load simply parses the CSV.
+"""
+
+import glob
+import os
+import uuid
+
+try:
+    import pyarrow as pa
+except ImportError:  # optional dependency
+    pa = None
+
+try:
+    from ml_engine.artifact import dataset_fingerprint
+except ImportError:  # running from inside ml_engine/
+    from artifact import dataset_fingerprint
+
+
+CACHE_SUFFIX = '.arrow'
+
+
+def cache_available():
+    """Whether pyarrow is installed"""
+    return pa is not None
+
+
+def _cache_glob(csv_path):
+    directory, name = os.path.split(os.path.abspath(csv_path))
+    return os.path.join(directory, f".{name}.*{CACHE_SUFFIX}")
+
+
+def _csv_key(csv_path):
+    """Metadata identifying the exact CSV a cache was built from"""
+    stat = os.stat(csv_path)
+    return {
+        'csv_size': str(stat.st_size),
+        'csv_mtime_ns': str(stat.st_mtime_ns),
+        'fingerprint': dataset_fingerprint(csv_path),
+    }
+
+
+def cache_path(csv_path, fingerprint):
+    """Cache file for a CSV with the given content fingerprint"""
+    directory, name = os.path.split(os.path.abspath(csv_path))
+    return os.path.join(directory, f".{name}.{fingerprint}{CACHE_SUFFIX}")
+
+
+def read_cached(csv_path, columns, limit=None, offset=0):
+    """
+    Read the cached dataset, if it is current
+
+    Args:
+            csv_path: Source CSV
+            columns: Columns to read (missing ones are skipped)
+            limit: Rows before this position only, like read_csv(nrows=...)
+            offset: Skip this many leading rows
+
+    Returns:
+            pyarrow.Table, or None when there is no valid cache
+    """
+    if pa is None or not os.path.isfile(csv_path):
+        return None
+    key = _csv_key(csv_path)
+    path = cache_path(csv_path, key['fingerprint'])
+    if not os.path.isfile(path):
+        return None
+
+    try:
+        reader = pa.ipc.open_file(pa.memory_map(path, 'r'))
+        metadata = {k.decode(): v.decode() for k, v in (reader.schema.metadata or {}).items()}
+        if any(metadata.get(k) != v for k, v in key.items()):
+            return None
+        table = reader.read_all()
+    except (OSError, pa.ArrowInvalid) as e:
+        print(f"⚠️ Ignoring unreadable dataset cache {path}: {e}")
+        return None
+
+    table = table.select([col for col in columns if col in table.column_names])
+    length = None if limit is None else max(limit - offset, 0)
+    return table.slice(offset, length)
+
+
+def write_cache(csv_path, frame, numeric_columns=()):
+    """
+    Write `frame` (the fully parsed CSV) as the cache for `csv_path`
+
+    Args:
+            csv_path: Source CSV
+            frame: DataFrame holding every row of the CSV
+            numeric_columns: Columns stored as float64 (others as strings)
+
+    Returns:
+            Cache path, or None if pyarrow is missing or the directory is not writable
+    """
+    if pa is None:
+        return None
+    import pandas as pd
+
+    key = _csv_key(csv_path)
+    path = cache_path(csv_path, key['fingerprint'])
+    arrays = {}
+    for col in frame.columns:
+        if col in numeric_columns:
+            values = pd.to_numeric(frame[col], errors='coerce')
+            arrays[col] = pa.array(values, type=pa.float64(), from_pandas=True)
+        else:
+            arrays[col] = pa.array(frame[col].astype(object), type=pa.large_string(),
+                                   from_pandas=True)
+    table = pa.table(arrays).replace_schema_metadata(key)
+
+    staging = f"{path}.tmp-{uuid.uuid4().hex}"
+    try:
+        with pa.OSFile(staging, 'wb') as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(staging, path)
+    except OSError as e:
+        print(f"⚠️ Could not write dataset cache next to {csv_path}: {e}")
+        if os.path.exists(staging):
+            os.remove(staging)
+        return None
+
+    # Caches of previous versions of the CSV are never valid again
+    for stale in glob.glob(_cache_glob(csv_path)):
+        if stale != path:
+            try:
+                os.remove(stale)
+            except OSError:
+                pass
+    return path
@@ -0,0 +1,164 @@
+"""
+Dense latent-semantic embeddings for the movie recommendation system
+A randomized truncated SVD projects the sparse TF-IDF rows onto `dim` components;
+similarity is then a contiguous matrix-vector product over an (n, dim) array that
+can be memory-mapped, instead of a sparse scan over the feature matrix.
+"""
+
+import numpy as np
+from sklearn.utils.extmath import randomized_svd
+
+
+EMBEDDING_DTYPES = ('float32', 'float16', 'int8')
+DEFAULT_EMBEDDING_DIM = 128
+# Components are fitted on at most this many rows (then every row is projected)
+SVD_SAMPLE_ROWS = 200000
+SVD_ITERATIONS = 4
+# Rows projected at once
+BLOCK_ROWS = 1 << 16
+# Rows up-cast to float32 at once while scoring float16/int8 (stays in cache)
+SCORE_BLOCK_ROWS = 2048
+
+
+def _normalize(vectors):
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1
+    return vectors / norms
+
+
+def _encode(vectors, dtype):
+    """
+    L2-normalized float32 rows -> stored rows (and per-row scales for int8)
+
+    int8 rows are scaled so their largest component is +-127; scores are
+    multiplied back by the row's scale.
+    """
+    if dtype != 'int8':
+        return vectors.astype(dtype), None
+    scales = np.abs(vectors).max(axis=1) / 127
+    scales[scales == 0] = 1
+    codes = np.rint(vectors / scales[:, None]).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+
+class LatentEmbedding:
+    """
+    Truncated-SVD projection of a feature matrix, answering top-k cosine queries
+
+    Stored rows are L2-normalized, so the dot product with a normalized query is
+    the cosine similarity in the latent space.
+    """
+
+    def __init__(self, components, vectors, scales=None):
+        self.components = components  # (dim, n_features) float32
+        self.vectors = vectors  # (n, dim) float32, float16 or int8 rows
+        self.scales = scales  # (n,) float32 per-row scale of int8 rows, else None
+
+    @classmethod
+    def fit(cls, matrix, dim=DEFAULT_EMBEDDING_DIM, dtype='float32', seed=0):
+        """
+        Fit `dim` components on (a sample of) `matrix` and project every row
+
+        Args:
+                matrix: CSR feature matrix
+                dim: Latent dimensions (capped by the matrix shape)
+                dtype: Stored row type, one of EMBEDDING_DTYPES
+                seed: Sampling and SVD randomness
+        """
+        if dtype not in EMBEDDING_DTYPES:
+            raise ValueError(f"Unknown embedding dtype '{dtype}' (expected one of {EMBEDDING_DTYPES})")
+        n_rows = matrix.shape[0]
+        dim = max(1, min(dim, min(matrix.shape) - 1))
+        rng = np.random.default_rng(seed)
+        sample = matrix
+        if n_rows > SVD_SAMPLE_ROWS:
+            sample = matrix[np.sort(rng.choice(n_rows, size=SVD_SAMPLE_ROWS, replace=False))]
+        _, _, vt = randomized_svd(sample, dim, n_iter=SVD_ITERATIONS, random_state=seed)
+        components = np.ascontiguousarray(vt, dtype=np.float32)
+        return cls(components, *_encode(cls._project(matrix, components), dtype))
+
+    @staticmethod
+    def _project(matrix, components):
+        """L2-normalized float32 projections of the rows of `matrix`"""
+        projected = np.empty((matrix.shape[0], components.shape[0]), dtype=np.float32)
+        components_t = components.T
+        for start in range(0, matrix.shape[0], BLOCK_ROWS):
+            block = np.asarray(matrix[start:start + BLOCK_ROWS] @ components_t)
+            projected[start:start + BLOCK_ROWS] = _normalize(block)
+        return projected
+
+    @property
+    def dim(self):
+        return self.components.shape[0]
+
+    @property
+    def dtype(self):
+        return self.vectors.dtype.name
+
+    def __len__(self):
+        return self.vectors.shape[0]
+
+    @property
+    def nbytes(self):
+        """Stored rows only (the components are small and not scanned per query)"""
+        return self.vectors.nbytes + (self.scales.nbytes if self.scales is not None else 0)
+
+    def extended(self, matrix, start):
+        """New embedding that also projects rows start..matrix.shape[0] of `matrix`"""
+        vectors, scales = _encode(self._project(matrix[start:], self.components), self.dtype)
+        return LatentEmbedding(
+            self.components, np.concatenate([self.vectors, vectors]),
+            np.concatenate([self.scales, scales]) if self.scales is not None else None)
+
+    def scores(self, query):
+        """Cosine similarity of every stored row to a (1, n_features) sparse query"""
+        return self.batch_scores(query).ravel()
+
+    def batch_scores(self, queries):
+        """
+        (n, len(queries)) cosine similarities of every stored row to sparse queries
+
+        float32 rows are scored with one GEMV/GEMM; float16/int8 rows are up-cast a
+        block at a time (NumPy has no BLAS kernels for them). int8 scans about as
+        fast as float32; float16 conversion is slow in NumPy, so float16 saves
+        memory at the cost of latency.
+        """
+        return self.block_scores(self.project(queries), 0, len(self))
+
+    def project(self, queries):
+        """(dim, len(queries)) normalized projection of sparse queries, for block_scores"""
+        return _normalize(np.asarray(queries @ self.components.T, dtype=np.float32)).T
+
+    def block_scores(self, projected, start, end):
+        """(end - start, n) similarities of stored rows start..end to projected queries"""
+        if self.vectors.dtype == np.float32:
+            return self.vectors[start:end] @ projected
+        scores = np.empty((end - start, projected.shape[1]), dtype=np.float32)
+        for offset in range(start, end, SCORE_BLOCK_ROWS):
+            block = self.vectors[offset:min(offset + SCORE_BLOCK_ROWS, end)].astype(np.float32)
+            scores[offset - start:offset - start + len(block)] = block @ projected
+        if self.scales is not None:
+            scores *= self.scales[start:end, None]
+        return scores
+
+    def search(self, query, k):
+        """(rows, scores) of the k rows most similar to `query`, best first"""
+        scores = self.scores(query)
+        if k < len(scores):
+            top = np.argpartition(scores, -k)[-k:]
+        else:
+            top = np.arange(len(scores))
+        top = top[np.argsort(scores[top])[::-1]]
+        return top, scores[top]
+
+    def to_arrays(self):
+        """Plain NumPy arrays for persistence"""
+        arrays = {'components': self.components, 'vectors': self.vectors}
+        if self.scales is not None:
+            arrays['scales'] = self.scales
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        """Rebuild an embedding from to_arrays() output"""
+        return cls(arrays['components'], arrays['vectors'], arrays.get('scales'))
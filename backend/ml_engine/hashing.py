@@ -0,0 +1,146 @@
+"""
+Feature-hashing TF-IDF backend for the movie recommendation system
+Terms are hashed into a fixed space, so chunks are vectorized independently (in parallel
+processes if wanted) and IDF is accumulated from per-chunk document frequencies.
+Nothing needs a global vocabulary pass and new movies never require a refit.
+"""
+
+import numpy as np
+from scipy.sparse import csr_matrix, vstack
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.preprocessing import normalize
+
+try:
+    from ml_engine.parallel import map_chunks
+except ImportError:  # running from inside ml_engine/
+    from parallel import map_chunks
+
+
+def _hashing_vectorizer(n_features, ngram_range, stop_words, dtype):
+    return HashingVectorizer(
+        n_features=n_features,
+        ngram_range=tuple(ngram_range),
+        stop_words=stop_words,
+        alternate_sign=False,
+        norm=None,
+        dtype=dtype
+    )
+
+
+def _count_documents(params, weights, documents):
+    """
+    Hashed term counts of one chunk (module level so worker processes can run it)
+
+    With `weights`, `documents` holds one list per field; each field is hashed
+    once and its counts are scaled by the field weight and summed.
+    """
+    vectorizer = _hashing_vectorizer(**params)
+    if weights is None:
+        return vectorizer.transform(documents).tocsr()
+    counts = None
+    for field_documents, weight in zip(documents, weights):
+        field_counts = vectorizer.transform(field_documents)
+        if weight != 1:
+            field_counts = field_counts * weight
+        counts = field_counts if counts is None else counts + field_counts
+    return counts.tocsr()
+
+
+class HashingTfidfVectorizer:
+    """
+    TF-IDF over hashed terms, with IDF statistics accumulated separately
+
+    Mirrors the parts of TfidfVectorizer the model uses (transform, idf_, get_params)
+    and uses the same smoothed IDF, min_df/max_df pruning and l2 normalization.
+    """
+
+    def __init__(self, n_features=2 ** 18, ngram_range=(1, 2), stop_words='english',
+                 min_df=2, max_df=0.9, norm='l2', dtype=np.float32, n_jobs=1):
+        self.n_features = n_features
+        self.ngram_range = tuple(ngram_range)
+        self.stop_words = stop_words
+        self.min_df = min_df
+        self.max_df = max_df
+        self.norm = norm
+        self.dtype = dtype
+        self.n_jobs = n_jobs
+        self.df_ = np.zeros(n_features, dtype=np.int64)
+        self.n_docs_ = 0
+        self.idf_ = None
+
+    def get_params(self, deep=True):
+        return {
+            'n_features': self.n_features,
+            'ngram_range': self.ngram_range,
+            'stop_words': self.stop_words,
+            'min_df': self.min_df,
+            'max_df': self.max_df,
+            'norm': self.norm,
+            'dtype': self.dtype,
+            'n_jobs': self.n_jobs,
+        }
+
+    def _hashing_params(self):
+        return {'n_features': self.n_features, 'ngram_range': self.ngram_range,
+                'stop_words': self.stop_words, 'dtype': self.dtype}
+
+    def count(self, documents, weights=None):
+        """Hashed term count matrix of `documents` (per-field lists with `weights`)"""
+        return _count_documents(self._hashing_params(), weights, documents)
+
+    def partial_fit(self, counts):
+        """Accumulate document frequencies from a count matrix"""
+        self.df_ += np.bincount(counts.indices, minlength=self.n_features)
+        self.n_docs_ += counts.shape[0]
+        self._update_idf()
+        return self
+
+    def _update_idf(self):
+        n_docs = self.n_docs_
+        high = self.max_df if isinstance(self.max_df, (int, np.integer)) else self.max_df * n_docs
+        low = self.min_df if isinstance(self.min_df, (int, np.integer)) else self.min_df * n_docs
+        # Same smoothing as TfidfTransformer; pruned terms get weight 0
+        idf = np.log((1.0 + n_docs) / (1.0 + self.df_)) + 1.0
+        idf[(self.df_ < low) | (self.df_ > high)] = 0.0
+        self.idf_ = idf.astype(self.dtype)
+
+    def _weight(self, counts):
+        counts = counts.astype(self.dtype, copy=False)
+        counts.data *= self.idf_[counts.indices]
+        counts.eliminate_zeros()
+        if self.norm is not None:
+            counts = normalize(counts, norm=self.norm, copy=False)
+        return csr_matrix(counts)
+
+    def fit_transform_chunks(self, chunks, weights=None):
+        """
+        Fit IDF over an iterable of document chunks and return the TF-IDF matrix
+
+        Each chunk is hashed (in parallel when n_jobs > 1) and its counts kept
+        until the document frequencies of the whole corpus are known.
+
+        Args:
+                chunks: Iterable of lists of documents (per-field lists with `weights`)
+                weights: Count multiplier of each field
+        """
+        counts = []
+        for chunk_counts in map_chunks(_count_documents, chunks, self.n_jobs,
+                                       args=(self._hashing_params(), weights)):
+            self.partial_fit(chunk_counts)
+            counts.append(chunk_counts)
+        if not counts or self.n_docs_ == 0:
+            raise ValueError("no documents to vectorize")
+        return self._weight(vstack(counts, format='csr'))
+
+    def fit_transform(self, documents):
+        return self.fit_transform_chunks([documents])
+
+    def transform(self, documents):
+        """TF-IDF vectors of `documents` with the fitted IDF"""
+        return self.transform_fields(documents, None)
+
+    def transform_fields(self, fields, weights):
+        """TF-IDF vectors of weighted-field documents (see fit_transform_chunks)"""
+        if self.idf_ is None:
+            raise ValueError("HashingTfidfVectorizer is not fitted")
+        return self._weight(self.count(fields, weights))
@@ -5,30 +5,145 @@ Ready for production integration with your movie API
 
 import numpy as np
 import pandas as pd
-import difflib
+from pandas.api.types import union_categoricals
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
-import pickle
+from sklearn.preprocessing import normalize
+from scipy.sparse import csr_matrix, issparse, vstack
 import os
 from datetime import datetime
 
+try:
+    from ml_engine.artifact import (build_key, dataset_fingerprint, group, prefixed,
+                                    read_artifact, write_artifact)
+    from ml_engine.catalog import CatalogLookup, MovieCatalog, StringColumn, genre_overlap
+    from ml_engine.dataset_cache import cache_available, read_cached, write_cache
+    from ml_engine.ann import IVFIndex
+    from ml_engine.embedding import LatentEmbedding
+    from ml_engine.hashing import HashingTfidfVectorizer
+    from ml_engine.neighbors import NeighborTable
+    from ml_engine.parallel import resolve_jobs
+    from ml_engine.tfidf import fit_transform_chunks, transform_fields
+    from ml_engine.title_index import TitleIndex
+except ImportError:  # running this file directly from inside ml_engine/
+    from artifact import (build_key, dataset_fingerprint, group, prefixed,
+                          read_artifact, write_artifact)
+    from catalog import CatalogLookup, MovieCatalog, StringColumn, genre_overlap
+    from dataset_cache import cache_available, read_cached, write_cache
+    from ann import IVFIndex
+    from embedding import LatentEmbedding
+    from hashing import HashingTfidfVectorizer
+    from neighbors import NeighborTable
+    from parallel import resolve_jobs
+    from tfidf import fit_transform_chunks, transform_fields
+    from title_index import TitleIndex
+
+
+# Columns read from tmbd.csv; everything else in the file is skipped while parsing
+TMDB_COLUMNS = [
+    'id', 'imdb_id', 'title', 'genres', 'keywords', 'tagline', 'overview',
+    'original_language', 'spoken_languages', 'production_countries',
+    'popularity', 'release_date'
+]
+# Pinned parse dtypes (str when not listed); a few hundred languages repeat across 1M+ rows
+TMDB_DTYPES = {'id': 'float64', 'popularity': 'float64', 'original_language': 'category'}
+# Rows per CSV chunk and per TF-IDF counting chunk
+CSV_CHUNK_ROWS = 100000
+
+# Text fields and their weights: each field is tokenized once and its term counts are
+# scaled in feature space, instead of repeating genres 4x and keywords 2x in one string
+FIELD_WEIGHTS = {'genres': 4, 'keywords': 2, 'overview': 1, 'original_language': 1}
+# Raw fields kept for movies outside the trained matrix so they can still be vectorized
+QUERY_FIELDS = tuple(FIELD_WEIGHTS)
+_FIELD_SEP = '\x1f'
+
+
+# Cap on (catalog rows x seeds) similarities materialized by one block of a batch:
+# 1 << 22 float32 cells is 16 MB of scores per batch call in flight, so a worker
+# needs at most 16 MB per request thread (50 seeds: blocks of ~84k catalog rows)
+BATCH_SCORE_CELLS = 1 << 22
+
+
+def _candidate_count(num_recommendations):
+    """Candidates re-ranked for num_recommendations (room for duplicates and the seed)"""
+    return max(num_recommendations * 3, num_recommendations + 10)
+
+
+def _top_scores(sim_row, num_candidates):
+    """(rows, scores) of the num_candidates best entries of a similarity row, best first"""
+    # Use argpartition to get top candidates
+    if num_candidates < len(sim_row):
+        top_idx = np.argpartition(sim_row, -num_candidates)[-num_candidates:]
+        top_scores = sim_row[top_idx]
+        order = np.argsort(top_scores)[::-1]
+        sorted_indices = top_idx[order]
+    else:
+        sorted_indices = np.argsort(sim_row)[::-1]
+    return sorted_indices, sim_row[sorted_indices]
+
+
+def _fill_missing(frame):
+    """Missing values -> '' in every column but id, keeping categorical columns categorical"""
+    filled = {}
+    for col in frame.columns:
+        values = frame[col]
+        if col != 'id':
+            if isinstance(values.dtype, pd.CategoricalDtype) and '' not in values.cat.categories:
+                values = values.cat.add_categories([''])
+            values = values.fillna('')
+        filled[col] = values
+    return pd.DataFrame(filled)
+
+
+def _concat_chunks(chunks, columns, dtypes):
+    """One frame from parsed CSV chunks (empty frame with `columns` for none)"""
+    if not chunks:
+        return pd.DataFrame(columns=columns)
+    # Categories differ per chunk; union them so the column stays categorical
+    categorical = {col: union_categoricals([c[col] for c in chunks])
+                   for col in columns if dtypes[col] == 'category'}
+    movies = pd.concat(chunks, ignore_index=True)
+    for col, values in categorical.items():
+        movies[col] = values
+    return movies
+
 
 class MovieRecommendationSystem:
-    def __init__(self, dataset_path=None, use_large_dataset=True):
+    def __init__(self, dataset_path=None, use_large_dataset=True, dataset_cache=True):
         """
         Initialize the recommendation system
 
         Args:
                 dataset_path: Path to CSV file (optional)
                 use_large_dataset: If True, use tmbd.csv (1.3M movies), else use movies.csv (4.8K movies)
+                dataset_cache: Read/write the columnar cache next to tmbd.csv (needs pyarrow)
         """
         self.use_large_dataset = use_large_dataset
+        self.dataset_cache = dataset_cache
         self.dataset_path = dataset_path or self._get_default_dataset_path()
-        self.movies_data = None  # training dataset (may be a sample)
-        self.full_movies_data = None  # full dataset for matching
+        self.movies_data = None  # training dataset (may be a sample), dropped after training
+        self.full_movies_data = None  # full dataset for matching, dropped after training
+        self.catalog = None  # columnar serving store over the matching dataset
         self.vectorizer = None
+        self.field_weights = dict(FIELD_WEIGHTS)  # text field -> term count multiplier
         self.feature_matrix = None  # sparse TF-IDF matrix
+        self.train_rows = None  # catalog row of each feature_matrix row (None: identity)
+        self._matrix_rows = None  # inverse of train_rows, -1 for rows outside the matrix
+        self._query_fields = None  # packed QUERY_FIELDS for catalog rows outside the matrix
+        self.title_index = None  # title -> catalog row resolution
+        self.lookup = None  # TMDB/IMDb id -> catalog row
+        self.ann_index = None  # IVFIndex over feature_matrix rows (None: exact search only)
+        self.ann_lists = None  # requested list count (None or 0: no index)
+        self.embedding = None  # LatentEmbedding of feature_matrix rows (None: sparse search)
+        self.embedding_params = None  # requested {'dim', 'dtype'} of the embedding mode
+        self.neighbors = None  # NeighborTable of precomputed top-k rows (None: computed per query)
+        self.neighbor_k = None  # requested neighbours per movie of the table
         self.is_trained = False
+        # Provenance recorded in saved artifacts
+        self.dataset_fingerprint = None
+        self.load_limit = None
+        self.sample_size = None
+        self.fit_limit = None  # rows the vectorizer was fitted on, when fewer than load_limit
 
         print(f"🎬 Initializing Movie Recommendation System...")
         print(f"📊 Dataset: {self.dataset_path}")
@@ -55,8 +170,12 @@ class MovieRecommendationSystem:
             print(f"⚠️ Limit set to {limit} rows")
 
         try:
+            is_tmbd = self.use_large_dataset and 'tmbd.csv' in self.dataset_path
             # Load the dataset with optional limit
-            if limit:
+            if is_tmbd:
+                # Only the used columns, pinned dtypes, filled chunk by chunk
+                self.movies_data = self._read_tmbd_csv(limit)
+            elif limit:
                 self.movies_data = pd.read_csv(self.dataset_path, nrows=limit)
             else:
                 self.movies_data = pd.read_csv(self.dataset_path)
@@ -69,39 +188,87 @@ class MovieRecommendationSystem:
                 print(self.movies_data.head())
 
             # Clean and prepare data based on dataset type
-            if self.use_large_dataset and 'tmbd.csv' in self.dataset_path:
+            if is_tmbd:
                 self._prepare_tmbd_data()
             else:
                 self._prepare_original_data()
 
             print(f"🔧 Data preprocessing completed")
-            # Keep a full copy for robust title matching
-            self.full_movies_data = self.movies_data.copy()
+            # Matching dataset for title/id lookups; train_model replaces movies_data
+            # instead of mutating it, so this is a reference rather than a copy
+            self.full_movies_data = self.movies_data
+            self.train_rows = None
+            self._matrix_rows = None
+            self.dataset_fingerprint = dataset_fingerprint(self.dataset_path)
+            self.load_limit = limit
             return True
 
         except Exception as e:
             print(f"❌ Error loading data: {e}")
             return False
 
-    def _prepare_tmbd_data(self):
-        """Prepare TMDB dataset (1.3M movies)"""
-        # Select relevant columns and rename for consistency
-        required_columns = [
-            'id', 'title', 'genres', 'keywords', 'tagline', 'overview',
-            'original_language', 'spoken_languages', 'production_countries'
-        ]
+    def _read_tmbd_csv(self, limit=None, offset=0):
+        """
+        Stream the TMDB CSV in chunks
 
-        # Check which columns exist
-        available_columns = [
-            col for col in required_columns if col in self.movies_data.columns]
+        Only TMDB_COLUMNS are parsed, with pinned dtypes, and each chunk is filled
+        before the next is read, so the raw all-columns frame never exists.
 
-        # Create a simplified dataset with available features
-        self.movies_data = self.movies_data[available_columns].copy()
+        Args:
+                limit: Rows before this position only (None for the whole file)
+                offset: Drop this many leading rows (slice of the cache, or parsed and
+                        discarded from the CSV since quoted overviews can span lines)
+        """
+        # Columnar cache from a previous full read of this exact file
+        table = None
+        if self.dataset_cache:
+            table = read_cached(self.dataset_path, TMDB_COLUMNS, limit, offset)
+        if table is not None:
+            print("⚡ Reading columnar dataset cache...")
+            movies = table.to_pandas()
+            for col in movies.columns:
+                if TMDB_DTYPES.get(col) == 'category':
+                    movies[col] = movies[col].astype('category')
+            return _fill_missing(movies)
+
+        header = pd.read_csv(self.dataset_path, nrows=0).columns
+        columns = [col for col in TMDB_COLUMNS if col in header]
+        dtypes = {col: TMDB_DTYPES.get(col, str) for col in columns}
+
+        # Leading rows are parsed anyway; keep them in case this read reaches the
+        # end of the file and the whole dataset can be cached
+        keep_leading = self.dataset_cache and offset > 0 and cache_available()
+        leading, chunks = [], []
+        skip = offset
+        reader = pd.read_csv(self.dataset_path, usecols=columns, dtype=dtypes,
+                             nrows=limit, chunksize=CSV_CHUNK_ROWS)
+        for chunk in reader:
+            if skip:
+                dropped = min(skip, len(chunk))
+                skip -= dropped
+                if keep_leading:
+                    leading.append(_fill_missing(chunk.iloc[:dropped][columns]))
+                chunk = chunk.iloc[dropped:]
+                if chunk.empty:
+                    continue
+            chunks.append(_fill_missing(chunk[columns]))
 
-        # Fill missing values
-        for col in self.movies_data.columns:
-            if col != 'id':
-                self.movies_data[col] = self.movies_data[col].fillna('')
+        movies = _concat_chunks(chunks, columns, dtypes)
+        parsed = offset - skip + len(movies)
+
+        # The whole file was parsed: cache it so later loads skip the CSV
+        if (self.dataset_cache and (offset == 0 or keep_leading)
+                and (limit is None or parsed < limit)):
+            whole = movies if offset == 0 else _concat_chunks(leading + chunks, columns, dtypes)
+            numeric = [col for col in columns if TMDB_DTYPES.get(col) == 'float64']
+            cached = write_cache(self.dataset_path, whole, numeric_columns=numeric)
+            if cached:
+                print(f"💾 Dataset cache written to {cached}")
+        return movies
+
+    def _prepare_tmbd_data(self):
+        """Prepare TMDB dataset (1.3M movies)"""
+        # Column selection and missing-value filling happen while streaming (_read_tmbd_csv)
 
         # Create a simple index
         self.movies_data['index'] = range(len(self.movies_data))
@@ -130,12 +297,27 @@ class MovieRecommendationSystem:
         for feature in self.feature_columns:
             self.movies_data[feature] = self.movies_data[feature].fillna('')
 
-    def train_model(self, sample_size=None):
+    def train_model(self, sample_size=None, vectorizer_params=None, feature_backend='tfidf',
+                    n_jobs=1, ann_lists=None, embedding_dim=None, embedding_dtype='float32',
+                    neighbor_k=None):
         """
         Train the recommendation model
 
         Args:
                 sample_size: If specified, use only a sample of movies for faster training
+                vectorizer_params: Overrides on top of the backend's default parameters
+                feature_backend: 'tfidf' (global vocabulary) or 'hashing' (hashed terms,
+                        stateless and parallel; see ml_engine/hashing.py)
+                n_jobs: Worker processes for tokenizing and counting (0: all cores);
+                        the trained model is identical for any value
+                ann_lists: Inverted lists of an ANN index (None or 0: no index, exact
+                        search); opt-in, since results become approximate
+                embedding_dim: Search a truncated-SVD embedding of this many dimensions
+                        instead of the sparse matrix (None: sparse search)
+                embedding_dtype: Stored embedding rows, 'float32', 'float16' or 'int8'
+                neighbor_k: Precompute every movie's neighbours, enough that
+                        recommendations for up to neighbor_k movies are a table
+                        lookup (None: no table); uses n_jobs processes
         """
         if self.movies_data is None:
             print("❌ Please load data first")
@@ -144,69 +326,64 @@ class MovieRecommendationSystem:
         print("🤖 Training recommendation model...")
 
         try:
+            self.sample_size = sample_size
+            self.fit_limit = None
             # Sample data if specified (useful for large datasets)
             if sample_size and len(self.movies_data) > sample_size:
                 print(
                     f"📊 Sampling {sample_size:,} movies for faster training...")
                 if 'popularity' in self.movies_data.columns:
                     # Prefer most popular titles to keep well-known movies like 'Avatar'
-                    sampled = self.movies_data.copy()
-                    # Ensure numeric popularity
-                    sampled['popularity_num'] = pd.to_numeric(
-                        sampled['popularity'], errors='coerce').fillna(0)
-                    sampled = sampled.sort_values(
-                        'popularity_num', ascending=False).head(sample_size)
-                    sampled = sampled.drop(columns=['popularity_num'])
+                    # (ranks the popularity column alone instead of copying the frame)
+                    popularity = pd.to_numeric(
+                        self.movies_data['popularity'], errors='coerce').fillna(0)
+                    top = popularity.sort_values(ascending=False).head(sample_size).index
+                    sampled = self.movies_data.loc[top]
                 else:
                     sampled = self.movies_data.sample(
                         n=sample_size, random_state=42)
 
+                # Remember where each sampled row lives in the matching dataset
+                self.train_rows = self.movies_data.index.get_indexer(
+                    sampled.index).astype(np.int32)
+                self._matrix_rows = np.full(
+                    len(self.matching_data()), -1, dtype=np.int32)
+                self._matrix_rows[self.train_rows] = np.arange(
+                    len(self.train_rows), dtype=np.int32)
+
                 self.movies_data = sampled.reset_index(drop=True)
                 self.movies_data['index'] = range(len(self.movies_data))
 
-            # Combine features with optimized weighting
-            print("🎯 Creating optimized weighted features...")
-
-            # Create weighted features using vectorized operations (no Python loops)
-            # High weight: genres (4x) + keywords (2x) + overview + language
-            def _safe_fill(col):
-                if col in self.movies_data:
-                    return self.movies_data[col].fillna('').astype(str)
-                return pd.Series([''] * len(self.movies_data))
-
-            genres_s = _safe_fill('genres')
-            # Replace commas with spaces for TF-IDF to handle tokens like "Science Fiction" as simplified tokens or n-grams if configured
-            # But better to keep them as text. "Science Fiction" -> "Science", "Fiction" works for similarity.
-            # We just explicitly weight it higher.
-            
-            keywords_s = _safe_fill('keywords')
-            overview_s = _safe_fill('overview')
-            lang_s = _safe_fill('original_language')
-
-            # build combined series efficiently - Increase genre weight to 4x
-            combined_features = (
-                genres_s + ' ' + genres_s + ' ' + genres_s + ' ' + genres_s + ' ' +
-                keywords_s + ' ' + keywords_s + ' ' +
-                overview_s + ' ' + lang_s
-            )
-
             # Vectorize features with optimized parameters
             print("⚡ Creating optimized TF-IDF vectors...")
-            self.vectorizer = TfidfVectorizer(
-                max_features=5000,        # Increased from 2000 for better nuance
-                stop_words='english',
-                ngram_range=(1, 2),       # Use bigrams to capture "Science Fiction" as a unit
-                min_df=2,                 # Lower threshold
-                max_df=0.9,
-                dtype=np.float32,
-                norm='l2'
-            )
-
-            # Build sparse TF-IDF matrix
-            self.feature_matrix = self.vectorizer.fit_transform(
-                combined_features)
+            self.vectorizer = make_vectorizer(vectorizer_params, feature_backend)
+
+            # Build sparse TF-IDF matrix; weighted feature strings are built and
+            # counted one chunk at a time so the full text corpus never exists at once
+            n_jobs = resolve_jobs(n_jobs)
+            chunks = self._feature_chunks(self._fit_chunk_rows(n_jobs))
+            weights = tuple(self.field_weights.values())
+            if isinstance(self.vectorizer, HashingTfidfVectorizer):
+                self.vectorizer.n_jobs = n_jobs
+                self.feature_matrix = self.vectorizer.fit_transform_chunks(chunks, weights)
+            else:
+                self.feature_matrix = fit_transform_chunks(
+                    self.vectorizer, chunks, n_jobs, weights)
             print(f"📐 Feature matrix shape: {self.feature_matrix.shape}")
+            self.ann_lists = ann_lists
+            self.embedding_params = None
+            self.embedding = None
+            if embedding_dim:
+                self.embedding_params = {'dim': embedding_dim, 'dtype': embedding_dtype}
+                self.embedding = self._build_embedding(embedding_dim, embedding_dtype)
+                # The embedding replaces sparse search, so no sparse ANN index either
+                self.ann_index = None
+            else:
+                self.ann_index = self._build_ann_index(ann_lists)
+            self.neighbor_k = neighbor_k
+            self.neighbors = self._build_neighbors(neighbor_k, n_jobs) if neighbor_k else None
 
+            self._build_serving_store()
             self.is_trained = True
             print("✅ Model training completed!")
             return True
@@ -215,13 +392,214 @@ class MovieRecommendationSystem:
             print(f"❌ Error training model: {e}")
             return False
 
-    def get_recommendations(self, movie_name, num_recommendations=10):
+    def _fit_chunk_rows(self, n_jobs):
+        """Chunk size giving every worker a couple of chunks (CSV_CHUNK_ROWS at most)"""
+        if n_jobs <= 1:
+            return CSV_CHUNK_ROWS
+        return max(1000, min(CSV_CHUNK_ROWS, -(-len(self.movies_data) // (2 * n_jobs))))
+
+    def _build_ann_index(self, nlist=None):
+        """IVF index over the feature matrix with `nlist` lists, or None when not requested"""
+        if not nlist:
+            return None
+        print("🧭 Building ANN index...")
+        index = IVFIndex.build(self.feature_matrix, nlist)
+        print(f"🧭 ANN index ready ({index.nlist:,} lists, {index.nbytes / 1e6:.1f} MB)")
+        return index
+
+    def _build_embedding(self, dim, dtype):
+        """Truncated-SVD embedding of the feature matrix"""
+        print(f"🧮 Fitting {dim}-dimensional {dtype} embedding...")
+        embedding = LatentEmbedding.fit(self.feature_matrix, dim, dtype)
+        print(f"🧮 Embedding ready ({embedding.dim} dims, {embedding.nbytes / 1e6:.1f} MB)")
+        return embedding
+
+    def rebuild_neighbors(self, k, n_jobs=1):
+        """
+        Recompute the neighbour table, e.g. for a model made by extended()
+
+        Args:
+                k: Neighbours per movie
+                n_jobs: Worker processes
+        """
+        self.neighbors = self._build_neighbors(k, n_jobs)
+        self.neighbor_k = k
+
+    def _build_neighbors(self, k, n_jobs=1):
+        """Neighbour table serving up to k recommendations per movie"""
+        # Candidate pool of a k-movie request, plus the movie itself (first in its list)
+        width = _candidate_count(k) + 1
+        print(f"🧮 Precomputing top-{width} neighbours of {self.feature_matrix.shape[0]:,} movies...")
+        table = NeighborTable.compute(self.feature_matrix, width, n_jobs)
+        print(f"🧮 Neighbour table ready ({table.nbytes / 1e6:.1f} MB)")
+        return table
+
+    def _feature_chunks(self, chunk_rows=None):
+        """
+        Text fields of the training rows, CSV_CHUNK_ROWS at a time
+
+        Yields a tuple of per-field string lists, in field_weights order
+        """
+        chunk_rows = chunk_rows or CSV_CHUNK_ROWS
+        movies = self.movies_data
+
+        def _safe_fill(chunk, col):
+            if col in chunk:
+                return chunk[col].fillna('').astype(str).to_numpy(dtype=object)
+            return [''] * len(chunk)
+
+        for start in range(0, len(movies), chunk_rows):
+            chunk = movies.iloc[start:start + chunk_rows]
+            yield tuple(_safe_fill(chunk, col) for col in self.field_weights)
+
+    def _vectorize_fields(self, fields):
+        """TF-IDF rows of per-field string lists, weighted exactly like the training rows"""
+        weights = tuple(self.field_weights.values())
+        if isinstance(self.vectorizer, HashingTfidfVectorizer):
+            return self.vectorizer.transform_fields(fields, weights)
+        return transform_fields(self.vectorizer, fields, weights)
+
+    def _build_serving_store(self):
+        """
+        Build the columnar catalog and lookups, then drop the training DataFrames
+
+        Requests only need titles, ids, year, popularity and genres; the text
+        columns are kept solely (packed) for rows outside the trained matrix.
+        """
+        source_df = self.matching_data()
+        print("🗂️ Building serving catalog...")
+        self.catalog = MovieCatalog.from_frame(source_df)
+
+        self._query_fields = None
+        if self._matrix_rows is not None:
+            outside = self._matrix_rows < 0
+            columns = [
+                source_df[col].fillna('').astype(str).str.replace(_FIELD_SEP, ' ', regex=False)
+                if col in source_df else pd.Series([''] * len(source_df), index=source_df.index)
+                for col in QUERY_FIELDS
+            ]
+            packed = columns[0].str.cat(columns[1:], sep=_FIELD_SEP).where(outside, '')
+            self._query_fields = StringColumn.from_strings(packed)
+
+        self._build_lookups()
+
+        # Training-time DataFrames are not needed to serve requests
+        self.movies_data = None
+        self.full_movies_data = None
+        print(f"🗂️ Serving catalog ready ({len(self.catalog):,} movies, "
+              f"{self.catalog.nbytes / 1e6:.1f} MB)")
+
+    def _build_lookups(self, lookup_arrays=None, title_arrays=None):
+        """
+        Build title and id lookups over the catalog
+
+        Args:
+                lookup_arrays: Persisted CatalogLookup arrays to reuse when they match the catalog
+                title_arrays: Persisted TitleIndex arrays to reuse when they match the catalog
+        """
+        if title_arrays:
+            self.title_index = TitleIndex.from_arrays(title_arrays)
+        if not title_arrays or len(self.title_index) != len(self.catalog):
+            print("🔎 Building title index...")
+            self.title_index = TitleIndex(self.catalog.titles)
+        if lookup_arrays and int(lookup_arrays['size'][0]) == len(self.catalog):
+            self.lookup = CatalogLookup.from_arrays(lookup_arrays)
+        else:
+            self.lookup = CatalogLookup.build(self.catalog.ids, self.catalog.imdb_ids)
+        print(f"🔎 Title index ready ({len(self.title_index):,} titles)")
+
+    def matching_data(self):
+        """Dataset that titles are resolved against (full dataset when available)"""
+        return self.full_movies_data if self.full_movies_data is not None else self.movies_data
+
+    @property
+    def num_movies(self):
+        """Number of movies in the trained feature matrix"""
+        return self.feature_matrix.shape[0] if self.feature_matrix is not None else 0
+
+    def resolve_title(self, movie_name, cutoff=0.3):
+        """
+        Resolve a free-text title to a row of the matching dataset
+
+        Exact match, then trigram-shortlisted fuzzy match, then substring fallback.
+
+        Returns:
+                Row position or None
+        """
+        if not self.is_trained:
+            return None
+        if self.title_index is None:
+            self._build_lookups()
+        return self.title_index.resolve(movie_name, cutoff=cutoff)
+
+    def resolve_id(self, identifier):
+        """
+        Resolve a TMDB id or IMDb id ('tt...') to a row of the matching dataset
+
+        Exact lookups only: an id missing from the catalog is never title-matched.
+
+        Returns:
+                Row position or None
+        """
+        if not self.is_trained:
+            return None
+        if self.lookup is None:
+            self._build_lookups()
+
+        identifier = str(identifier).strip()
+        if identifier.isdigit():
+            return self.lookup.row_for_id(identifier)
+        if identifier.startswith('tt'):
+            return self.lookup.row_for_imdb(identifier)
+        return None
+
+    def resolve_movie(self, identifier, cutoff=0.3):
+        """
+        Resolve a TMDB id, IMDb id ('tt...') or title to a row of the matching dataset
+
+        Returns:
+                Row position or None
+        """
+        row = self.resolve_id(identifier)
+        if row is not None:
+            return row
+        return self.resolve_title(str(identifier).strip(), cutoff=cutoff)
+
+    def search_titles(self, query, limit=10, cutoff=0.3):
+        """Titles closest to `query`, best first"""
+        if not self.is_trained:
+            return []
+        if self.title_index is None:
+            self._build_lookups()
+        return [self.catalog.titles[row] for row in self.title_index.search(query, n=limit, cutoff=cutoff)]
+
+    def _matrix_row(self, row):
+        """feature_matrix row of a catalog row, or None when it was not trained on"""
+        if self._matrix_rows is None:
+            return row
+        matrix_row = self._matrix_rows[row]
+        return int(matrix_row) if matrix_row >= 0 else None
+
+    def _catalog_rows(self, matrix_rows):
+        """Catalog rows of feature_matrix rows"""
+        if self.train_rows is None:
+            return matrix_rows
+        return self.train_rows[matrix_rows]
+
+    def title_at(self, row):
+        """Title of a resolved catalog row"""
+        return self.catalog.titles[row]
+
+    def get_recommendations(self, movie_name, num_recommendations=10, matched_row=None,
+                            nprobe=None):
         """
         Get movie recommendations
         
         Args:
                 movie_name: Name of the movie
                 num_recommendations: Number of recommendations to return
+                matched_row: Row already resolved with resolve_title (skips matching)
+                nprobe: ANN lists to probe (None: index default, 0: exact search)
 
         Returns:
                 List of recommended movie titles
@@ -232,157 +610,533 @@ class MovieRecommendationSystem:
 
         try:
             # Match against full dataset titles for robustness
-            source_df = self.full_movies_data if self.full_movies_data is not None else self.movies_data
-            list_of_all_titles = source_df['title'].tolist()
-
-            # Find close match
-            # First try a fuzzy match with a lower cutoff to be tolerant
-            find_close_match = difflib.get_close_matches(
-                movie_name, list_of_all_titles, n=1, cutoff=0.3)
-
-            # If no fuzzy match, try a simple substring search as a fallback
-            if not find_close_match:
-                lowered = movie_name.lower()
-                contains_matches = [
-                    t for t in list_of_all_titles if lowered in t.lower()]
-                if contains_matches:
-                    find_close_match = [contains_matches[0]]
-
-            if not find_close_match:
-                print(f"❌ No close match found for '{movie_name}'")
-                return []
-
-            matched_title = find_close_match[0]
-
-            # Build feature string for the matched title from the full dataset row
-            row = source_df[source_df.title == matched_title]
-            if row.empty:
-                print(f"❌ Matched title not found in data: '{matched_title}'")
-                return []
-
-            def _build_features(r):
-                # Match the exact approach used in training (optimized weighting)
-                # High weight: genres (4x) + keywords (2x) + overview + language
-                genres = r.get('genres', '') if isinstance(r, dict) else r.get('genres', '')
-                keywords = r.get('keywords', '') if isinstance(r, dict) else r.get('keywords', '')
-                overview = r.get('overview', '') if isinstance(r, dict) else r.get('overview', '')
-                language = r.get('original_language', '') if isinstance(r, dict) else r.get('original_language', '')
-
-                # Handle NaN values
-                if pd.isna(genres): genres = ''
-                if pd.isna(keywords): keywords = ''
-                if pd.isna(overview): overview = ''
-                if pd.isna(language): language = ''
-
-                # Apply same weighting as in training
-                return f"{genres} {genres} {genres} {genres} {keywords} {keywords} {overview} {language}"
-
-            combined = _build_features(row.iloc[0])
-            input_vec = self.vectorizer.transform([combined])
-
-            # Compute similarity scores efficiently
-            try:
-                sim_row = (self.feature_matrix @ input_vec.T).toarray().ravel()
-            except Exception:
-                sim_row = cosine_similarity(input_vec, self.feature_matrix).ravel()
-
-            # Use argpartition to get top candidates
-            num_candidates = max(num_recommendations * 3, num_recommendations + 10)
-            if num_candidates < len(sim_row):
-                top_idx = np.argpartition(sim_row, -num_candidates)[-num_candidates:]
-                top_scores = sim_row[top_idx]
-                order = np.argsort(top_scores)[::-1]
-                sorted_indices = top_idx[order]
-            else:
-                sorted_indices = np.argsort(sim_row)[::-1]
-
-            # Get recommendations with enhanced scoring
-            recommendations = []
-            seen_titles = set()
-
-            # Get source movie details for genre-based enhancement
-            source_row = row.iloc[0]
-            # Improved genre parsing: handle comma separation
-            source_genres_str = str(source_row.get('genres', ''))
-            source_genres = set(g.strip() for g in source_genres_str.replace(',', ' ').split() if g.strip()) # Split by space is safer if commas are inconsistent, but comma split is precise
-            # Actually, screenshot shows "Action, Science Fiction". Comma separated.
-            # But the dataset might be mixed. Let's try to split by comma first.
-            if ',' in source_genres_str:
-                source_genres = set(g.strip() for g in source_genres_str.split(',') if g.strip())
-            else:
-                source_genres = set(g.strip() for g in source_genres_str.split() if g.strip())
+            if matched_row is None:
+                matched_row = self.resolve_title(movie_name)
+                if matched_row is None:
+                    print(f"❌ No close match found for '{movie_name}'")
+                    return []
+
+            found = self.similar_candidates(matched_row, num_recommendations, nprobe)
+            return self.rank_similar(matched_row, *found, num_recommendations)
 
-            # Build top candidate list (index, score) from sorted indices
-            top_candidates = []
-            for idx in sorted_indices:
-                top_candidates.append((int(idx), float(sim_row[int(idx)])))
+        except Exception as e:
+            print(f"❌ Error getting recommendations: {e}")
+            return []
 
-            for index, similarity_score_val in top_candidates:
-                candidate_row = self.movies_data.iloc[index]
-                title = candidate_row['title']
+    def get_recommendations_batch(self, movie_names, num_recommendations=10, matched_rows=None,
+                                  nprobe=None):
+        """
+        Recommendations for several movies, scored together
 
-                # Skip if same title as matched source or already seen
-                if title == matched_title or title in seen_titles:
-                    continue
+        Seeds without a precomputed neighbour list are stacked and scored with one
+        matrix product per block of seeds, so the catalog is read once per block
+        instead of once per seed. With an ANN index (and nprobe != 0) each seed
+        is searched on its own, since probing a few lists is cheaper than a full pass.
 
-                # Apply genre overlap boost
-                cand_genres_str = str(candidate_row.get('genres', ''))
-                if ',' in cand_genres_str:
-                    candidate_genres = set(g.strip() for g in cand_genres_str.split(',') if g.strip())
-                else:
-                    candidate_genres = set(g.strip() for g in cand_genres_str.split() if g.strip())
-                
-                genre_overlap = len(source_genres.intersection(candidate_genres))
+        Args:
+                movie_names: Movie names (ignored where matched_rows is given)
+                num_recommendations: Recommendations per movie
+                matched_rows: Rows already resolved with resolve_title (None entries
+                        are resolved from movie_names)
+                nprobe: ANN lists to probe (None: index default, 0: exact search)
 
-                # Boost score if there's good genre overlap
-                # Higher boost for "Same Genre" preference
-                if genre_overlap > 0:
-                    similarity_score_val += genre_overlap * 0.15
+        Returns:
+                One recommendation list per movie, in input order ([] when not found)
+        """
+        if not self.is_trained:
+            print("❌ Model not trained. Please train the model first.")
+            return [[] for _ in movie_names]
 
-                recommendations.append({
-                    'title': title,
-                    'similarity_score': float(similarity_score_val),
-                    'rank': len(recommendations) + 1,
-                    'genre_overlap': genre_overlap
-                })
+        try:
+            rows = list(matched_rows) if matched_rows is not None else [None] * len(movie_names)
+            for i, name in enumerate(movie_names):
+                if rows[i] is None:
+                    rows[i] = self.resolve_title(name)
 
-                seen_titles.add(title)
+            found = iter(self.similar_candidates_batch(
+                [row for row in rows if row is not None], num_recommendations, nprobe))
+            return [self.rank_similar(row, *next(found), num_recommendations)
+                    if row is not None else []
+                    for row in rows]
 
-                if len(recommendations) >= num_recommendations:
-                    break
+        except Exception as e:
+            print(f"❌ Error getting batch recommendations: {e}")
+            return [[] for _ in movie_names]
 
-            # Sort by enhanced similarity score
-            recommendations.sort(
-                key=lambda x: x['similarity_score'], reverse=True)
+    def similar_candidates(self, matched_row, num_recommendations, nprobe=None):
+        """
+        Raw candidates behind get_recommendations(num_recommendations)
 
-            # Update ranks after sorting
-            for i, rec in enumerate(recommendations):
-                rec['rank'] = i + 1
+        Candidates are in similarity order, before the genre re-rank, so the
+        first candidates for a deeper request are those of a shallower one:
+        rank_similar() answers any smaller limit from them.
 
-            return recommendations
+        Args:
+                matched_row: Row resolved with resolve_title
+                num_recommendations: Largest number of recommendations to rank from them
+                nprobe: ANN lists to probe (None: index default, 0: exact search)
+
+        Returns:
+                (matrix rows, scores), best first
+        """
+        num_candidates = _candidate_count(num_recommendations)
+        matrix_row = self._matrix_row(matched_row)
+        found = self._table_candidates(matrix_row, num_candidates)
+        if found is None:
+            found = self._top_candidates(
+                self._query_vector(matched_row, matrix_row), num_candidates, nprobe)
+        return found
+
+    def similar_candidates_batch(self, matched_rows, num_recommendations, nprobe=None):
+        """
+        similar_candidates() of several resolved rows, scored together
+
+        Rows without a precomputed neighbour list are stacked and scored with one
+        matrix product per block of rows (see get_recommendations_batch).
+
+        Returns:
+                One (matrix rows, scores) pair per row, in input order
+        """
+        num_candidates = _candidate_count(num_recommendations)
+        found = [self._table_candidates(self._matrix_row(row), num_candidates)
+                 for row in matched_rows]
+        pending = [i for i, candidate in enumerate(found) if candidate is None]
+        if pending:
+            queries = [self._query_vector(matched_rows[i], self._matrix_row(matched_rows[i]))
+                       for i in pending]
+            if self.embedding is None and self.ann_index is not None and nprobe != 0:
+                candidates = [self._top_candidates(query, num_candidates, nprobe)
+                              for query in queries]
+            else:
+                candidates = self._batch_candidates(vstack(queries, format='csr'),
+                                                    num_candidates)
+            for i, candidate in zip(pending, candidates):
+                found[i] = candidate
+        return found
+
+    def rank_similar(self, matched_row, candidate_rows, candidate_scores, num_recommendations):
+        """
+        Recommendations from similar_candidates() computed at least num_recommendations deep
+
+        Only the candidates a direct get_recommendations(num_recommendations) would
+        have found are re-ranked, so the result is the same as that call's.
+
+        Args:
+                matched_row: Row the candidates were found for
+                candidate_rows: Candidate matrix rows, best first
+                candidate_scores: Their similarity scores
+                num_recommendations: Number of recommendations to return
+        """
+        num_candidates = _candidate_count(num_recommendations)
+        return self._rank_candidates(matched_row, candidate_rows[:num_candidates],
+                                     candidate_scores[:num_candidates], num_recommendations)
+
+    def get_profile_recommendations(self, seed_rows, weights=None, num_recommendations=10,
+                                    nprobe=None):
+        """
+        Recommendations for a taste profile: the weighted centroid of several movies
+
+        The seeds' feature rows are summed with `weights`, L2-normalized and searched
+        once, so a profile costs one catalog scan however many movies it has. The
+        seeds themselves are never recommended, and each recommendation names the
+        seed it is most similar to.
+
+        Args:
+                seed_rows: Resolved catalog rows of the profile's movies
+                weights: Weight of each seed (e.g. recency decay; default: equal)
+                num_recommendations: Number of recommendations to return
+                nprobe: ANN lists to probe (None: index default, 0: exact search)
+
+        Returns:
+                List of recommendation dicts with a 'because' seed title
+        """
+        if not self.is_trained:
+            print("❌ Model not trained. Please train the model first.")
+            return []
+        if not seed_rows:
+            return []
+
+        try:
+            found = self.profile_candidates(seed_rows, weights, num_recommendations, nprobe)
+            return self.rank_profile(seed_rows, *found, num_recommendations)
 
         except Exception as e:
-            print(f"❌ Error getting recommendations: {e}")
+            print(f"❌ Error getting profile recommendations: {e}")
             return []
 
-    def save_model(self, filepath="movie_recommendation_model.pkl"):
-        """Save the trained model"""
+    def profile_candidates(self, seed_rows, weights=None, num_recommendations=10, nprobe=None):
+        """
+        Raw candidates behind get_profile_recommendations(num_recommendations)
+
+        Like similar_candidates(), a deeper request's candidates start with a
+        shallower one's, so rank_profile() answers any smaller limit from them.
+
+        Returns:
+                (matrix rows, scores, index of each candidate's closest seed), best first
+        """
+        seeds = vstack([self._query_vector(row, self._matrix_row(row)) for row in seed_rows],
+                       format='csr')
+        if weights is None:
+            weights = np.ones(len(seed_rows))
+        profile = normalize(csr_matrix(np.asarray(weights, dtype=np.float32)[None, :]) @ seeds)
+
+        num_candidates = _candidate_count(num_recommendations) + len(seed_rows)
+        sorted_indices, sorted_scores = self._top_candidates(profile, num_candidates, nprobe)
+        # Closest seed of every candidate
+        closest = (self.feature_matrix[sorted_indices] @ seeds.T).toarray().argmax(axis=1)
+        return sorted_indices, sorted_scores, closest
+
+    def rank_profile(self, seed_rows, candidate_rows, candidate_scores, closest,
+                     num_recommendations):
+        """
+        Recommendations from profile_candidates() computed at least num_recommendations deep
+
+        The result is the same as get_profile_recommendations(num_recommendations).
+        """
+        num_candidates = _candidate_count(num_recommendations) + len(seed_rows)
+        seed_titles = [self.catalog.titles[row] for row in seed_rows]
+        recommendations = []
+        seen_titles = set(seed_titles)
+        for row, score, seed in zip(self._catalog_rows(candidate_rows[:num_candidates]),
+                                    candidate_scores[:num_candidates], closest[:num_candidates]):
+            title = self.catalog.titles[row]
+            if title in seen_titles:
+                continue
+            seen_titles.add(title)
+            recommendations.append({
+                'title': title,
+                'similarity_score': float(score),
+                'rank': len(recommendations) + 1,
+                'because': seed_titles[seed]
+            })
+            if len(recommendations) >= num_recommendations:
+                break
+        return recommendations
+
+    def _query_vector(self, matched_row, matrix_row):
+        """Feature row of a resolved movie"""
+        # Fast path: the trained row is the query vector; only movies outside
+        # the training sample need to be vectorized
+        if matrix_row is not None:
+            return self.feature_matrix[matrix_row]
+        fields = dict(zip(QUERY_FIELDS, self._query_fields[matched_row].split(_FIELD_SEP)))
+        return self._vectorize_fields(tuple([fields.get(col, '')] for col in self.field_weights))
+
+    def _table_candidates(self, matrix_row, num_candidates):
+        """
+        Precomputed neighbours, or None when the table is too shallow
+
+        Each stored list starts with the movie itself, so the table serves candidate
+        pools of up to k - 1 rows (any limit up to neighbor_k); live search finds
+        the same ones.
+        """
+        if (matrix_row is None or self.neighbors is None
+                or num_candidates > self.neighbors.k - 1):
+            return None
+        return self.neighbors.lookup(matrix_row, num_candidates)
+
+    def _rank_candidates(self, matched_row, sorted_indices, sorted_scores, num_recommendations):
+        """Genre re-rank of candidate matrix rows into recommendation dicts"""
+        matched_title = self.catalog.titles[matched_row]
+
+        # Genre overlap for every candidate at once: AND + popcount over precomputed bitmasks
+        candidate_rows = self._catalog_rows(sorted_indices)
+        source_mask = self.catalog.genre_masks[matched_row]
+        overlaps = genre_overlap(self.catalog.genre_masks[candidate_rows], source_mask)
+        # Boost score if there's good genre overlap
+        # Higher boost for "Same Genre" preference
+        boosted_scores = sorted_scores + overlaps * 0.15
+        candidate_titles = (self.catalog.titles[row] for row in candidate_rows)
+
+        # Get recommendations with enhanced scoring
+        recommendations = []
+        seen_titles = set()
+
+        for title, similarity_score_val, overlap in zip(
+                candidate_titles, boosted_scores, overlaps):
+            # Skip if same title as matched source or already seen
+            if title == matched_title or title in seen_titles:
+                continue
+
+            recommendations.append({
+                'title': title,
+                'similarity_score': float(similarity_score_val),
+                'rank': len(recommendations) + 1,
+                'genre_overlap': int(overlap)
+            })
+
+            seen_titles.add(title)
+
+            if len(recommendations) >= num_recommendations:
+                break
+
+        # Sort by enhanced similarity score
+        recommendations.sort(
+            key=lambda x: x['similarity_score'], reverse=True)
+
+        # Update ranks after sorting
+        for i, rec in enumerate(recommendations):
+            rec['rank'] = i + 1
+
+        return recommendations
+
+    def _top_candidates(self, input_vec, num_candidates, nprobe=None):
+        """
+        Matrix rows most similar to `input_vec`, best first, with their scores
+
+        Uses the dense embedding in embedding mode. Otherwise uses the ANN index
+        when there is one (and nprobe != 0), falling back to scoring every row
+        when there is no index or its lists are too small.
+        """
+        if self.embedding is not None:
+            return self.embedding.search(input_vec, num_candidates)
+        if self.ann_index is not None and nprobe != 0:
+            found = self.ann_index.search(self.feature_matrix, input_vec, num_candidates, nprobe)
+            if found is not None:
+                return found
+
+        # Compute similarity scores efficiently
+        try:
+            sim_row = (self.feature_matrix @ input_vec.T).toarray().ravel()
+        except Exception:
+            sim_row = cosine_similarity(input_vec, self.feature_matrix).ravel()
+        return _top_scores(sim_row, num_candidates)
+
+    def _batch_candidates(self, queries, num_candidates):
+        """
+        _top_candidates() of every row of `queries` by exact search, as a list
+
+        All queries share one pass over the catalog: it is scored a block of rows
+        at a time (BATCH_SCORE_CELLS similarities at most) and every query keeps a
+        running top num_candidates. Only the first block is partially sorted; later
+        blocks just compare against each query's current worst kept score.
+        """
+        n_rows, n_queries = self.feature_matrix.shape[0], queries.shape[0]
+        block = max(num_candidates, BATCH_SCORE_CELLS // max(n_queries, 1))
+        if self.embedding is not None:
+            projected = self.embedding.project(queries)
+        elif queries.shape[1] * n_queries <= BATCH_SCORE_CELLS:
+            queries_t = queries.T.toarray()
+        else:
+            # Large (e.g. hashed) feature spaces: keep the queries sparse
+            queries_t = queries.T.tocsr()
+        kept_query = kept_rows = np.empty(0, dtype=np.intp)
+        kept_scores = np.empty(0, dtype=np.float32)
+        threshold = np.full(n_queries, -np.inf)
+        for start in range(0, n_rows, block):
+            end = min(start + block, n_rows)
+            if self.embedding is not None:
+                scores = self.embedding.block_scores(projected, start, end)
+            else:
+                scores = self.feature_matrix[start:end] @ queries_t
+                if issparse(scores):
+                    scores = scores.toarray()
+            # One contiguous row per query
+            scores = np.ascontiguousarray(scores.T)
+            if end - start > num_candidates and np.isneginf(threshold).any():
+                # Start each query's bar at the num_candidates-th best score of the block
+                kth = np.partition(scores, -num_candidates, axis=1)[:, -num_candidates]
+                threshold = np.maximum(threshold, kth)
+                query, col = np.nonzero(scores >= threshold[:, None])
+            else:
+                # Only rows scoring above a query's current worst kept one matter
+                query, col = np.nonzero(scores > threshold[:, None])
+            if not len(query):
+                continue
+
+            # Merge with the kept candidates: best first within each query
+            query = np.concatenate([kept_query, query])
+            rows = np.concatenate([kept_rows, col + start])
+            values = np.concatenate([kept_scores, scores[query[len(kept_query):], col]])
+            order = np.lexsort((-values, query))
+            query, rows, values = query[order], rows[order], values[order]
+            rank = np.arange(len(query)) - np.searchsorted(query, query)
+            keep = rank < num_candidates
+            kept_query, kept_rows, kept_scores = query[keep], rows[keep], values[keep]
+
+            counts = np.bincount(kept_query, minlength=n_queries)
+            last = np.maximum(np.cumsum(counts) - 1, 0)
+            threshold = np.where(counts == num_candidates, kept_scores[last], -np.inf)
+
+        splits = np.cumsum(np.bincount(kept_query, minlength=n_queries))[:-1]
+        return list(zip(np.split(kept_rows, splits), np.split(kept_scores, splits)))
+
+    def extended(self, limit):
+        """
+        New system covering the first `limit` dataset rows, built on this trained model
+
+        Only rows beyond load_limit are read. They are vectorized with the fitted
+        vocabulary and IDF (which stay those of the original rows) and appended to
+        the feature matrix, catalog, title index and id lookups; nothing is refitted.
+
+        Returns:
+                The extended system, or None when this model cannot be extended
+                (not trained on a load limit, or the dataset changed since)
+        """
+        if not self.is_trained or self.load_limit is None or limit <= self.load_limit:
+            return None
+        if not (self.use_large_dataset and 'tmbd.csv' in self.dataset_path):
+            return None
+        if self.dataset_fingerprint != dataset_fingerprint(self.dataset_path):
+            print("⚠️ Dataset changed since this model was trained, cannot extend it")
+            return None
+
+        print(f"📥 Loading rows {self.load_limit:,}-{limit:,} to extend the model...")
+        added = MovieRecommendationSystem(self.dataset_path, self.use_large_dataset,
+                                          self.dataset_cache)
+        added.field_weights = self.field_weights
+        added.movies_data = self._read_tmbd_csv(limit, offset=self.load_limit)
+        added._prepare_tmbd_data()
+
+        system = MovieRecommendationSystem(self.dataset_path, self.use_large_dataset,
+                                           self.dataset_cache)
+        system.feature_columns = self.feature_columns
+        system.vectorizer = self.vectorizer
+        system.field_weights = self.field_weights
+        system.dataset_fingerprint = self.dataset_fingerprint
+        system.load_limit = limit
+        system.sample_size = self.sample_size
+        system.fit_limit = self.fit_limit or self.load_limit
+
+        if len(added.movies_data) == 0:
+            # End of file: same rows, but now known to cover `limit`
+            system.feature_matrix = self.feature_matrix
+            system.catalog = self.catalog
+            system.train_rows = self.train_rows
+            system._matrix_rows = self._matrix_rows
+            system._query_fields = self._query_fields
+            system.title_index = self.title_index
+            system.lookup = self.lookup
+            system.ann_index = self.ann_index
+            system.ann_lists = self.ann_lists
+            system.embedding = self.embedding
+            system.embedding_params = self.embedding_params
+            system.neighbors = self.neighbors
+            system.neighbor_k = self.neighbor_k
+            system.is_trained = True
+            return system
+
+        print("⚡ Vectorizing new rows with the existing vocabulary...")
+        new_matrix = vstack([self._vectorize_fields(fields)
+                             for fields in added._feature_chunks()], format='csr')
+        system.feature_matrix = vstack([self.feature_matrix, new_matrix], format='csr')
+        system.ann_lists = self.ann_lists
+        if self.ann_index is not None:
+            # New rows join the nearest existing lists, like they reuse the vocabulary
+            system.ann_index = self.ann_index.extended(
+                system.feature_matrix, self.feature_matrix.shape[0])
+        system.embedding_params = self.embedding_params
+        if self.embedding is not None:
+            # Projected with the existing components
+            system.embedding = self.embedding.extended(
+                system.feature_matrix, self.feature_matrix.shape[0])
+        if self.neighbors is not None:
+            # New rows change existing rows' neighbours; recomputing them all is a batch job
+            print("⚠️ Neighbour table dropped for the extended model (see rebuild_neighbors)")
+
+        base_rows = len(self.catalog)
+        system.catalog = self.catalog.extended(added.movies_data)
+        new_rows = np.arange(base_rows, len(system.catalog), dtype=np.int32)
+        system.train_rows = None
+        system._matrix_rows = None
+        if self.train_rows is not None:
+            system.train_rows = np.concatenate([self.train_rows, new_rows])
+            system._matrix_rows = np.full(len(system.catalog), -1, dtype=np.int32)
+            system._matrix_rows[system.train_rows] = np.arange(
+                len(system.train_rows), dtype=np.int32)
+        system._query_fields = None
+        if self._query_fields is not None:
+            # New rows are all in the matrix and never need their raw fields
+            system._query_fields = StringColumn.concat(
+                [self._query_fields, StringColumn.from_strings([''] * len(new_rows))])
+
+        system.title_index = self.title_index.extended(added.movies_data['title'])
+        system.lookup = CatalogLookup.build(system.catalog.ids, system.catalog.imdb_ids)
+        system.is_trained = True
+        print(f"✅ Model extended to {system.num_movies:,} movies")
+        return system
+
+    def build_config(self):
+        """Inputs that determine the trained model (see artifact.build_key)"""
+        return artifact_config(self.dataset_fingerprint, self.load_limit,
+                               self.sample_size, self.vectorizer, self.fit_limit,
+                               self.field_weights, self.ann_lists, self.embedding_params,
+                               self.neighbor_k)
+
+    def save_model(self, filepath="movie_recommendation_model", extra=None):
+        """
+        Save the trained model as an artifact directory
+
+        Arrays (CSR matrix, catalog, lookups, title index) are stored as raw .npy
+        files next to a manifest and the vectorizer vocabulary, so load_model can
+        memory-map them instead of unpickling.
+
+        Args:
+                filepath: Artifact directory
+                extra: Additional manifest entries (e.g. build timings)
+        """
         if not self.is_trained:
             print("❌ No trained model to save")
             return False
 
         try:
-            model_data = {
-                'movies_data': self.movies_data,
-                # Store feature matrix and vectorizer to avoid recomputing TF-IDF
-                'feature_matrix': self.feature_matrix,
-                'vectorizer': self.vectorizer,
+            backend = feature_backend(self.vectorizer)
+            vectorizer_spec = {'type': backend, 'params': _vectorizer_params(self.vectorizer)}
+            terms = None
+            if backend == 'tfidf':
+                terms = list(self.vectorizer.get_feature_names_out())
+                if any('\n' in term for term in terms):
+                    raise ValueError("vocabulary terms cannot contain newlines")
+
+            arrays = {
+                # Store feature matrix and vectorizer state to avoid recomputing TF-IDF
+                'matrix.data': self.feature_matrix.data,
+                'matrix.indices': self.feature_matrix.indices,
+                'matrix.indptr': self.feature_matrix.indptr,
+                'vectorizer.idf': self.vectorizer.idf_,
+            }
+            # Columnar serving store instead of the training DataFrame
+            arrays.update(prefixed('catalog', self.catalog.to_arrays()))
+            arrays.update(prefixed('lookup', self.lookup.to_arrays()))
+            arrays.update(prefixed('title_index', self.title_index.to_arrays()))
+            if backend == 'hashing':
+                # Document frequencies let IDF keep accumulating after a reload
+                arrays['vectorizer.df'] = self.vectorizer.df_
+                vectorizer_spec['n_docs'] = int(self.vectorizer.n_docs_)
+            if self.train_rows is not None:
+                arrays['train_rows'] = self.train_rows
+            if self._query_fields is not None:
+                arrays.update(prefixed('query', self._query_fields.to_arrays('fields')))
+            ann = None
+            if self.ann_index is not None:
+                arrays.update(prefixed('ann', self.ann_index.to_arrays()))
+                ann = {'nlist': self.ann_index.nlist, 'nprobe': self.ann_index.nprobe}
+            if self.embedding is not None:
+                arrays.update(prefixed('embedding', self.embedding.to_arrays()))
+            if self.neighbors is not None:
+                arrays.update(prefixed('neighbors', self.neighbors.to_arrays()))
+
+            manifest = {
+                'trained_at': datetime.now().isoformat(),
+                'dataset_path': self.dataset_path,
+                'use_large_dataset': self.use_large_dataset,
                 'feature_columns': self.feature_columns,
-                'trained_at': datetime.now()
+                'vectorizer': vectorizer_spec,
+                'field_weights': self.field_weights,
+                'matrix': _matrix_stats(self.feature_matrix),
+                'catalog_size': len(self.catalog),
+                'ann': ann,
+                'dataset_fingerprint': self.dataset_fingerprint,
+                'load_limit': self.load_limit,
+                'sample_size': self.sample_size,
+                'fit_limit': self.fit_limit,
+                'ann_lists': self.ann_lists,
+                'embedding': self.embedding_params,
+                'neighbor_k': self.neighbor_k,
+                'build_key': build_key(self.build_config()),
             }
-
-            with open(filepath, 'wb') as f:
-                pickle.dump(model_data, f)
+            manifest.update(extra or {})
+            write_artifact(filepath, manifest, arrays, vocabulary=terms)
 
             print(f"💾 Model saved to {filepath}")
             return True
@@ -391,26 +1145,179 @@ class MovieRecommendationSystem:
             print(f"❌ Error saving model: {e}")
             return False
 
-    def load_model(self, filepath="movie_recommendation_model.pkl"):
-        """Load a pre-trained model"""
-        try:
-            with open(filepath, 'rb') as f:
-                model_data = pickle.load(f)
+    def load_model(self, filepath="movie_recommendation_model", mmap=True):
+        """
+        Load a model saved with save_model
 
-            self.movies_data = model_data['movies_data']
-            self.feature_matrix = model_data.get('feature_matrix')
-            self.vectorizer = model_data['vectorizer']
-            self.feature_columns = model_data['feature_columns']
+        Args:
+                filepath: Artifact directory
+                mmap: Memory-map arrays read-only (shared page cache across processes)
+        """
+        try:
+            manifest, arrays, vocabulary = read_artifact(filepath, mmap=mmap)
+
+            self.feature_matrix = csr_matrix(
+                (arrays['matrix.data'], arrays['matrix.indices'], arrays['matrix.indptr']),
+                shape=tuple(manifest['matrix']['shape']), copy=False)
+            self.vectorizer = _restore_vectorizer(manifest['vectorizer'], vocabulary, arrays)
+            self.feature_columns = manifest['feature_columns']
+            self.field_weights = manifest.get('field_weights', dict(FIELD_WEIGHTS))
+            self.dataset_fingerprint = manifest.get('dataset_fingerprint')
+            self.load_limit = manifest.get('load_limit')
+            self.sample_size = manifest.get('sample_size')
+            self.fit_limit = manifest.get('fit_limit')
+            self.catalog = MovieCatalog.from_arrays(group(arrays, 'catalog'))
+            self.movies_data = None
+            self.full_movies_data = None
+            self.train_rows = arrays.get('train_rows')
+            self._matrix_rows = None
+            if self.train_rows is not None:
+                self._matrix_rows = np.full(len(self.catalog), -1, dtype=np.int32)
+                self._matrix_rows[self.train_rows] = np.arange(
+                    len(self.train_rows), dtype=np.int32)
+            query_arrays = group(arrays, 'query')
+            self._query_fields = (StringColumn.from_arrays(query_arrays, 'fields')
+                                  if query_arrays else None)
+            self._build_lookups(group(arrays, 'lookup'), group(arrays, 'title_index'))
+            ann_arrays = group(arrays, 'ann')
+            self.ann_index = (IVFIndex.from_arrays(ann_arrays, manifest['ann']['nprobe'])
+                              if ann_arrays else None)
+            self.ann_lists = manifest.get('ann_lists')
+            embedding_arrays = group(arrays, 'embedding')
+            self.embedding = (LatentEmbedding.from_arrays(embedding_arrays)
+                              if embedding_arrays else None)
+            self.embedding_params = manifest.get('embedding')
+            neighbor_arrays = group(arrays, 'neighbors')
+            self.neighbors = (NeighborTable.from_arrays(neighbor_arrays)
+                              if neighbor_arrays else None)
+            self.neighbor_k = manifest.get('neighbor_k')
             self.is_trained = True
 
             print(f"📂 Model loaded from {filepath}")
-            print(f"🎬 Loaded {len(self.movies_data):,} movies")
+            print(f"🎬 Loaded {self.num_movies:,} movies")
             return True
 
         except Exception as e:
             print(f"❌ Error loading model: {e}")
             return False
 
+
+DEFAULT_VECTORIZER_PARAMS = {
+    'max_features': 5000,        # Increased from 2000 for better nuance
+    'stop_words': 'english',
+    'ngram_range': (1, 2),       # Use bigrams to capture "Science Fiction" as a unit
+    'min_df': 2,                 # Lower threshold
+    'max_df': 0.9,
+    'dtype': np.float32,
+    'norm': 'l2',
+}
+
+
+DEFAULT_HASHING_PARAMS = {
+    'n_features': 2 ** 18,       # Hashed term space; collisions are rare at this size
+    'stop_words': 'english',
+    'ngram_range': (1, 2),
+    'min_df': 2,
+    'max_df': 0.9,
+    'dtype': np.float32,
+    'norm': 'l2',
+}
+
+FEATURE_BACKENDS = ('tfidf', 'hashing')
+
+
+def make_vectorizer(params=None, backend='tfidf'):
+    """
+    Unfitted vectorizer for a feature backend, defaults overridden by `params`
+
+    Args:
+            params: Constructor overrides
+            backend: 'tfidf' (TfidfVectorizer) or 'hashing' (HashingTfidfVectorizer)
+    """
+    if backend not in FEATURE_BACKENDS:
+        raise ValueError(f"Unknown feature backend '{backend}' (expected one of {FEATURE_BACKENDS})")
+    merged = dict(DEFAULT_HASHING_PARAMS if backend == 'hashing' else DEFAULT_VECTORIZER_PARAMS)
+    merged.update(params or {})
+    if backend == 'hashing':
+        return HashingTfidfVectorizer(**merged)
+    return TfidfVectorizer(**merged)
+
+
+def feature_backend(vectorizer):
+    """Backend name of a vectorizer made by make_vectorizer"""
+    return 'hashing' if isinstance(vectorizer, HashingTfidfVectorizer) else 'tfidf'
+
+
+def artifact_config(fingerprint, load_limit, sample_size, vectorizer, fit_limit=None,
+                    field_weights=None, ann_lists=None, embedding=None, neighbor_k=None):
+    """JSON-safe description of everything a trained model depends on"""
+    config = {
+        'dataset_fingerprint': fingerprint,
+        'load_limit': load_limit,
+        'sample_size': sample_size,
+        'vectorizer': _vectorizer_params(vectorizer),
+        'field_weights': dict(field_weights or FIELD_WEIGHTS),
+    }
+    if feature_backend(vectorizer) != 'tfidf':
+        config['feature_backend'] = feature_backend(vectorizer)
+    if ann_lists is not None:
+        config['ann_lists'] = ann_lists
+    if embedding is not None:
+        config['embedding'] = dict(embedding)
+    if neighbor_k:
+        config['neighbor_k'] = neighbor_k
+    if fit_limit is not None:
+        # Extended model: vocabulary and IDF come from the first fit_limit rows only
+        config['fit_limit'] = fit_limit
+    return config
+
+
+def _matrix_stats(matrix):
+    """Shape, sparsity and size of a CSR feature matrix for the manifest"""
+    rows, cols = matrix.shape
+    return {
+        'shape': [rows, cols],
+        'nnz': int(matrix.nnz),
+        'density': float(matrix.nnz) / max(rows * cols, 1),
+        'nnz_per_row': float(matrix.nnz) / max(rows, 1),
+        'empty_rows': int(np.count_nonzero(np.diff(matrix.indptr) == 0)),
+        'nbytes': int(matrix.data.nbytes + matrix.indices.nbytes + matrix.indptr.nbytes),
+    }
+
+
+def _vectorizer_params(vectorizer):
+    """JSON-safe constructor parameters of a fitted vectorizer"""
+    params = {}
+    for key, value in vectorizer.get_params().items():
+        if key == 'n_jobs':
+            continue  # runtime only, does not change the model
+        if key == 'dtype':
+            params[key] = np.dtype(value).name
+        elif isinstance(value, tuple):
+            params[key] = list(value)
+        elif value is None or isinstance(value, (str, int, float, bool, list)):
+            params[key] = value
+        else:
+            raise ValueError(f"Vectorizer parameter '{key}' cannot be stored")
+    return params
+
+
+def _restore_vectorizer(spec, vocabulary, arrays):
+    """Rebuild a fitted vectorizer from its manifest entry, vocabulary and stored arrays"""
+    params = dict(spec['params'])
+    params['dtype'] = np.dtype(params['dtype']).type
+    params['ngram_range'] = tuple(params['ngram_range'])
+    if spec.get('type', 'tfidf') == 'hashing':
+        vectorizer = HashingTfidfVectorizer(**params)
+        vectorizer.df_ = np.array(arrays['vectorizer.df'])
+        vectorizer.n_docs_ = spec['n_docs']
+        vectorizer.idf_ = np.asarray(arrays['vectorizer.idf'])
+        return vectorizer
+    vectorizer = TfidfVectorizer(**params)
+    vectorizer.vocabulary_ = {term: i for i, term in enumerate(vocabulary)}
+    vectorizer.idf_ = np.asarray(arrays['vectorizer.idf'])
+    return vectorizer
+
 # Quick setup function for your API integration
 
 
@@ -459,4 +1366,4 @@ if __name__ == "__main__":
                 f"{rec['rank']}. {rec['title']} (similarity: {rec['similarity_score']:.3f})")
 
         # Save model for production use
-        system.save_model("production_model.pkl")
+        system.save_model("production_model")
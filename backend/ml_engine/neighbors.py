@@ -0,0 +1,154 @@
+"""
+Precomputed top-K neighbour table for the movie recommendation system
+Every feature matrix row's K most similar rows (itself included) and their cosine
+scores, found with blocked sparse-sparse products and stored as compact int32 /
+float16 arrays, so serving a recommendation is an array slice.
+"""
+
+import os
+import tempfile
+
+import numpy as np
+from scipy.sparse import csr_matrix
+
+try:
+    from ml_engine.parallel import map_chunks, resolve_jobs
+except ImportError:  # running from inside ml_engine/
+    from parallel import map_chunks, resolve_jobs
+
+
+DEFAULT_NEIGHBORS = 50
+# Cap on the multiply-adds (query term x posting list entries) of one block
+# product; bounds the intermediate similarity block to about this many entries
+BLOCK_WORK = 1 << 24
+
+# Feature matrix loaded once per worker process, by directory
+_worker_matrices = {}
+
+
+def block_bounds(matrix, work=BLOCK_WORK):
+    """
+    (start, end) row ranges of `matrix` whose products with matrix.T stay under `work`
+
+    A row's work is the summed document frequency of its terms, so blocks of rows
+    with common terms (e.g. genres) are smaller.
+    """
+    df = np.bincount(matrix.indices, minlength=matrix.shape[1])
+    # cumulative[i]: work of rows 0..i
+    entry_work = np.concatenate([[0], np.cumsum(df[matrix.indices], dtype=np.int64)])
+    cumulative = entry_work[matrix.indptr[1:]]
+    bounds = []
+    start = 0
+    while start < matrix.shape[0]:
+        base = cumulative[start - 1] if start else 0
+        end = int(np.searchsorted(cumulative, base + work, side='right'))
+        end = max(end, start + 1)
+        bounds.append((start, end))
+        start = end
+    return bounds
+
+
+def _top_k_rows(similarities, k):
+    """Top-k column indices and scores of every row of a CSR block, best first"""
+    rows = np.full((similarities.shape[0], k), -1, dtype=np.int32)
+    scores = np.zeros((similarities.shape[0], k), dtype=np.float16)
+    for i in range(similarities.shape[0]):
+        start, end = similarities.indptr[i], similarities.indptr[i + 1]
+        data, indices = similarities.data[start:end], similarities.indices[start:end]
+        if len(data) > k:
+            top = np.argpartition(data, -k)[-k:]
+            data, indices = data[top], indices[top]
+        order = np.argsort(data)[::-1]
+        rows[i, :len(order)] = indices[order]
+        scores[i, :len(order)] = data[order]
+    return rows, scores
+
+
+def _load_matrix(directory):
+    if directory not in _worker_matrices:
+        arrays = {name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode='r')
+                  for name in ('data', 'indices', 'indptr', 'shape')}
+        matrix = csr_matrix((arrays['data'], arrays['indices'], arrays['indptr']),
+                            shape=tuple(int(n) for n in arrays['shape']), copy=False)
+        _worker_matrices[directory] = (matrix, matrix.T.tocsr())
+    return _worker_matrices[directory]
+
+
+def neighbor_block(source, k, bounds):
+    """
+    Neighbours of rows bounds[0]..bounds[1]
+
+    Args:
+            source: (matrix, matrix.T as CSR), or a directory holding the matrix
+                    as data/indices/indptr/shape .npy files (worker processes)
+            k: Neighbours per row
+            bounds: (start, end) row range, see block_bounds()
+    """
+    matrix, matrix_t = _load_matrix(source) if isinstance(source, str) else source
+    start, end = bounds
+    return _top_k_rows(matrix[start:end] @ matrix_t, k)
+
+
+class NeighborTable:
+    """Top-k neighbour rows and scores of every feature matrix row"""
+
+    def __init__(self, rows, scores):
+        self.rows = rows  # (n, k) int32 matrix rows, best first, -1 padded
+        self.scores = scores  # (n, k) float16 cosine similarities, 0 padded
+
+    @classmethod
+    def compute(cls, matrix, k=DEFAULT_NEIGHBORS, n_jobs=1):
+        """
+        Exact top-k neighbours of every row of an L2-normalized CSR matrix
+
+        Args:
+                matrix: Feature matrix
+                k: Neighbours per row (capped by the row count)
+                n_jobs: Worker processes (0: all cores); workers memory-map a
+                        temporary copy of the matrix instead of receiving it per block
+        """
+        k = min(k, matrix.shape[0])
+        bounds = block_bounds(matrix)
+        rows = np.empty((matrix.shape[0], k), dtype=np.int32)
+        scores = np.empty((matrix.shape[0], k), dtype=np.float16)
+        n_jobs = resolve_jobs(n_jobs)
+        with tempfile.TemporaryDirectory(prefix='neighbors-') as directory:
+            if n_jobs > 1:
+                for name, array in (('data', matrix.data), ('indices', matrix.indices),
+                                    ('indptr', matrix.indptr),
+                                    ('shape', np.array(matrix.shape, dtype=np.int64))):
+                    np.save(os.path.join(directory, f"{name}.npy"), array)
+                source = directory
+            else:
+                source = (matrix, matrix.T.tocsr())
+            blocks = map_chunks(neighbor_block, bounds, n_jobs, args=(source, k))
+            for (start, end), (block_rows, block_scores) in zip(bounds, blocks):
+                rows[start:end] = block_rows
+                scores[start:end] = block_scores
+        return cls(rows, scores)
+
+    @property
+    def k(self):
+        return self.rows.shape[1]
+
+    def __len__(self):
+        return self.rows.shape[0]
+
+    @property
+    def nbytes(self):
+        return self.rows.nbytes + self.scores.nbytes
+
+    def lookup(self, row, count):
+        """(rows, scores) of the first `count` neighbours of a matrix row, best first"""
+        rows = self.rows[row, :count]
+        valid = rows >= 0
+        return rows[valid], self.scores[row, :count][valid].astype(np.float32)
+
+    def to_arrays(self):
+        """Plain NumPy arrays for persistence"""
+        return {'rows': self.rows, 'scores': self.scores}
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        """Rebuild a table from to_arrays() output"""
+        return cls(arrays['rows'], arrays['scores'])
@@ -0,0 +1,46 @@
+"""
+Process-pool helpers for the movie recommendation system's training path
+"""
+
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+
+def resolve_jobs(n_jobs):
+    """Worker count for `n_jobs` (0 or negative: all CPU cores)"""
+    if n_jobs is None:
+        return 1
+    if n_jobs <= 0:
+        return os.cpu_count() or 1
+    return n_jobs
+
+
+def map_chunks(func, chunks, n_jobs=1, args=()):
+    """
+    func(*args, chunk) for every chunk, yielded in input order
+
+    Args:
+            func: Module-level function (worker processes import it by name)
+            chunks: Iterable of picklable chunks, consumed lazily
+            n_jobs: Worker processes; 1 runs in the calling process
+            args: Leading arguments passed with every chunk
+    """
+    n_jobs = resolve_jobs(n_jobs)
+    if n_jobs <= 1:
+        for chunk in chunks:
+            yield func(*args, chunk)
+        return
+
+    # spawn: the model may be trained from a background thread of a forked server
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=n_jobs, mp_context=context) as pool:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(pool.submit(func, *args, chunk))
+            # Bounded look-ahead keeps only a few chunks in flight
+            if len(pending) >= 2 * n_jobs:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
@@ -0,0 +1,283 @@
+"""
+Chunked TF-IDF fitting for the movie recommendation system
+Documents are counted chunk by chunk into a growing vocabulary (optionally in worker
+processes, merged in corpus order); pruning, max_features selection and IDF weighting
+then follow TfidfVectorizer.fit_transform step for step, so the fitted vectorizer and
+matrix are identical without holding every document at once.
+Documents may also be given as weighted fields: each field is tokenized once and its
+term counts are scaled by the field weight before they are added up.
+"""
+
+from numbers import Integral
+
+import numpy as np
+from scipy.sparse import csr_matrix
+from sklearn.feature_extraction.text import TfidfTransformer
+
+try:
+    from ml_engine.parallel import map_chunks
+except ImportError:  # running from inside ml_engine/
+    from parallel import map_chunks
+
+
+# Distinct values per field and chunk whose term counts are reused
+FIELD_CACHE_SIZE = 10000
+
+
+class TermCounter:
+    """
+    Per-document term counts over a vocabulary that grows as new terms are seen
+
+    Terms are numbered in order of first appearance, exactly like CountVectorizer,
+    and each chunk is stored as compact arrays instead of Python lists. With a given
+    vocabulary (a fitted model's) it stays fixed and unknown terms are dropped.
+    """
+
+    def __init__(self, analyzer, vocabulary=None):
+        self.analyze = analyzer
+        self.fixed = vocabulary is not None
+        self.vocabulary = vocabulary if self.fixed else {}
+        self.n_docs = 0
+        self._indices = []
+        self._counts = []
+        self._row_nnz = []
+
+    def update(self, documents, weights=None):
+        """
+        Count one chunk of documents
+
+        Args:
+                documents: List of documents, or with `weights` a sequence of
+                        per-field lists of equal length (one entry per document)
+                weights: Count multiplier of each field
+        """
+        fields = documents if weights is not None else (documents,)
+        weights = weights if weights is not None else (1,)
+        analyze = self.analyze
+        grow = not self.fixed
+        vocabulary = self.vocabulary
+
+        def count_text(text, weight):
+            text_counts = {}
+            for term in analyze(text):
+                idx = vocabulary.get(term)
+                if idx is None:
+                    if not grow:
+                        continue
+                    idx = vocabulary[term] = len(vocabulary)
+                text_counts[idx] = text_counts.get(idx, 0) + weight
+            return text_counts
+
+        # Values such as genres or language repeat across many movies; each distinct
+        # value of a field is analyzed once per chunk (up to FIELD_CACHE_SIZE values)
+        caches = [{} for _ in weights]
+        indices = []
+        counts = []
+        row_nnz = []
+        for doc_fields in zip(*fields):
+            doc_counts = None
+            owned = False
+            for text, weight, cache in zip(doc_fields, weights, caches):
+                text_counts = cache.get(text)
+                if text_counts is None:
+                    text_counts = count_text(text, weight)
+                    if len(cache) < FIELD_CACHE_SIZE:
+                        cache[text] = text_counts
+                if not text_counts:
+                    continue
+                if doc_counts is None:
+                    doc_counts = text_counts  # may be cached: copied before it is added to
+                    continue
+                if not owned:
+                    doc_counts = dict(doc_counts)
+                    owned = True
+                for idx, count in text_counts.items():
+                    doc_counts[idx] = doc_counts.get(idx, 0) + count
+            if doc_counts is None:
+                doc_counts = {}
+            indices.extend(doc_counts.keys())
+            counts.extend(doc_counts.values())
+            row_nnz.append(len(doc_counts))
+
+        integral = all(float(weight).is_integer() for weight in weights)
+        self._indices.append(np.array(indices, dtype=np.int32))
+        self._counts.append(np.array(counts, dtype=np.int32 if integral else np.float64))
+        self._row_nnz.append(np.array(row_nnz, dtype=np.int64))
+        self.n_docs += len(row_nnz)
+
+    def merge(self, terms, indices, counts, row_nnz):
+        """
+        Append a chunk counted by another TermCounter (see count_chunk)
+
+        Its terms are numbered locally in first-appearance order, so adding the unseen
+        ones in that order reproduces the numbering of a serial update().
+        """
+        vocabulary = self.vocabulary
+        mapping = np.fromiter(
+            (vocabulary.setdefault(term, len(vocabulary)) for term in terms),
+            dtype=np.int32, count=len(terms))
+        self._indices.append(mapping[indices])
+        self._counts.append(counts)
+        self._row_nnz.append(row_nnz)
+        self.n_docs += len(row_nnz)
+
+    def count_matrix(self, dtype=np.float32):
+        """(n_docs, len(vocabulary)) CSR count matrix with sorted indices; releases the chunks"""
+        if not self.vocabulary:
+            raise ValueError("empty vocabulary; perhaps the documents only contain stop words")
+
+        indptr = np.zeros(self.n_docs + 1, dtype=np.int64)
+        if self._row_nnz:
+            np.cumsum(np.concatenate(self._row_nnz), out=indptr[1:])
+        index_dtype = np.int32 if indptr[-1] <= np.iinfo(np.int32).max else np.int64
+        indices = np.concatenate(self._indices) if self._indices else np.empty(0, np.int32)
+        counts = np.concatenate(self._counts) if self._counts else np.empty(0, dtype)
+        self._indices, self._counts, self._row_nnz = [], [], []
+
+        matrix = csr_matrix(
+            (counts.astype(dtype), indices.astype(index_dtype, copy=False),
+             indptr.astype(index_dtype, copy=False)),
+            shape=(self.n_docs, len(self.vocabulary)))
+        matrix.sort_indices()
+        return matrix
+
+
+def _sort_features(matrix, vocabulary):
+    """Renumber terms alphabetically (updates `vocabulary` in place)"""
+    sorted_terms = sorted(vocabulary.items())
+    map_index = np.empty(len(sorted_terms), dtype=matrix.indices.dtype)
+    for new_index, (term, old_index) in enumerate(sorted_terms):
+        vocabulary[term] = new_index
+        map_index[old_index] = new_index
+    matrix.indices = map_index.take(matrix.indices, mode='clip')
+    return matrix
+
+
+def _limit_features(matrix, vocabulary, high, low, limit):
+    """Drop terms outside [low, high] document frequency and keep the `limit` most frequent"""
+    dfs = np.bincount(matrix.indices, minlength=matrix.shape[1])
+    mask = np.ones(len(dfs), dtype=bool)
+    mask &= dfs <= high
+    mask &= dfs >= low
+    if limit is not None and mask.sum() > limit:
+        tfs = np.asarray(matrix.sum(axis=0)).ravel()
+        mask_inds = (-tfs[mask]).argsort()[:limit]
+        new_mask = np.zeros(len(dfs), dtype=bool)
+        new_mask[np.where(mask)[0][mask_inds]] = True
+        mask = new_mask
+
+    new_indices = np.cumsum(mask) - 1
+    for term, old_index in list(vocabulary.items()):
+        if mask[old_index]:
+            vocabulary[term] = new_indices[old_index]
+        else:
+            del vocabulary[term]
+    kept = np.where(mask)[0]
+    if len(kept) == 0:
+        raise ValueError("After pruning, no terms remain. Try a lower min_df or a higher max_df.")
+    return matrix[:, kept]
+
+
+def fit_from_counts(vectorizer, counts, vocabulary):
+    """
+    Finish fitting `vectorizer` from a raw count matrix
+
+    Args:
+            vectorizer: Unfitted TfidfVectorizer whose parameters are applied
+            counts: CSR counts from TermCounter.count_matrix (modified in place)
+            vocabulary: Term -> column of `counts` (modified in place)
+
+    Returns:
+            TF-IDF matrix, identical to vectorizer.fit_transform on the same documents
+    """
+    if vectorizer.binary:
+        counts.data.fill(1)
+
+    n_docs = counts.shape[0]
+    max_df, min_df = vectorizer.max_df, vectorizer.min_df
+    high = max_df if isinstance(max_df, Integral) else max_df * n_docs
+    low = min_df if isinstance(min_df, Integral) else min_df * n_docs
+    if high < low:
+        raise ValueError("max_df corresponds to < documents than min_df")
+
+    if vectorizer.max_features is not None:
+        counts = _sort_features(counts, vocabulary)
+    counts = _limit_features(counts, vocabulary, high, low, vectorizer.max_features)
+    if vectorizer.max_features is None:
+        counts = _sort_features(counts, vocabulary)
+    vectorizer.vocabulary_ = vocabulary
+
+    transformer = _transformer(vectorizer)
+    transformer.fit(counts)
+    matrix = transformer.transform(counts, copy=False)
+    if vectorizer.use_idf:
+        vectorizer.idf_ = transformer.idf_
+    return csr_matrix(matrix)
+
+
+def _transformer(vectorizer):
+    """TfidfTransformer with the weighting parameters of `vectorizer`"""
+    return TfidfTransformer(norm=vectorizer.norm, use_idf=vectorizer.use_idf,
+                            smooth_idf=vectorizer.smooth_idf,
+                            sublinear_tf=vectorizer.sublinear_tf)
+
+
+def transform_fields(vectorizer, fields, weights):
+    """
+    TF-IDF rows of weighted-field documents with a fitted TfidfVectorizer
+
+    Args:
+            vectorizer: TfidfVectorizer fitted by fit_transform_chunks with the same weights
+            fields: Per-field lists of equal length (one entry per document)
+            weights: Count multiplier of each field
+
+    Returns:
+            csr_matrix with one row per document, like vectorizer.transform
+    """
+    counter = TermCounter(vectorizer.build_analyzer(), vectorizer.vocabulary_)
+    counter.update(fields, weights)
+    counts = counter.count_matrix(vectorizer.dtype)
+    if vectorizer.binary:
+        counts.data.fill(1)
+    transformer = _transformer(vectorizer)
+    if vectorizer.use_idf:
+        transformer.idf_ = vectorizer.idf_
+    return csr_matrix(transformer.transform(counts, copy=False))
+
+
+def count_chunk(vectorizer, weights, documents):
+    """
+    Count one chunk with its own vocabulary (module level so worker processes can run it)
+
+    Returns:
+            (terms in first-appearance order, indices, counts, row_nnz) for TermCounter.merge
+    """
+    counter = TermCounter(vectorizer.build_analyzer())
+    counter.update(documents, weights)
+    return list(counter.vocabulary), counter._indices[0], counter._counts[0], counter._row_nnz[0]
+
+
+def fit_transform_chunks(vectorizer, chunks, n_jobs=1, weights=None):
+    """
+    TfidfVectorizer.fit_transform over an iterable of document chunks
+
+    Args:
+            vectorizer: Unfitted TfidfVectorizer
+            chunks: Iterable of lists of documents (with `weights`, of per-field
+                    lists; see TermCounter.update), in corpus order
+            n_jobs: Worker processes tokenizing and counting chunks (0: all cores);
+                    the result is identical for any value
+            weights: Count multiplier of each field
+
+    Returns:
+            TF-IDF matrix (csr_matrix); `vectorizer` is fitted in place
+    """
+    counter = TermCounter(vectorizer.build_analyzer())
+    if n_jobs == 1:
+        for documents in chunks:
+            counter.update(documents, weights)
+    else:
+        for counted in map_chunks(count_chunk, chunks, n_jobs, args=(vectorizer, weights)):
+            counter.merge(*counted)
+    counts = counter.count_matrix(vectorizer.dtype)
+    return fit_from_counts(vectorizer, counts, counter.vocabulary)
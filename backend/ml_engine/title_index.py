@@ -0,0 +1,317 @@
+"""
+Title resolution index for the movie recommendation system
+Built once per trained model so request-time lookups never scan the catalog
+"""
+
+import bisect
+import difflib
+import hashlib
+
+import numpy as np
+from scipy.sparse import csr_matrix, hstack
+from sklearn.feature_extraction.text import HashingVectorizer
+
+try:
+    from ml_engine.catalog import StringColumn
+except ImportError:  # running from inside ml_engine/
+    from catalog import StringColumn
+
+
+# Hashed trigram space; large enough that collisions only cost a few extra candidates
+TRIGRAM_FEATURES = 2 ** 20
+# Stop pulling posting lists once this many (row, trigram) hits are gathered
+POSTINGS_BUDGET = 200000
+
+
+def normalize_title(title):
+    """Lowercase and collapse whitespace so lookups ignore case and spacing"""
+    if not isinstance(title, str):
+        return ''
+    return ' '.join(title.lower().split())
+
+
+def title_hash(normalized):
+    """Stable 64-bit hash of a normalized title (identical across processes)"""
+    digest = hashlib.blake2b(normalized.encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'little')
+
+
+def _trigram_vectorizer():
+    return HashingVectorizer(
+        analyzer='char',
+        ngram_range=(3, 3),
+        n_features=TRIGRAM_FEATURES,
+        lowercase=False,
+        alternate_sign=False,
+        binary=True,
+        norm=None,
+        dtype=np.float32
+    )
+
+
+class _SortedView:
+    """Sequence view of a StringColumn in a given order, for bisect"""
+
+    def __init__(self, column, order):
+        self._column = column
+        self._order = order
+
+    def __len__(self):
+        return len(self._order)
+
+    def __getitem__(self, i):
+        return self._column[self._order[i]]
+
+
+class TitleIndex:
+    """
+    Resolves free-text movie titles to row positions
+
+    Three structures are kept, all built once:
+        - exact: sorted 64-bit hashes of normalized titles -> rows
+        - fuzzy: character trigram inverted index used to shortlist candidates,
+          which are then scored with difflib over a few hundred titles only
+        - substring/prefix: trigram postings intersection (or a sorted prefix
+          array for queries shorter than a trigram) for the contains fallback
+    """
+
+    def __init__(self, titles, max_candidates=300):
+        """
+        Build the index
+
+        Args:
+                titles: Sequence of titles, position i is row i of the catalog
+                max_candidates: Number of shortlisted titles scored with difflib
+        """
+        self.max_candidates = max_candidates
+        normalized = [normalize_title(t) for t in titles]
+        # Normalized titles are kept packed; only shortlisted rows are ever decoded
+        self._norm = StringColumn.from_strings(normalized)
+
+        # Exact match: sorted hashes, ties keep row order so the first row wins
+        hashes = np.fromiter((title_hash(t) for t in normalized),
+                             dtype=np.uint64, count=len(normalized))
+        order = np.argsort(hashes, kind='stable')
+        self._hash_sorted = hashes[order]
+        self._hash_rows = order.astype(np.int32)
+
+        # Trigram inverted index: transpose of the (title x trigram) matrix
+        self._vectorizer = _trigram_vectorizer()
+        grams = self._vectorizer.transform(normalized)
+        self._gram_counts = np.diff(grams.indptr).astype(np.int32)
+        postings = grams.T.tocsr()
+        self._gram_indptr = postings.indptr
+        self._gram_rows = postings.indices.astype(np.int32)
+
+        # Prefix order for queries too short to produce a trigram
+        self._prefix_order = np.argsort(
+            np.array(normalized, dtype=object), kind='stable').astype(np.int32)
+
+    def __len__(self):
+        return len(self._norm)
+
+    def extended(self, titles):
+        """
+        New index over this index's rows followed by `titles`
+
+        Only the new titles are hashed and trigrammed; the result is the same
+        as building an index over all titles from scratch.
+        """
+        offset = len(self)
+        normalized = [normalize_title(t) for t in titles]
+        new_rows = np.arange(offset, offset + len(normalized), dtype=np.int32)
+
+        index = TitleIndex.__new__(TitleIndex)
+        index.max_candidates = self.max_candidates
+        index._norm = StringColumn.concat([self._norm, StringColumn.from_strings(normalized)])
+
+        # Stable sort keeps equal hashes in row order (existing rows first)
+        hashes = np.concatenate([
+            self._hash_sorted,
+            np.fromiter((title_hash(t) for t in normalized), dtype=np.uint64, count=len(normalized))])
+        rows = np.concatenate([self._hash_rows, new_rows])
+        order = np.argsort(hashes, kind='stable')
+        index._hash_sorted = hashes[order]
+        index._hash_rows = rows[order]
+
+        # Append the new rows' postings after the existing ones, gram by gram
+        index._vectorizer = self._vectorizer
+        grams = self._vectorizer.transform(normalized)
+        old_postings = csr_matrix(
+            (np.ones(len(self._gram_rows), dtype=np.float32), self._gram_rows, self._gram_indptr),
+            shape=(TRIGRAM_FEATURES, offset))
+        postings = hstack([old_postings, grams.T.tocsr()], format='csr')
+        index._gram_counts = np.concatenate(
+            [self._gram_counts, np.diff(grams.indptr).astype(np.int32)])
+        index._gram_indptr = postings.indptr
+        index._gram_rows = postings.indices.astype(np.int32)
+
+        index._prefix_order = np.argsort(
+            np.array(list(index._norm), dtype=object), kind='stable').astype(np.int32)
+        return index
+
+    def to_arrays(self):
+        """Plain NumPy arrays for persistence"""
+        arrays = {
+            'hash_sorted': self._hash_sorted,
+            'hash_rows': self._hash_rows,
+            'gram_counts': self._gram_counts,
+            'gram_indptr': self._gram_indptr,
+            'gram_rows': self._gram_rows,
+            'prefix_order': self._prefix_order,
+        }
+        arrays.update(self._norm.to_arrays('norm'))
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, arrays, max_candidates=300):
+        """Rebuild an index from to_arrays() output without re-processing titles"""
+        index = cls.__new__(cls)
+        index.max_candidates = max_candidates
+        index._norm = StringColumn.from_arrays(arrays, 'norm')
+        index._hash_sorted = arrays['hash_sorted']
+        index._hash_rows = arrays['hash_rows']
+        index._vectorizer = _trigram_vectorizer()
+        index._gram_counts = arrays['gram_counts']
+        index._gram_indptr = arrays['gram_indptr']
+        index._gram_rows = arrays['gram_rows']
+        index._prefix_order = arrays['prefix_order']
+        return index
+
+    def exact(self, title):
+        """Row of the first title equal to `title` after normalization, or None"""
+        rows = self.rows(title)
+        return rows[0] if rows else None
+
+    def rows(self, title):
+        """All rows whose title equals `title` after normalization, in row order"""
+        normalized = normalize_title(title)
+        if not normalized:
+            return []
+        return self._exact_rows(normalized)
+
+    def resolve(self, title, cutoff=0.3):
+        """
+        Resolve a title to a single row
+
+        Exact match first, then best fuzzy match above `cutoff`, then the first
+        title containing the query.
+
+        Returns:
+                Row position or None
+        """
+        normalized = normalize_title(title)
+        if not normalized:
+            return None
+
+        row = self._exact_normalized(normalized)
+        if row is not None:
+            return row
+
+        ranked = self._rank(normalized, n=1, cutoff=cutoff)
+        if ranked:
+            return ranked[0]
+
+        return self._first_containing(normalized)
+
+    def search(self, query, n=10, cutoff=0.3):
+        """
+        Rows of the `n` titles closest to `query`, best first
+
+        An exact match (if any) is always ranked first.
+        """
+        normalized = normalize_title(query)
+        if not normalized:
+            return []
+
+        rows = []
+        exact = self._exact_normalized(normalized)
+        if exact is not None:
+            rows.append(exact)
+        for row in self._rank(normalized, n=n, cutoff=cutoff):
+            if len(rows) >= n:
+                break
+            if row != exact:
+                rows.append(row)
+        return rows
+
+    def _exact_rows(self, normalized):
+        h = np.uint64(title_hash(normalized))
+        lo = np.searchsorted(self._hash_sorted, h, side='left')
+        hi = np.searchsorted(self._hash_sorted, h, side='right')
+        # Equal hashes are contiguous and in row order; compare to drop collisions
+        return [int(row) for row in self._hash_rows[lo:hi] if self._norm[row] == normalized]
+
+    def _exact_normalized(self, normalized):
+        rows = self._exact_rows(normalized)
+        return rows[0] if rows else None
+
+    def _query_grams(self, normalized):
+        return self._vectorizer.transform([normalized]).indices
+
+    def _shortlist(self, normalized):
+        """Rows sharing the most trigrams with the query (at most max_candidates)"""
+        grams = self._query_grams(normalized)
+        if len(grams) == 0:
+            return np.empty(0, dtype=np.int32)
+
+        # Rarest trigrams first; very common ones are skipped once the budget is hit
+        starts = self._gram_indptr[grams]
+        lengths = self._gram_indptr[grams + 1] - starts
+        order = np.argsort(lengths, kind='stable')
+        within_budget = np.cumsum(lengths[order]) <= POSTINGS_BUDGET
+        within_budget[0] = True
+        selected = order[within_budget]
+
+        rows = np.concatenate([
+            self._gram_rows[starts[i]:starts[i] + lengths[i]] for i in selected])
+        if len(rows) == 0:
+            return rows
+        candidates, hits = np.unique(rows, return_counts=True)
+
+        # Dice coefficient over trigram sets
+        scores = 2.0 * hits / (len(grams) + self._gram_counts[candidates])
+        if len(candidates) > self.max_candidates:
+            top = np.argpartition(-scores, self.max_candidates)[:self.max_candidates]
+            candidates = candidates[top]
+        return candidates
+
+    def _rank(self, normalized, n, cutoff):
+        """difflib ratio ranking restricted to the trigram shortlist"""
+        matcher = difflib.SequenceMatcher()
+        matcher.set_seq2(normalized)
+        scored = []
+        for row in self._shortlist(normalized):
+            matcher.set_seq1(self._norm[row])
+            if (matcher.real_quick_ratio() >= cutoff and
+                    matcher.quick_ratio() >= cutoff):
+                ratio = matcher.ratio()
+                if ratio >= cutoff:
+                    scored.append((-ratio, int(row)))
+        scored.sort()
+        return [row for _, row in scored[:n]]
+
+    def _first_containing(self, normalized):
+        """Lowest row whose title contains the query"""
+        if len(normalized) < 3:
+            view = _SortedView(self._norm, self._prefix_order)
+            lo = bisect.bisect_left(view, normalized)
+            hi = bisect.bisect_left(view, normalized + '\uffff', lo=lo)
+            if hi > lo:
+                return int(self._prefix_order[lo:hi].min())
+            return None
+
+        # Every trigram of the query must be present; verify to drop hash collisions
+        grams = self._query_grams(normalized)
+        candidates = None
+        lengths = self._gram_indptr[grams + 1] - self._gram_indptr[grams]
+        for g in grams[np.argsort(lengths, kind='stable')]:
+            rows = self._gram_rows[self._gram_indptr[g]:self._gram_indptr[g + 1]]
+            candidates = rows if candidates is None else np.intersect1d(
+                candidates, rows, assume_unique=True)
+            if len(candidates) == 0:
+                return None
+        for row in np.sort(candidates):
+            if normalized in self._norm[row]:
+                return int(row)
+        return None
@@ -0,0 +1,112 @@
+"""
+Shared fixtures for the backend tests
+Builds a small synthetic TMDB-style dataset so the ML engine can be trained in-process
+"""
+
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+
+GENRE_KEYWORDS = {
+    'Action': 'explosion chase hero',
+    'Adventure': 'journey quest treasure',
+    'Science Fiction': 'space alien future',
+    'Drama': 'family loss love',
+    'Comedy': 'funny friends party',
+    'Horror': 'haunted ghost fear',
+    'Animation': 'cartoon talking animals',
+    'Romance': 'wedding love affair',
+}
+
+GENRE_SETS = [
+    ['Action', 'Adventure', 'Science Fiction'],
+    ['Drama', 'Romance'],
+    ['Comedy', 'Romance'],
+    ['Horror'],
+    ['Animation', 'Comedy', 'Adventure'],
+    ['Action', 'Drama'],
+]
+
+
+def make_movies(count=240):
+    """Synthetic catalog with TMDB column names and a popularity gradient"""
+    rows = []
+    for i in range(count):
+        genres = GENRE_SETS[i % len(GENRE_SETS)]
+        keywords = ' '.join(GENRE_KEYWORDS[g] for g in genres)
+        rows.append({
+            'id': 1000 + i,
+            'title': f"Movie Number {i}",
+            'genres': ', '.join(genres),
+            'keywords': keywords,
+            'tagline': f"Tagline {i}",
+            'overview': f"A story about {keywords} number {i % 7}",
+            'original_language': 'en' if i % 5 else 'fr',
+            'popularity': float(count - i),
+            'release_date': f"{1980 + i % 40}-01-01",
+            'imdb_id': f"tt{1000000 + i:07d}",
+            'budget': i * 1000,
+        })
+    rows[0]['title'] = 'Avatar'
+    rows[6]['title'] = 'Avatar: The Way of Water'
+    rows[1]['title'] = 'The Notebook'
+    rows[3]['title'] = 'The Conjuring'
+    rows[2]['title'] = '2012'
+    return pd.DataFrame(rows)
+
+
+@pytest.fixture
+def tmbd_csv(tmp_path):
+    """Path to a synthetic tmbd.csv"""
+    path = tmp_path / 'tmbd.csv'
+    make_movies().to_csv(path, index=False)
+    return str(path)
+
+
+@pytest.fixture
+def trained_system(tmbd_csv):
+    """MovieRecommendationSystem trained on the synthetic dataset"""
+    from ml_engine.movie_recommendation_optimized import MovieRecommendationSystem
+    system = MovieRecommendationSystem(dataset_path=tmbd_csv, use_large_dataset=True)
+    assert system.load_data()
+    assert system.train_model()
+    return system
+
+
+class FakeRedis:
+    """In-memory stand-in for the redis.Redis calls the cache backends make"""
+
+    def __init__(self):
+        self.data = {}
+        self.expiry = {}
+        self.fail = False
+
+    def get(self, name):
+        if self.fail:
+            raise ConnectionError('redis unavailable')
+        return self.data.get(name)
+
+    def set(self, name, value, ex=None):
+        if self.fail:
+            raise ConnectionError('redis unavailable')
+        self.data[name] = value
+        self.expiry[name] = ex
+        return True
+
+    def delete(self, *names):
+        return sum(self.data.pop(name, None) is not None for name in names)
+
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    """CACHE_TYPE=redis, with every client connected to one shared FakeRedis"""
+    import redis
+    server = FakeRedis()
+    monkeypatch.setenv('CACHE_TYPE', 'redis')
+    monkeypatch.setattr(redis.Redis, 'from_url', classmethod(lambda cls, url, **kwargs: server))
+    return server
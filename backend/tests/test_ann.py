@@ -0,0 +1,135 @@
+"""
+Tests for the IVF approximate nearest-neighbour index
+"""
+
+import numpy as np
+import pytest
+
+from ml_engine.ann import IVFIndex, default_nlist
+from ml_engine.movie_recommendation_optimized import MovieRecommendationSystem
+
+
+@pytest.fixture
+def ann_system(tmbd_csv):
+    system = MovieRecommendationSystem(dataset_path=tmbd_csv)
+    assert system.load_data()
+    assert system.train_model(ann_lists=8)
+    return system
+
+
+def exact_scores(matrix, query, k):
+    """Top-k similarities (rows tie on duplicate movies, so compare scores)"""
+    scores = (matrix @ query.T).toarray().ravel()
+    return np.sort(scores)[::-1][:k]
+
+
+def test_every_row_is_filed_once(ann_system):
+    index = ann_system.ann_index
+    assert index.nlist == 8
+    assert len(index) == ann_system.feature_matrix.shape[0]
+    assert np.array_equal(np.sort(index.list_rows), np.arange(len(index)))
+    assert index.list_offsets[-1] == len(index)
+    assert default_nlist(2500) == 3
+
+
+def test_probing_every_list_is_exact(ann_system):
+    matrix = ann_system.feature_matrix
+    index = ann_system.ann_index
+    for row in [0, 1, 3, 77]:
+        rows, scores = index.search(matrix, matrix[row], 10, nprobe=index.nlist)
+        expected = (matrix[rows] @ matrix[row].T).toarray().ravel()
+        assert np.allclose(scores, expected)
+        assert np.all(np.diff(scores) <= 0)
+        assert np.allclose(scores, exact_scores(matrix, matrix[row], 10))
+
+
+def test_recall_grows_with_nprobe(ann_system):
+    matrix = ann_system.feature_matrix
+    index = ann_system.ann_index
+    recalls = []
+    for nprobe in [1, 4, 8]:
+        hits = 0
+        for row in range(0, 240, 12):
+            found = index.search(matrix, matrix[row], 10, nprobe=nprobe)
+            if found is not None:
+                kth = exact_scores(matrix, matrix[row], 10)[-1]
+                hits += int(np.sum(found[1] >= kth - 1e-6))
+        recalls.append(hits)
+    assert recalls == sorted(recalls)
+    assert recalls[-1] == 20 * 10
+
+
+def scores(recommendations):
+    return [rec['similarity_score'] for rec in recommendations]
+
+
+def test_recommendations_fall_back_to_exact(ann_system):
+    exact = ann_system.get_recommendations('The Notebook', 5, nprobe=0)
+    assert scores(ann_system.get_recommendations('The Notebook', 5, nprobe=8)) == scores(exact)
+    # Lists too small for the requested candidates: exact search instead
+    assert ann_system.get_recommendations('The Notebook', 5, nprobe=1)
+
+    ann_system.ann_index = None
+    assert ann_system.get_recommendations('The Notebook', 5) == exact
+
+
+def test_index_is_only_built_on_request(trained_system):
+    # Approximate results are opt-in whatever the catalog size
+    assert trained_system.ann_index is None
+    assert 'ann_lists' not in trained_system.build_config()
+
+
+def test_index_round_trips_through_artifact(ann_system, tmbd_csv, tmp_path):
+    path = str(tmp_path / 'model')
+    assert ann_system.save_model(path)
+    loaded = MovieRecommendationSystem(dataset_path=tmbd_csv)
+    assert loaded.load_model(path)
+
+    assert isinstance(loaded.ann_index, IVFIndex)
+    assert loaded.ann_index.nlist == 8
+    assert np.array_equal(loaded.ann_index.list_rows, ann_system.ann_index.list_rows)
+    assert loaded.build_config() == ann_system.build_config()
+    for nprobe in [None, 2]:
+        assert (loaded.get_recommendations('Avatar', 5, nprobe=nprobe)
+                == ann_system.get_recommendations('Avatar', 5, nprobe=nprobe))
+
+
+def test_extended_model_files_new_rows(tmbd_csv):
+    base = MovieRecommendationSystem(dataset_path=tmbd_csv)
+    assert base.load_data(limit=100)
+    assert base.train_model(ann_lists=4)
+
+    extended = base.extended(240)
+    index = extended.ann_index
+    assert index.centroids is base.ann_index.centroids
+    assert np.array_equal(np.sort(index.list_rows), np.arange(240))
+    rows, _ = index.search(extended.feature_matrix, extended.feature_matrix[200], 5,
+                           nprobe=index.nlist)
+    assert 200 in rows
+
+
+def test_oversized_lists_are_split(ann_system, monkeypatch):
+    import ml_engine.ann as ann
+    monkeypatch.setattr(ann, 'ROWS_PER_LIST', 20)
+    monkeypatch.setattr(ann, 'MAX_LIST_ROWS', 40)
+    matrix = ann_system.feature_matrix
+    index = IVFIndex.build(matrix, nlist=2)
+    assert index.nlist > 2
+    assert np.array_equal(np.sort(index.list_rows), np.arange(matrix.shape[0]))
+    rows, scores = index.search(matrix, matrix[5], 10, nprobe=index.nlist)
+    assert np.allclose(scores, exact_scores(matrix, matrix[5], 10))
+
+
+def test_extended_index_splits_lists_that_outgrow_the_cap(tmbd_csv, monkeypatch):
+    import ml_engine.ann as ann
+    base = MovieRecommendationSystem(dataset_path=tmbd_csv)
+    assert base.load_data(limit=60)
+    assert base.train_model(ann_lists=2)
+    monkeypatch.setattr(ann, 'ROWS_PER_LIST', 20)
+    monkeypatch.setattr(ann, 'MAX_LIST_ROWS', 40)
+
+    # 60 -> 240 rows under 2 centroids would average 120 rows per list
+    index = base.extended(240).ann_index
+    assert index.nlist > 2
+    assert np.diff(index.list_offsets).max() <= 40
+    assert np.array_equal(np.sort(index.list_rows), np.arange(240))
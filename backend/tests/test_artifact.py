@@ -0,0 +1,83 @@
+"""
+Tests for the memory-mapped model artifact format
+"""
+
+import json
+import os
+
+import numpy as np
+import pytest
+
+from ml_engine.artifact import (FORMAT_VERSION, ArtifactError, dataset_fingerprint, find_artifacts,
+                                 read_artifact, write_artifact)
+from ml_engine.movie_recommendation_optimized import MovieRecommendationSystem
+
+
+def test_write_and_read_arrays(tmp_path):
+    path = str(tmp_path / 'artifact')
+    write_artifact(path, {'name': 'demo'}, {'a.values': np.arange(5, dtype=np.int32)},
+                   vocabulary=['alpha', 'beta gamma'])
+
+    manifest, arrays, vocabulary = read_artifact(path)
+    assert manifest['format_version'] == FORMAT_VERSION
+    assert manifest['arrays']['a.values'] == {'dtype': 'int32', 'shape': [5]}
+    assert isinstance(arrays['a.values'], np.memmap)
+    assert arrays['a.values'].tolist() == [0, 1, 2, 3, 4]
+    assert vocabulary == ['alpha', 'beta gamma']
+
+    # Overwrite in place
+    write_artifact(path, {'name': 'demo'}, {'b': np.zeros(0)})
+    manifest, arrays, vocabulary = read_artifact(path, mmap=False)
+    assert list(arrays) == ['b'] and vocabulary is None
+    assert os.listdir(str(tmp_path)) == ['artifact']
+
+
+def test_rejects_missing_or_foreign_artifacts(tmp_path):
+    with pytest.raises(ArtifactError):
+        read_artifact(str(tmp_path / 'missing'))
+
+    path = tmp_path / 'old'
+    path.mkdir()
+    (path / 'manifest.json').write_text(json.dumps({'format_version': 0, 'arrays': {}}))
+    with pytest.raises(ArtifactError):
+        read_artifact(str(path))
+
+
+def test_model_round_trip_is_memory_mapped(tmbd_csv, tmp_path):
+    system = MovieRecommendationSystem(dataset_path=tmbd_csv)
+    assert system.load_data()
+    assert system.train_model(sample_size=60)
+    path = str(tmp_path / 'model')
+    assert system.save_model(path)
+    assert not any(name.endswith('.pkl') for name in os.listdir(path))
+
+    loaded = MovieRecommendationSystem(dataset_path=tmbd_csv)
+    assert loaded.load_model(path)
+    # Read-only views over the mapped files, not private copies
+    assert not loaded.feature_matrix.data.flags.writeable
+    assert not loaded.catalog.titles.buffer.flags.writeable
+    assert len(loaded.catalog) == 240
+    assert loaded.num_movies == 60
+    assert loaded.resolve_movie('tt1000200') == 200
+    for title in ['Avatar', 'Movie Number 200', 'Notebok']:
+        assert loaded.get_recommendations(title, 5) == system.get_recommendations(title, 5)
+
+    text = 'Drama, Romance family loss love'
+    assert np.allclose(loaded.vectorizer.transform([text]).toarray(),
+                       system.vectorizer.transform([text]).toarray())
+
+
+def test_find_artifacts_filters_by_dataset(tmbd_csv, tmp_path):
+    fingerprint = dataset_fingerprint(tmbd_csv)
+    assert fingerprint == dataset_fingerprint(tmbd_csv)
+
+    root = tmp_path / 'models'
+    write_artifact(str(root / 'small'), {'dataset_fingerprint': fingerprint, 'catalog_size': 10}, {})
+    write_artifact(str(root / 'large'), {'dataset_fingerprint': fingerprint, 'catalog_size': 50}, {})
+    write_artifact(str(root / 'other'), {'dataset_fingerprint': 'f' * 16, 'catalog_size': 90}, {})
+    (root / 'incomplete').mkdir()
+
+    found = [os.path.basename(path) for path, _ in find_artifacts(str(root), fingerprint)]
+    assert found == ['large', 'small']
+    assert len(find_artifacts(str(root))) == 3
+    assert find_artifacts(str(tmp_path / 'missing')) == []
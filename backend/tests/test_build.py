@@ -0,0 +1,55 @@
+"""
+Tests for the offline model build command
+"""
+
+import os
+
+from ml_engine.artifact import read_manifest
+from ml_engine.build import main
+from ml_engine.movie_recommendation_optimized import MovieRecommendationSystem
+
+
+def test_build_writes_content_addressed_artifact(tmbd_csv, tmp_path, capsys):
+    output = str(tmp_path / 'models')
+    args = ['--dataset', tmbd_csv, '--output', output, '--limit', '200', '--min-df', '1']
+    assert main(args) == 0
+    (name,) = os.listdir(output)
+    path = os.path.join(output, name)
+
+    manifest = read_manifest(path)
+    assert manifest['load_limit'] == 200
+    assert manifest['vectorizer']['params']['min_df'] == 1
+    assert manifest['matrix']['shape'][0] == manifest['catalog_size'] == 200
+    assert manifest['matrix']['nnz'] > 0
+    assert set(manifest['build']['timings']) == {'load_seconds', 'train_seconds'}
+    assert name.endswith(manifest['build_key'])
+
+    # Same inputs resolve to the same directory without retraining
+    capsys.readouterr()
+    assert main(args) == 0
+    assert 'already built' in capsys.readouterr().out
+    assert os.listdir(output) == [name]
+
+    # Different parameters get their own artifact
+    assert main(args[:-1] + ['2']) == 0
+    assert len(os.listdir(output)) == 2
+
+    system = MovieRecommendationSystem(dataset_path=tmbd_csv)
+    assert system.load_model(path)
+    assert system.get_recommendations('Avatar', 3)
+
+
+def test_build_missing_dataset(tmp_path):
+    assert main(['--dataset', str(tmp_path / 'missing.csv'), '--output', str(tmp_path)]) == 1
+
+
+def test_build_hashing_backend(tmbd_csv, tmp_path):
+    output = str(tmp_path / 'models')
+    assert main(['--dataset', tmbd_csv, '--output', output, '--backend', 'hashing',
+                 '--hash-features', '4096', '--jobs', '1']) == 0
+    (name,) = os.listdir(output)
+    manifest = read_manifest(os.path.join(output, name))
+    assert manifest['vectorizer']['type'] == 'hashing'
+    assert manifest['vectorizer']['params']['n_features'] == 4096
+    assert 'n_jobs' not in manifest['vectorizer']['params']
+    assert manifest['build']['config']['feature_backend'] == 'hashing'
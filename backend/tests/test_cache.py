@@ -0,0 +1,177 @@
+"""
+Tests for the bounded service result cache and request coalescing
+"""
+
+import threading
+import time
+
+import pytest
+
+from app.services.cache import (LRUCache, RedisCache, SingleFlight, create_cache,
+                                decode_value, encode_value, estimate_size)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_lru_eviction_by_entries():
+    cache = LRUCache(max_entries=2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    assert cache.get('a') == 1  # 'b' is now least recently used
+    cache.set('c', 3)
+    assert cache.get('b') is None
+    assert cache.get('a') == 1 and cache.get('c') == 3
+    stats = cache.stats()
+    assert stats['evictions'] == 1 and stats['hits'] == 3 and stats['misses'] == 1
+
+
+def test_eviction_by_bytes():
+    cache = LRUCache(max_bytes=100)
+    cache.set('a', 'x' * 40)
+    cache.set('b', 'y' * 40)
+    assert cache.nbytes == 2 * estimate_size('x' * 40)
+    cache.set('c', 'z' * 40)
+    assert len(cache) == 2 and cache.get('a') is None
+    assert cache.nbytes <= 100
+    # Larger than the whole cache: not stored
+    cache.set('huge', 'w' * 200)
+    assert cache.get('huge') is None and len(cache) == 2
+
+    cache.set('b', 'short')
+    assert cache.nbytes == estimate_size('z' * 40) + estimate_size('short')
+
+
+def test_ttl_expiry():
+    clock = Clock()
+    cache = LRUCache(ttl_seconds=10, clock=clock)
+    cache.set('a', 1)
+    clock.now = 9
+    cache.set('b', 2)
+    assert cache.get('a') == 1
+    clock.now = 10
+    assert cache.get('a') is None
+    clock.now = 20
+    cache.set('c', 3)  # purges 'b'
+    assert len(cache) == 1
+    stats = cache.stats()
+    assert stats['expirations'] == 2 and stats['evictions'] == 0
+
+
+def test_concurrent_access_keeps_accounting_consistent():
+    cache = LRUCache(max_entries=50)
+
+    def worker(offset):
+        for i in range(2000):
+            cache.set((offset + i) % 120, i)
+            cache.get((offset + i * 7) % 120)
+
+    threads = [threading.Thread(target=worker, args=(n * 31,)) for n in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(cache) == 50
+    assert cache.nbytes == sum(size for _, size, _ in cache._entries.values())
+    stats = cache.stats()
+    assert stats['hits'] + stats['misses'] == 8000
+
+
+def run_together(target, count):
+    """Call target() from `count` threads at once; returns their results"""
+    barrier = threading.Barrier(count)
+    results = [None] * count
+
+    def worker(i):
+        barrier.wait()
+        try:
+            results[i] = target()
+        except Exception as e:
+            results[i] = e
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=10)
+    return results
+
+
+def test_single_flight_shares_one_call():
+    flights = SingleFlight()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        time.sleep(0.2)
+        return {'answer': 42}
+
+    results = run_together(lambda: flights.do('key', compute), 6)
+    assert len(calls) == 1
+    assert all(result is results[0] for result in results)
+    assert flights.coalesced == 5
+    # Nothing is kept once the call completes
+    flights.do('key', compute)
+    assert len(calls) == 2
+
+
+def test_single_flight_shares_errors():
+    flights = SingleFlight()
+
+    def fail():
+        time.sleep(0.2)
+        raise ValueError('boom')
+
+    results = run_together(lambda: flights.do('key', fail), 3)
+    assert all(isinstance(result, ValueError) for result in results)
+    with pytest.raises(ValueError):
+        flights.do('key', fail)
+
+
+def test_values_are_compact_and_round_trip():
+    small = {'title': 'Avatar', 'score': 0.5}
+    assert encode_value(small).startswith(b'j')
+    large = {'similar_movies': [{'title': f"Movie {i}", 'similarity_score': 0.25, 'rank': i}
+                                for i in range(30)]}
+    encoded = encode_value(large)
+    assert encoded.startswith(b'z') and len(encoded) < estimate_size(large)
+    assert decode_value(encoded) == large and decode_value(encode_value(small)) == small
+
+
+def test_redis_cache_shares_entries(fake_redis):
+    writer = create_cache('moviehub:test', ttl_seconds=60)
+    reader = create_cache('moviehub:test', ttl_seconds=60)
+    assert isinstance(writer, RedisCache) and writer.shared
+    writer.set(('model-a', 'similar', 3), {'limit': 30, 'rows': [1, 2]})
+    assert fake_redis.expiry == {'moviehub:test:model-a:similar:3': 60}
+    assert reader.get(('model-a', 'similar', 3)) == {'limit': 30, 'rows': [1, 2]}
+    assert reader.get(('model-b', 'similar', 3)) is None
+    assert reader.keys() == [('model-a', 'similar', 3)]
+    stats = reader.stats()
+    assert stats['backend'] == 'redis' and stats['hits'] == 1 and stats['misses'] == 1
+
+    # Discarding only forgets keys locally; other processes may still read them
+    reader.discard(lambda key: key[0] == 'model-a')
+    assert reader.keys() == [] and fake_redis.data
+    writer.clear()
+    assert fake_redis.data == {}
+
+
+def test_redis_errors_are_misses(fake_redis):
+    cache = create_cache('moviehub:test')
+    fake_redis.fail = True
+    cache.set('key', {'a': 1})
+    assert cache.get('key') is None
+    assert cache.stats()['errors'] == 2
+
+
+def test_default_backend_is_in_process(monkeypatch):
+    monkeypatch.delenv('CACHE_TYPE', raising=False)
+    cache = create_cache('moviehub:test', max_entries=5)
+    assert isinstance(cache, LRUCache) and not cache.shared
+    assert cache.stats()['backend'] == 'memory'
@@ -0,0 +1,117 @@
+"""
+Tests for the catalog lookup tables
+"""
+
+import numpy as np
+import pandas as pd
+
+from ml_engine.catalog import (
+    CatalogLookup, GenreEncoder, MovieCatalog, StringColumn, genre_overlap, parse_imdb_id, split_genres)
+
+
+def test_parse_imdb_id():
+    assert parse_imdb_id('tt0499549') == 499549
+    assert parse_imdb_id('') == -1
+    assert parse_imdb_id(None) == -1
+
+
+def test_dense_ids_use_direct_table():
+    movies = pd.DataFrame({'id': [5, 3, 3, None], 'imdb_id': ['tt0000010', '', 'tt0000011', 'tt0000010'],
+                           'title': ['A', 'B', 'C', 'D']})
+    catalog = MovieCatalog.from_frame(movies)
+    lookup = CatalogLookup.build(catalog.ids, catalog.imdb_ids)
+    assert lookup.row_for_id(3) == 1
+    assert lookup.row_for_id('5') == 0
+    assert lookup.row_for_id(4) is None
+    assert lookup.row_for_id(10 ** 9) is None
+    assert lookup.row_for_imdb('tt0000010') == 0
+    assert lookup.row_for_imdb('tt0000011') == 2
+    assert 'tmdb_table' in lookup.to_arrays()
+
+
+def test_sparse_ids_round_trip():
+    lookup = CatalogLookup.build(np.array([10 ** 8, 7, 10 ** 9]))
+    arrays = lookup.to_arrays()
+    assert 'tmdb_keys' in arrays
+    restored = CatalogLookup.from_arrays(arrays)
+    assert restored.row_for_id(10 ** 9) == 2
+    assert restored.row_for_id(7) == 1
+    assert restored.row_for_id(8) is None
+    assert restored.row_for_imdb('tt0000001') is None
+    assert len(restored) == 3
+
+
+def test_model_resolves_ids(trained_system):
+    assert trained_system.resolve_movie('1001') == 1
+    assert trained_system.resolve_movie('tt1000003') == 3
+    assert trained_system.title_index.rows('AVATAR') == [0]
+    assert isinstance(trained_system.lookup.to_arrays()['size'], np.ndarray)
+
+
+def test_split_genres():
+    assert split_genres('Action, Science Fiction') == ['Action', 'Science Fiction']
+    assert split_genres('Action Adventure') == ['Action', 'Adventure']
+    assert split_genres(float('nan')) == []
+
+
+def test_genre_overlap_popcount():
+    genres = ['Action, Drama', 'Drama', '', 'Comedy, Action, Drama']
+    encoder = GenreEncoder.fit(genres)
+    masks = encoder.encode(genres)
+    assert masks.dtype == np.uint64
+    source = encoder.encode_one('Drama, Action, Western')
+    assert genre_overlap(masks, source).tolist() == [2, 1, 0, 2]
+
+
+def test_genre_masks_span_multiple_words():
+    genres = [', '.join(f'G{i}' for i in range(start, start + 3)) for start in range(0, 90, 3)]
+    encoder = GenreEncoder.fit(genres)
+    assert encoder.words == 2
+    masks = encoder.encode(genres)
+    source = encoder.encode_one('G88, G87, G0')
+    overlaps = genre_overlap(masks, source)
+    assert overlaps[0] == 1 and overlaps[-1] == 2 and overlaps[5] == 0
+
+
+def test_string_column_packs_utf8():
+    column = StringColumn.from_strings(['Amélie', '', None, '千と千尋の神隠し'])
+    assert len(column) == 4
+    assert column[0] == 'Amélie'
+    assert column[2] == ''
+    assert list(column) == ['Amélie', '', '', '千と千尋の神隠し']
+    assert column.buffer.dtype == np.uint8
+
+
+def test_catalog_round_trip():
+    movies = pd.DataFrame({
+        'id': [1, 2], 'title': ['Up', 'Heat'], 'genres': ['Animation, Comedy', 'Crime'],
+        'popularity': ['3.5', None], 'release_date': ['2009-05-28', ''],
+    })
+    catalog = MovieCatalog.from_frame(movies)
+    restored = MovieCatalog.from_arrays(catalog.to_arrays())
+    assert list(restored.titles) == ['Up', 'Heat']
+    assert restored.years.tolist() == [2009, 0]
+    assert restored.popularity.tolist() == [3.5, 0.0]
+    assert restored.genre_encoder.vocabulary == ['Animation', 'Comedy', 'Crime']
+    assert (restored.genre_masks == catalog.genre_masks).all()
+
+
+def test_string_column_concat():
+    column = StringColumn.concat([StringColumn.from_strings(['a', 'bé']),
+                                  StringColumn.from_strings([]),
+                                  StringColumn.from_strings(['', 'c'])])
+    assert list(column) == ['a', 'bé', '', 'c']
+
+
+def test_catalog_extended_keeps_genre_bits():
+    first = pd.DataFrame({'id': [1, 2], 'title': ['A', 'B'], 'genres': ['Drama', 'Comedy, Drama']})
+    more = pd.DataFrame({'id': [3], 'title': ['C'], 'genres': ['Western, Drama']})
+    catalog = MovieCatalog.from_frame(first).extended(more)
+
+    assert list(catalog.titles) == ['A', 'B', 'C']
+    assert catalog.ids.tolist() == [1, 2, 3]
+    assert catalog.genre_encoder.vocabulary == ['Comedy', 'Drama', 'Western']
+    drama = catalog.genre_encoder.encode_one('Drama')
+    assert genre_overlap(catalog.genre_masks, drama).tolist() == [1, 1, 1]
+    western = catalog.genre_encoder.encode_one('Western, Comedy')
+    assert genre_overlap(catalog.genre_masks, western).tolist() == [0, 1, 1]
@@ -0,0 +1,105 @@
+"""
+Tests for the columnar dataset cache next to tmbd.csv
+"""
+
+import glob
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip('pyarrow')
+
+from conftest import make_movies
+from ml_engine.movie_recommendation_optimized import MovieRecommendationSystem
+
+
+def _caches(csv_path):
+    return glob.glob(os.path.join(os.path.dirname(csv_path), '.tmbd.csv.*.arrow'))
+
+
+def _load(csv_path, limit=None):
+    system = MovieRecommendationSystem(dataset_path=csv_path)
+    assert system.load_data(limit=limit)
+    return system
+
+
+def test_full_read_writes_cache_and_later_loads_use_it(tmbd_csv, monkeypatch):
+    parsed = _load(tmbd_csv).movies_data
+    assert len(_caches(tmbd_csv)) == 1
+
+    def _no_csv(*args, **kwargs):
+        raise AssertionError('CSV parsed despite a valid cache')
+    monkeypatch.setattr(pd, 'read_csv', _no_csv)
+
+    cached = _load(tmbd_csv).movies_data
+    pd.testing.assert_frame_equal(cached, parsed, check_categorical=False)
+    assert isinstance(cached['original_language'].dtype, pd.CategoricalDtype)
+
+    limited = _load(tmbd_csv, limit=50).movies_data
+    assert len(limited) == 50
+    assert limited['title'].tolist() == parsed['title'].head(50).tolist()
+
+
+def test_cached_load_trains_identical_model(tmbd_csv):
+    first = _load(tmbd_csv)
+    assert first.train_model()
+    second = _load(tmbd_csv)
+    assert second.train_model()
+    assert np.array_equal(first.feature_matrix.data, second.feature_matrix.data)
+    assert first.get_recommendations('Avatar', 5) == second.get_recommendations('Avatar', 5)
+
+
+def test_partial_read_does_not_write_cache(tmbd_csv):
+    _load(tmbd_csv, limit=100)
+    assert _caches(tmbd_csv) == []
+
+
+def test_changed_csv_rebuilds_cache(tmbd_csv):
+    _load(tmbd_csv)
+    (old,) = _caches(tmbd_csv)
+
+    movies = make_movies(300)
+    movies.loc[0, 'title'] = 'Avatar Reloaded'
+    movies.to_csv(tmbd_csv, index=False)
+    reloaded = _load(tmbd_csv).movies_data
+    assert len(reloaded) == 300 and reloaded['title'][0] == 'Avatar Reloaded'
+    (new,) = _caches(tmbd_csv)
+    assert new != old
+
+
+def test_disabled_cache(tmbd_csv):
+    system = MovieRecommendationSystem(dataset_path=tmbd_csv, dataset_cache=False)
+    assert system.load_data()
+    assert _caches(tmbd_csv) == []
+
+
+def test_extension_reads_remaining_rows_from_cache(tmbd_csv, monkeypatch):
+    full = _load(tmbd_csv).movies_data
+    base = _load(tmbd_csv, limit=100)
+    assert base.train_model()
+
+    monkeypatch.setattr(pd, 'read_csv', lambda *args, **kwargs: pytest.fail('CSV parsed'))
+    extended = base.extended(240)
+    assert list(extended.catalog.titles) == full['title'].tolist()
+
+
+def test_extension_to_end_of_file_writes_cache(tmbd_csv, monkeypatch):
+    base = _load(tmbd_csv, limit=100)
+    assert base.train_model()
+    assert _caches(tmbd_csv) == []
+
+    # Phase 2 stops short of the end: nothing to cache yet
+    assert base.extended(200) is not None
+    assert _caches(tmbd_csv) == []
+
+    # Reaches the end of the file: the whole dataset (leading rows included) is cached
+    assert len(base.extended(5000).catalog) == 240
+    assert len(_caches(tmbd_csv)) == 1
+    parsed = MovieRecommendationSystem(dataset_path=tmbd_csv, dataset_cache=False)
+    assert parsed.load_data()
+
+    monkeypatch.setattr(pd, 'read_csv', lambda *args, **kwargs: pytest.fail('CSV parsed'))
+    cached = _load(tmbd_csv).movies_data
+    pd.testing.assert_frame_equal(cached, parsed.movies_data, check_categorical=False)
@@ -0,0 +1,104 @@
+"""
+Tests for the truncated-SVD embedding mode
+"""
+
+import numpy as np
+import pytest
+
+from ml_engine.benchmark import embedding_sweep, main as benchmark_main, sample_rows
+from ml_engine.embedding import LatentEmbedding
+from ml_engine.movie_recommendation_optimized import MovieRecommendationSystem
+
+
+@pytest.fixture
+def embedded_system(tmbd_csv):
+    system = MovieRecommendationSystem(dataset_path=tmbd_csv)
+    assert system.load_data()
+    assert system.train_model(embedding_dim=32, embedding_dtype='float16')
+    return system
+
+
+def test_rows_are_normalized_projections(trained_system):
+    matrix = trained_system.feature_matrix
+    embedding = LatentEmbedding.fit(matrix, 16)
+    assert embedding.vectors.shape == (matrix.shape[0], 16)
+    assert embedding.dtype == 'float32'
+    norms = np.linalg.norm(embedding.vectors, axis=1)
+    assert np.allclose(norms[norms > 0], 1, atol=1e-5)
+
+    projected = np.asarray(matrix[7] @ embedding.components.T).ravel()
+    expected = embedding.vectors @ (projected / np.linalg.norm(projected))
+    assert np.allclose(embedding.scores(matrix[7]), expected, atol=1e-5)
+    rows, scores = embedding.search(matrix[7], 5)
+    assert np.isclose(scores[0], expected.max())
+    assert np.all(np.diff(scores) <= 0)
+
+
+@pytest.mark.parametrize('dtype', ['float16', 'int8'])
+def test_compact_dtypes_approximate_float32(trained_system, dtype):
+    matrix = trained_system.feature_matrix
+    exact = LatentEmbedding.fit(matrix, 16)
+    compact = LatentEmbedding.fit(matrix, 16, dtype)
+    assert compact.dtype == dtype
+    assert compact.nbytes < exact.nbytes
+    assert np.allclose(compact.scores(matrix[3]), exact.scores(matrix[3]), atol=0.02)
+
+
+def test_unknown_dtype_is_rejected(trained_system):
+    with pytest.raises(ValueError):
+        LatentEmbedding.fit(trained_system.feature_matrix, 8, 'int4')
+
+
+def test_recommendations_use_the_embedding(embedded_system):
+    assert embedded_system.embedding.dim == 32
+    assert embedded_system.ann_index is None
+    assert embedded_system.build_config()['embedding'] == {'dim': 32, 'dtype': 'float16'}
+    titles = [rec['title'] for rec in embedded_system.get_recommendations('Avatar', 5)]
+    assert len(titles) == 5 and 'Avatar' not in titles
+
+    batch = embedded_system.get_recommendations_batch(['Avatar', 'The Notebook'], 5)
+    for title, recommendations in zip(['Avatar', 'The Notebook'], batch):
+        single = embedded_system.get_recommendations(title, 5)
+        assert [r['similarity_score'] for r in recommendations] == pytest.approx(
+            [r['similarity_score'] for r in single])
+
+
+def test_full_rank_embedding_matches_sparse_search(trained_system):
+    rows = sample_rows(trained_system, 30)
+    full_rank = min(trained_system.feature_matrix.shape) - 1
+    [result] = embedding_sweep(trained_system, rows, 5, dims=[full_rank])
+    assert result['recall_at_k'] > 0.9
+    assert trained_system.embedding is None
+
+
+def test_embedding_round_trips_through_artifact(embedded_system, tmbd_csv, tmp_path):
+    path = str(tmp_path / 'model')
+    assert embedded_system.save_model(path)
+    loaded = MovieRecommendationSystem(dataset_path=tmbd_csv)
+    assert loaded.load_model(path)
+
+    assert loaded.embedding.vectors.dtype == np.float16
+    assert isinstance(loaded.embedding.vectors, np.memmap)
+    assert loaded.build_config() == embedded_system.build_config()
+    assert (loaded.get_recommendations('The Notebook', 5)
+            == embedded_system.get_recommendations('The Notebook', 5))
+
+
+def test_extended_model_projects_new_rows(tmbd_csv):
+    base = MovieRecommendationSystem(dataset_path=tmbd_csv)
+    assert base.load_data(limit=100)
+    assert base.train_model(embedding_dim=16, embedding_dtype='int8')
+
+    extended = base.extended(240)
+    assert extended.embedding.components is base.embedding.components
+    assert len(extended.embedding) == 240
+    assert len(extended.embedding.scales) == 240
+    assert extended.get_recommendations(extended.title_at(200), 5)
+
+
+def test_benchmark_reports_embedding_recall(tmbd_csv, capsys):
+    assert benchmark_main(['--dataset', tmbd_csv, '--limit', '240', '--queries', '20',
+                           '-k', '5', '--hash-features', str(2 ** 14),
+                           '--embedding-dims', '8', '16', '--embedding-dtypes', 'float32', 'int8']) == 0
+    out = capsys.readouterr().out
+    assert 'Embedding vs exact search' in out and 'int8' in out
@@ -0,0 +1,107 @@
+"""
+Tests for the feature-hashing TF-IDF backend
+"""
+
+import numpy as np
+import pytest
+from sklearn.feature_extraction.text import HashingVectorizer, TfidfTransformer
+
+from conftest import make_movies
+from ml_engine.benchmark import main as benchmark_main
+from ml_engine.hashing import HashingTfidfVectorizer
+from ml_engine.movie_recommendation_optimized import MovieRecommendationSystem, make_vectorizer
+
+
+def documents():
+    movies = make_movies(120)
+    return (movies['genres'] + ' ' + movies['keywords'] + ' ' + movies['overview']).tolist()
+
+
+def test_matches_tfidf_transformer_on_hashed_counts():
+    docs = documents()
+    vectorizer = HashingTfidfVectorizer(n_features=2 ** 12, min_df=1, max_df=1.0)
+    matrix = vectorizer.fit_transform(docs)
+
+    counts = HashingVectorizer(n_features=2 ** 12, ngram_range=(1, 2), stop_words='english',
+                               alternate_sign=False, norm=None).transform(docs)
+    expected = TfidfTransformer().fit_transform(counts)
+    assert np.allclose(matrix.toarray(), expected.toarray(), atol=1e-6)
+
+
+def test_document_frequency_pruning():
+    vectorizer = HashingTfidfVectorizer(n_features=2 ** 12, min_df=2, max_df=0.5)
+    vectorizer.fit_transform(documents())
+    kept = vectorizer.idf_ > 0
+    assert np.all(vectorizer.df_[kept] >= 2)
+    assert np.all(vectorizer.df_[kept] <= 0.5 * vectorizer.n_docs_)
+    assert not np.all(kept[vectorizer.df_ > 0])
+
+
+@pytest.mark.parametrize('n_jobs', [1, 2])
+def test_chunked_fit_equals_single_pass(n_jobs):
+    docs = documents()
+    single = HashingTfidfVectorizer(n_features=2 ** 12)
+    expected = single.fit_transform(docs)
+
+    chunked = HashingTfidfVectorizer(n_features=2 ** 12, n_jobs=n_jobs)
+    matrix = chunked.fit_transform_chunks(docs[i:i + 25] for i in range(0, len(docs), 25))
+    assert np.array_equal(chunked.idf_, single.idf_)
+    assert (matrix != expected).nnz == 0
+
+    # Stateless: transforming after the fit reproduces the stored rows
+    assert np.allclose(chunked.transform(docs[:5]).toarray(), expected[:5].toarray())
+
+
+def test_make_vectorizer_rejects_unknown_backend():
+    assert isinstance(make_vectorizer({'n_features': 64}, 'hashing'), HashingTfidfVectorizer)
+    with pytest.raises(ValueError):
+        make_vectorizer(backend='word2vec')
+
+
+@pytest.fixture
+def hashed_system(tmbd_csv):
+    system = MovieRecommendationSystem(dataset_path=tmbd_csv)
+    assert system.load_data()
+    assert system.train_model(feature_backend='hashing', vectorizer_params={'n_features': 2 ** 14})
+    return system
+
+
+def test_train_with_hashing_backend(hashed_system):
+    assert hashed_system.feature_matrix.shape == (240, 2 ** 14)
+    assert 'hashing' == hashed_system.build_config()['feature_backend']
+    titles = [rec['title'] for rec in hashed_system.get_recommendations('Avatar', 5)]
+    assert titles and 'Avatar' not in titles
+
+
+def test_hashing_artifact_round_trip(hashed_system, tmbd_csv, tmp_path):
+    path = str(tmp_path / 'model')
+    assert hashed_system.save_model(path)
+
+    loaded = MovieRecommendationSystem(dataset_path=tmbd_csv)
+    assert loaded.load_model(path)
+    assert isinstance(loaded.vectorizer, HashingTfidfVectorizer)
+    assert loaded.vectorizer.n_docs_ == hashed_system.vectorizer.n_docs_
+    assert np.array_equal(loaded.vectorizer.idf_, hashed_system.vectorizer.idf_)
+    assert loaded.build_config() == hashed_system.build_config()
+    assert (loaded.get_recommendations('The Notebook', 5)
+            == hashed_system.get_recommendations('The Notebook', 5))
+
+
+def test_benchmark_reports_recall(tmbd_csv, capsys):
+    assert benchmark_main(['--dataset', tmbd_csv, '--limit', '240', '--queries', '20',
+                           '-k', '5', '--hash-features', str(2 ** 14)]) == 0
+    out = capsys.readouterr().out
+    assert 'recall@k' in out and 'hashing' in out
+
+
+def test_weighted_fields_scale_hashed_counts():
+    docs = documents()
+    first, second = docs[:60], docs[60:]
+    vectorizer = HashingTfidfVectorizer(n_features=2 ** 12, ngram_range=(1, 1), min_df=1)
+    matrix = vectorizer.fit_transform_chunks([(first, second)], weights=(2, 1))
+
+    repeated = HashingTfidfVectorizer(n_features=2 ** 12, ngram_range=(1, 1), min_df=1)
+    expected = repeated.fit_transform([f"{a} {a} {b}" for a, b in zip(first, second)])
+    assert np.allclose(matrix.toarray(), expected.toarray(), atol=1e-6)
+    assert np.allclose(vectorizer.transform_fields((first[:3], second[:3]), (2, 1)).toarray(),
+                       matrix[:3].toarray(), atol=1e-6)
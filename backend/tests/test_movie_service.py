@@ -0,0 +1,63 @@
+"""
+Tests for MovieService response caching
+"""
+
+import pytest
+
+
+class Response:
+    def __init__(self, payload):
+        self.payload = payload
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.payload
+
+
+@pytest.fixture
+def omdb(monkeypatch):
+    """Counts OMDB requests; answers searches for 'batman' only"""
+    from app.services import movie_service
+    calls = []
+
+    def get(url, params=None, timeout=None):
+        calls.append(params)
+        if params.get('s', '').strip().lower() == 'batman' or params.get('i') == 'tt0372784':
+            return Response({'Response': 'True', 'Search': [{'Title': 'Batman Begins'}],
+                             'totalResults': '1', 'Title': 'Batman Begins'})
+        return Response({'Response': 'False', 'Error': 'Movie not found!'})
+
+    monkeypatch.setattr(movie_service.requests, 'get', get)
+    monkeypatch.setattr(movie_service.MovieService, '_cache', None)
+    yield calls
+    movie_service.MovieService._cache = None
+
+
+def test_successful_responses_are_cached(omdb):
+    from app.services.movie_service import MovieService
+    first = MovieService().search_movies('Batman')
+    assert first['success'] and first['movies'] == [{'Title': 'Batman Begins'}]
+    # New instance per request (as in the API resources), same cache
+    assert MovieService().search_movies(' batman ') == first
+    assert MovieService().get_movie_details('tt0372784')['success']
+    MovieService().get_movie_details('tt0372784')
+    assert len(omdb) == 2
+
+
+def test_failures_are_not_cached(omdb):
+    from app.services.movie_service import MovieService
+    assert not MovieService().search_movies('qqqqqqqq')['success']
+    assert not MovieService().search_movies('qqqqqqqq')['success']
+    assert len(omdb) == 2
+
+
+def test_redis_backend_is_shared(omdb, fake_redis):
+    from app.services.movie_service import MovieService
+    MovieService().search_movies('batman')
+    # A fresh process-level cache (another worker) finds it in Redis
+    MovieService._cache = None
+    assert MovieService().search_movies('batman')['success']
+    assert len(omdb) == 1
+    assert list(fake_redis.data) == ['moviehub:omdb:v1:search:batman:1']
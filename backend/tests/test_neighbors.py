@@ -0,0 +1,96 @@
+"""
+Tests for the precomputed top-K neighbour table
+"""
+
+import numpy as np
+import pytest
+
+from ml_engine.neighbors import NeighborTable, block_bounds
+from ml_engine.movie_recommendation_optimized import MovieRecommendationSystem
+
+
+@pytest.fixture
+def table_system(tmbd_csv):
+    system = MovieRecommendationSystem(dataset_path=tmbd_csv)
+    assert system.load_data()
+    assert system.train_model(neighbor_k=40)
+    return system
+
+
+def scores(recommendations):
+    return [rec['similarity_score'] for rec in recommendations]
+
+
+def test_blocks_cover_every_row_once(trained_system):
+    matrix = trained_system.feature_matrix
+    bounds = block_bounds(matrix, work=500)
+    assert len(bounds) > 1
+    assert bounds[0][0] == 0 and bounds[-1][1] == matrix.shape[0]
+    assert all(end == start for (_, end), (start, _) in zip(bounds, bounds[1:]))
+
+
+@pytest.mark.parametrize('n_jobs', [1, 2])
+def test_table_holds_exact_top_k(trained_system, n_jobs, monkeypatch):
+    import ml_engine.neighbors as neighbors
+    monkeypatch.setattr(neighbors, 'BLOCK_WORK', 2000)
+    matrix = trained_system.feature_matrix
+    table = NeighborTable.compute(matrix, 10, n_jobs)
+    assert table.rows.dtype == np.int32 and table.scores.dtype == np.float16
+    assert table.rows.shape == (matrix.shape[0], 10)
+
+    similarities = (matrix @ matrix.T).toarray()
+    for row in [0, 5, 120, 239]:
+        expected = np.sort(similarities[row])[::-1][:10]
+        assert np.allclose(table.scores[row], expected, atol=1e-3)
+        assert np.allclose(similarities[row, table.rows[row]], table.scores[row], atol=1e-3)
+
+
+def test_recommendations_come_from_the_table(table_system):
+    exact = table_system.get_recommendations('The Notebook', 10)
+    table_system.feature_matrix = None  # the table alone must serve it
+    from_table = table_system.get_recommendations('The Notebook', 10)
+    assert np.allclose(scores(from_table), scores(exact), atol=1e-3)
+    assert table_system.build_config()['neighbor_k'] == 40
+
+
+def test_table_is_deep_enough_for_every_limit_up_to_k(table_system):
+    # 40 recommendations re-rank 120 candidates, stored after the movie itself
+    assert table_system.neighbors.k == 121
+
+
+def test_larger_limits_fall_back_to_live_search(table_system):
+    table_system.neighbors.rows[:] = -1  # an empty table would return nothing
+    assert len(table_system.get_recommendations('Avatar', 41)) == 41
+    assert table_system.get_recommendations('Avatar', 40) == []
+
+
+@pytest.mark.parametrize('limit', [5, 13, 39, 40])
+def test_limits_up_to_k_match_live_search(table_system, limit):
+    served = table_system.get_recommendations('Avatar', limit)
+    table_system.neighbors = None
+    live = table_system.get_recommendations('Avatar', limit)
+    # Synthetic movies tie on similarity, so compare scores rather than titles
+    assert len(served) == limit
+    assert np.allclose(scores(served), scores(live), atol=1e-3)
+
+
+def test_table_round_trips_through_artifact(table_system, tmbd_csv, tmp_path):
+    path = str(tmp_path / 'model')
+    assert table_system.save_model(path)
+    loaded = MovieRecommendationSystem(dataset_path=tmbd_csv)
+    assert loaded.load_model(path)
+    assert isinstance(loaded.neighbors.rows, np.memmap)
+    assert np.array_equal(loaded.neighbors.scores, table_system.neighbors.scores)
+    assert loaded.build_config() == table_system.build_config()
+    assert (loaded.get_recommendations('Avatar', 5)
+            == table_system.get_recommendations('Avatar', 5))
+
+
+def test_extended_model_drops_the_table(tmbd_csv):
+    base = MovieRecommendationSystem(dataset_path=tmbd_csv)
+    assert base.load_data(limit=100)
+    assert base.train_model(neighbor_k=10)
+    extended = base.extended(240)
+    assert extended.neighbors is None
+    assert 'neighbor_k' not in extended.build_config()
+    assert extended.get_recommendations(extended.title_at(200), 5)
@@ -0,0 +1,41 @@
+"""
+Tests for the recommendation API's request validation
+"""
+
+import pytest
+
+from config.config import TestingConfig
+
+
+class _Config(TestingConfig):
+    SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    LOGIN_DISABLED = True
+
+
+@pytest.fixture
+def client(monkeypatch):
+    from app import create_app
+    monkeypatch.setenv('ML_EAGER_INIT', '0')
+    app = create_app(_Config)
+    return app.test_client()
+
+
+@pytest.mark.parametrize('limit', [0, -3, 51, True, '5', 2.5])
+def test_batch_rejects_invalid_limits(client, limit):
+    response = client.post('/api/ml/recommendations/similar/batch',
+                           json={'titles': ['Avatar'], 'limit': limit})
+    assert response.status_code == 400
+    assert 'limit' in response.get_json()['error']
+
+
+def test_batch_rejects_too_many_movies(client):
+    response = client.post('/api/ml/recommendations/similar/batch',
+                           json={'titles': ['Avatar'] * 51, 'limit': 5})
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize('limit', ['0', '-1', '51'])
+def test_user_recommendations_reject_invalid_limits(client, limit):
+    response = client.get(f'/api/ml/recommendations/user?limit={limit}')
+    assert response.status_code == 400
+    assert 'limit' in response.get_json()['error']
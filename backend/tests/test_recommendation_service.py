@@ -0,0 +1,464 @@
+"""
+Tests for RecommendationService on top of a model trained in-process
+"""
+
+import os
+import threading
+import time
+
+import pytest
+
+
+@pytest.fixture
+def service(trained_system):
+    from app.services.recommendation_service import RecommendationService
+    RecommendationService._instance = None
+    svc = RecommendationService()
+    svc.recommendation_system = trained_system
+    svc.system_initialized = True
+    svc.model_loaded = True
+    yield svc
+    RecommendationService._instance = None
+
+
+def test_similar_movies_by_title(service):
+    result = service.get_similar_movies('the notebook', limit=4)
+    assert result['success']
+    assert result['movie_title'] == 'The Notebook'
+    assert result['total_found'] == 4
+
+
+def test_similar_movies_by_tmdb_id(service):
+    result = service.get_similar_movies('1003', limit=3)
+    assert result['success']
+    assert result['movie_title'] == 'The Conjuring'
+
+
+def test_unknown_movie(service):
+    result = service.get_similar_movies('qqqqqqqq', limit=3)
+    assert not result['success']
+    assert result['model_status'] == 'error'
+
+
+@pytest.fixture
+def boot_env(tmbd_csv, tmp_path, monkeypatch):
+    """Fresh service pointed at a temporary MODEL_PATH and the synthetic dataset"""
+    from app.services.recommendation_service import RecommendationService
+    from ml_engine.movie_recommendation_optimized import MovieRecommendationSystem
+    models = tmp_path / 'models'
+    monkeypatch.setenv('MODEL_PATH', str(models))
+    monkeypatch.setenv('ML_QUICK_START_LIMIT', '1000')
+    monkeypatch.setenv('ML_LOAD_LIMIT', '1000')
+    monkeypatch.setattr(MovieRecommendationSystem, '_get_default_dataset_path',
+                        lambda self: tmbd_csv)
+    RecommendationService._instance = None
+    yield models
+    RecommendationService._instance = None
+
+
+def test_first_boot_trains_and_saves_artifact(boot_env):
+    from app.services.recommendation_service import RecommendationService
+    svc = RecommendationService()
+    svc._initialize_system()
+    assert svc.system_initialized
+    assert svc.model_source == 'csv'
+    assert [p.name for p in boot_env.iterdir()] == [os.path.basename(svc.artifact_path)]
+
+
+def test_restart_boots_from_artifact_without_training(boot_env, monkeypatch):
+    from app.services.recommendation_service import RecommendationService
+    from ml_engine.movie_recommendation_optimized import MovieRecommendationSystem
+    RecommendationService()._initialize_system()
+    RecommendationService._instance = None
+
+    def fail(*args, **kwargs):
+        raise AssertionError('restart should not retrain')
+    monkeypatch.setattr(MovieRecommendationSystem, 'train_model', fail)
+
+    svc = RecommendationService()
+    svc._initialize_system()
+    assert svc.model_source == 'artifact'
+    assert svc.get_model_status()['artifact_path'] == svc.artifact_path
+    result = svc.get_similar_movies('the notebook', limit=4)
+    assert result['success'] and result['movie_title'] == 'The Notebook'
+
+
+def test_changed_build_options_retrain_and_replace_the_artifact(boot_env, monkeypatch):
+    from app.services.recommendation_service import RecommendationService
+    RecommendationService()._initialize_system()
+    (old,) = boot_env.iterdir()
+    RecommendationService._instance = None
+
+    monkeypatch.setenv('ML_NEIGHBORS', '20')
+    svc = RecommendationService()
+    svc._initialize_system()
+    assert svc.model_source == 'csv'
+    assert svc.get_model_status()['neighbor_k'] == 20
+    # The new build supersedes the old one on disk
+    assert [p.name for p in boot_env.iterdir()] == [os.path.basename(svc.artifact_path)]
+    assert not old.exists()
+
+    RecommendationService._instance = None
+    svc = RecommendationService()
+    svc._initialize_system()
+    assert svc.model_source == 'artifact'
+
+
+def test_preload_defers_full_load_to_master(boot_env, monkeypatch):
+    from app.services.recommendation_service import RecommendationService
+    monkeypatch.setenv('ML_QUICK_START_LIMIT', '100')
+    monkeypatch.setenv('ML_LOAD_LIMIT', '240')
+    svc = RecommendationService()
+    svc._initialize_system(defer_full_load=True)
+    assert svc.recommendation_system.num_movies == 100
+
+    upgraded = []
+    thread = svc.start_full_dataset_loading(on_complete=upgraded.append)
+    thread.join(timeout=30)
+    assert upgraded and upgraded[0] is svc.recommendation_system
+    assert svc.recommendation_system.num_movies == 240
+    assert svc.recommendation_system.fit_limit == 100
+    # Already covers ML_LOAD_LIMIT: nothing left to load
+    assert svc.start_full_dataset_loading() is None
+
+
+def test_similar_movies_batch(service):
+    result = service.get_similar_movies_batch(['the notebook', '1003', 'qqqqqqqq'], limit=3)
+    assert result['success']
+    first, second, missing = result['results']
+    assert first['movie_title'] == 'The Notebook' and first['total_found'] == 3
+    assert second['movie_title'] == 'The Conjuring'
+    assert not missing['success'] and missing['model_status'] == 'error'
+    # Single lookups are served from the entries the batch cached
+    hits = service._cache.hits
+    assert service.get_similar_movies('the notebook', limit=3) == first
+    assert service._cache.hits == hits + 1
+
+
+def favorite(imdb_id, title, days_ago):
+    from datetime import datetime, timedelta
+    from types import SimpleNamespace
+    return SimpleNamespace(imdb_id=imdb_id, movie_title=title,
+                           added_at=datetime.utcnow() - timedelta(days=days_ago))
+
+
+def test_user_recommendations_exclude_favourites(service):
+    favorites = [favorite('', 'The Notebook', 1), favorite('', 'The Conjuring', 400),
+                 favorite('tt-missing', 'qqqqqqqq', 2)]
+    result = service.get_user_recommendations(7, favorites, limit=5)
+    assert result['success'] and result['favorites_used'] == 2
+    titles = [rec['title'] for rec in result['recommendations']]
+    assert len(titles) == 5
+    assert 'The Notebook' not in titles and 'The Conjuring' not in titles
+    assert {rec['because'] for rec in result['recommendations']} <= {'The Notebook', 'The Conjuring'}
+
+    # Cached until the favourites change
+    hits = service._cache.hits
+    assert service.get_user_recommendations(7, favorites, limit=5) == result
+    assert service._cache.hits == hits + 1
+    changed = service.get_user_recommendations(7, favorites[:1], limit=5)
+    assert changed['favorites_version'] != result['favorites_version']
+
+
+def test_favourite_missing_from_catalog_falls_back_to_its_title(service):
+    # tt2012013 is not in the catalog; it must not be title-matched to '2012'
+    result = service.get_user_recommendations(8, [favorite('tt2012013', 'The Notebook', 1)], limit=5)
+    assert result['success'] and result['favorites_used'] == 1
+    titles = [rec['title'] for rec in result['recommendations']]
+    assert 'The Notebook' not in titles
+    assert {rec['because'] for rec in result['recommendations']} == {'The Notebook'}
+
+
+def test_recent_favourites_weigh_more(service):
+    now = __import__('time').time()
+    assert service._recency_weight(favorite('', '', 0).added_at, now) == pytest.approx(1, abs=1e-3)
+    assert service._recency_weight(favorite('', '', 90).added_at, now) == pytest.approx(0.5, abs=1e-3)
+    assert service._recency_weight(None, now) == 1.0
+
+
+def test_cache_is_keyed_on_the_resolved_row(service):
+    by_title = service.get_similar_movies('the conjuring', limit=5)
+    # Same row through its TMDB id and a smaller limit: ranked from the cached entry
+    by_id = service.get_similar_movies('1003', limit=3)
+    assert by_id['movie_title'] == by_title['movie_title'] and by_id['total_found'] == 3
+    assert by_id['movie_id'] == '1003'
+    stats = service.get_model_status()['cache']
+    assert stats['entries'] == 1 and stats['hits'] == 1 and stats['misses'] == 1
+    assert stats['bytes'] > 0
+
+    # Deeper than the cached top-K: recomputed and replaces the entry
+    deeper = service.get_similar_movies('1003', limit=service._cache_top_k + 5)
+    assert deeper['total_found'] == service._cache_top_k + 5
+    assert service.get_model_status()['cache']['entries'] == 1
+
+
+def ranked(recommendations):
+    return [(rec['title'], rec['similarity_score'], rec['rank']) for rec in recommendations]
+
+
+@pytest.fixture
+def varied_service(service, tmp_path):
+    """service on a catalog whose genres vary independently of the text"""
+    import numpy as np
+    from conftest import GENRE_KEYWORDS, make_movies
+    from ml_engine.movie_recommendation_optimized import MovieRecommendationSystem
+    rng = np.random.default_rng(7)
+    movies = make_movies()
+    genres = list(GENRE_KEYWORDS)
+    for i in range(len(movies)):
+        picked = rng.choice(genres, size=rng.integers(1, 4), replace=False)
+        movies.loc[i, 'genres'] = ', '.join(picked)
+        movies.loc[i, 'keywords'] = ' '.join(GENRE_KEYWORDS[g] for g in rng.choice(genres, size=2))
+    path = tmp_path / 'varied' / 'tmbd.csv'
+    path.parent.mkdir()
+    movies.to_csv(path, index=False)
+    system = MovieRecommendationSystem(dataset_path=str(path), use_large_dataset=True)
+    assert system.load_data() and system.train_model()
+    service.recommendation_system = system
+    return service
+
+
+def test_cached_short_limits_match_a_direct_computation(varied_service):
+    service = varied_service
+    system = service.recommendation_system
+    for row in range(0, 240, 6):
+        title = system.title_at(row)
+        row = system.resolve_title(title)
+        assert service.get_similar_movies(title, limit=service._cache_top_k)['success']
+        for limit in (1, 3, 6, 10):
+            hits = service._cache.hits
+            cached = service.get_similar_movies(title, limit=limit)
+            assert service._cache.hits == hits + 1
+            direct = system.get_recommendations(title, limit, matched_row=row)
+            assert ranked(cached['similar_movies']) == ranked(direct)
+
+    from types import SimpleNamespace
+    favorites = [SimpleNamespace(imdb_id='', movie_title=title, added_at=None)
+                 for title in ('The Notebook', 'The Conjuring', 'Avatar')]
+    rows = [system.resolve_title(favorite.movie_title) for favorite in favorites]
+    service.get_user_recommendations(7, favorites, limit=service._cache_top_k)
+    for limit in (1, 4, 10):
+        cached = service.get_user_recommendations(7, favorites, limit=limit)
+        direct = system.get_profile_recommendations(rows, None, limit)
+        assert cached['recommendations'] == direct
+
+
+def test_model_swap_moves_to_a_fresh_cache_namespace(service, trained_system):
+    service.get_similar_movies('the notebook', limit=3)
+    generation = service.model_generation
+    assert service.get_model_status()['cache']['entries'] == 1
+
+    service.recommendation_system = trained_system
+    assert service.model_generation > generation
+    assert service.get_model_status()['model_generation'] == service.model_generation
+    assert service.get_model_status()['cache']['entries'] == 0
+    misses = service._cache.misses
+    service.get_similar_movies('the notebook', limit=3)
+    assert service._cache.misses == misses + 1
+
+
+def test_phase2_rebuilds_the_neighbour_table(boot_env, monkeypatch):
+    from app.services.recommendation_service import RecommendationService
+    monkeypatch.setenv('ML_QUICK_START_LIMIT', '100')
+    monkeypatch.setenv('ML_LOAD_LIMIT', '240')
+    monkeypatch.setenv('ML_NEIGHBORS', '10')
+    svc = RecommendationService()
+    svc._initialize_system(defer_full_load=True)
+    assert svc.get_model_status()['neighbor_k'] == 10
+
+    svc.start_full_dataset_loading().join(timeout=30)
+    system = svc.recommendation_system
+    assert system.num_movies == 240 and system.fit_limit == 100
+    assert system.neighbors.rows.shape[0] == 240
+    assert svc.get_model_status()['neighbor_k'] == 10
+    assert system.build_config()['neighbor_k'] == 10
+
+
+def test_service_reads_the_neighbour_table(tmbd_csv, service, monkeypatch):
+    from ml_engine.movie_recommendation_optimized import MovieRecommendationSystem
+    system = MovieRecommendationSystem(dataset_path=tmbd_csv, use_large_dataset=True)
+    assert system.load_data() and system.train_model(neighbor_k=20)
+    service.recommendation_system = system
+    monkeypatch.setattr(system, '_top_candidates',
+                        lambda *args, **kwargs: pytest.fail('live search'))
+
+    # ML_CACHE_TOP_K (30) is deeper than the table: entries are computed 20 deep
+    for limit in (5, 20):
+        result = service.get_similar_movies('the notebook', limit=limit)
+        assert result['total_found'] == limit
+    assert service.get_similar_movies_batch(['avatar'], limit=20)['results'][0]['total_found'] == 20
+    assert service.get_model_status()['neighbor_k'] == 20
+
+
+def test_phase2_prewarms_hot_results(boot_env, monkeypatch):
+    from app.services.recommendation_service import RecommendationService
+    monkeypatch.setenv('ML_QUICK_START_LIMIT', '100')
+    monkeypatch.setenv('ML_LOAD_LIMIT', '240')
+    monkeypatch.setenv('ML_CACHE_PREWARM', '2')
+    svc = RecommendationService()
+    svc._initialize_system(defer_full_load=True)
+    for title in ('The Notebook', 'The Conjuring', 'Avatar'):
+        assert svc.get_similar_movies(title, limit=3)['success']
+    phase1 = svc.model_generation
+
+    svc.start_full_dataset_loading().join(timeout=30)
+    assert svc.recommendation_system.num_movies == 240
+    assert svc.model_generation != phase1
+    # The two most recently used entries were recomputed on the full model
+    assert {key[0] for key in svc._cache.keys()} == {svc.model_generation}
+    assert len(svc._cache) == 2
+    hits = svc._cache.hits
+    result = svc.get_similar_movies('Avatar', limit=3)
+    assert svc._cache.hits == hits + 1
+    assert result['similar_movies'] == svc.get_similar_movies_batch(['Avatar'], limit=3)['results'][0]['similar_movies']
+
+
+def test_concurrent_identical_requests_compute_once(service, monkeypatch):
+    system = service.recommendation_system
+    calls = []
+    original = system.similar_candidates
+
+    def slow_candidates(row, *args, **kwargs):
+        calls.append(system.title_at(row))
+        time.sleep(0.2)
+        return original(row, *args, **kwargs)
+
+    monkeypatch.setattr(system, 'similar_candidates', slow_candidates)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(
+        service.get_similar_movies('the notebook', limit=4))) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=10)
+    assert calls == ['The Notebook']
+    assert len(results) == 6
+    assert all(result == results[0] and result['success'] for result in results)
+    assert service.get_model_status()['cache']['coalesced'] >= 1
+
+    # A batch joins the computation in flight instead of repeating it
+    service._cache.clear()
+    batch_calls = []
+    original_batch = system.similar_candidates_batch
+
+    def counting_batch(rows, *args, **kwargs):
+        batch_calls.append([system.title_at(row) for row in rows])
+        return original_batch(rows, *args, **kwargs)
+
+    monkeypatch.setattr(system, 'similar_candidates_batch', counting_batch)
+    single, batch = run_together_pair(
+        lambda: service.get_similar_movies('the notebook', limit=4),
+        lambda: service.get_similar_movies_batch(['the notebook', 'avatar'], limit=4))
+    assert batch['results'][0] == single
+    assert batch_calls == [['Avatar']]
+    assert calls == ['The Notebook', 'The Notebook']
+
+
+def run_together_pair(first, second):
+    results = {}
+    thread = threading.Thread(target=lambda: results.setdefault('first', first()))
+    thread.start()
+    time.sleep(0.05)  # let the first call take the lead
+    results['second'] = second()
+    thread.join(timeout=10)
+    return results['first'], results['second']
+
+
+def test_redis_cache_is_shared_across_workers(fake_redis, trained_system, monkeypatch):
+    from app.services.recommendation_service import RecommendationService
+
+    def worker():
+        RecommendationService._instance = None
+        svc = RecommendationService()
+        svc.recommendation_system = trained_system
+        svc.system_initialized = svc.model_loaded = True
+        return svc
+
+    first = worker()
+    expected = first.get_similar_movies('the notebook', limit=4)
+    assert first.get_model_status()['cache']['backend'] == 'redis'
+
+    # Another process serving the same build reads the entry instead of recomputing
+    second = worker()
+    monkeypatch.setattr(trained_system, 'similar_candidates',
+                        lambda *args, **kwargs: pytest.fail('recomputed'))
+    assert second.get_similar_movies('the notebook', limit=4) == expected
+    assert second.get_model_status()['cache']['hits'] == 1
+    [key] = fake_redis.data
+    assert key.startswith('moviehub:recommendations:v1:recommender-')
+    RecommendationService._instance = None
+
+
+def test_phase2_in_a_separate_process_is_loaded_on_reload(boot_env, monkeypatch):
+    from app.services.recommendation_service import RecommendationService, build_full_artifact
+    monkeypatch.setenv('ML_QUICK_START_LIMIT', '100')
+    monkeypatch.setenv('ML_LOAD_LIMIT', '240')
+    master = RecommendationService()
+    master._initialize_system(defer_full_load=True)
+    assert master.pending_full_limit() == 240
+    assert not master.load_newer_model()
+
+    # What the gunicorn Phase 2 process runs (a fresh service, booted from the Phase 1 artifact)
+    RecommendationService._instance = None
+    assert build_full_artifact(240)
+    RecommendationService._instance = master
+
+    assert master.load_newer_model()
+    assert master.recommendation_system.num_movies == 240
+    assert master.pending_full_limit() is None
+    assert not master.load_newer_model()
+
+
+def load_gunicorn_conf():
+    import importlib.util
+    path = os.path.join(os.path.dirname(__file__), '..', 'gunicorn.conf.py')
+    spec = importlib.util.spec_from_file_location('gunicorn_conf', path)
+    conf = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(conf)
+    return conf
+
+
+def test_gunicorn_phase2_process_can_train_with_worker_pools(boot_env, monkeypatch):
+    import logging
+    import multiprocessing
+    import signal
+    from types import SimpleNamespace
+    from app.services.recommendation_service import RecommendationService
+    for name, value in [('ML_EAGER_INIT', '1'), ('ML_QUICK_START_LIMIT', '100'),
+                        ('ML_LOAD_LIMIT', '240'), ('ML_PHASE2_MODE', 'refit'),
+                        ('ML_FIT_JOBS', '2')]:
+        monkeypatch.setenv(name, value)
+    master = RecommendationService()
+    master._initialize_system(defer_full_load=True)
+
+    conf = load_gunicorn_conf()
+    # Forked rather than spawned so the child keeps the test's dataset path
+    monkeypatch.setattr(conf, 'multiprocessing', SimpleNamespace(
+        get_context=lambda method: multiprocessing.get_context('fork')))
+    server = SimpleNamespace(log=logging.getLogger('gunicorn.test'))
+    signalled = []
+    previous = signal.signal(signal.SIGHUP, lambda *args: signalled.append(True))
+    try:
+        conf.when_ready(server)
+        process = server.ml_phase2_process
+        assert not process.daemon
+        process.join(timeout=120)
+    finally:
+        signal.signal(signal.SIGHUP, previous)
+    assert signalled, 'Phase 2 did not save the full model'
+
+    conf.on_reload(server)
+    assert master.recommendation_system.num_movies == 240
+    conf.on_exit(server)
+
+
+def test_gunicorn_exit_stops_a_running_phase2_process():
+    import logging
+    import multiprocessing
+    from types import SimpleNamespace
+    conf = load_gunicorn_conf()
+    process = multiprocessing.get_context('fork').Process(target=time.sleep, args=(60,))
+    process.start()
+    server = SimpleNamespace(log=logging.getLogger('gunicorn.test'), ml_phase2_process=process)
+    conf.on_exit(server)
+    assert process.exitcode is not None
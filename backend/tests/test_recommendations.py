@@ -0,0 +1,181 @@
+"""
+Tests for MovieRecommendationSystem request-path behaviour
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import make_movies
+from ml_engine.movie_recommendation_optimized import MovieRecommendationSystem
+from ml_engine.tfidf import transform_fields
+
+
+def _fields(source, weights):
+    return tuple([source[col]] for col in weights)
+
+
+def test_stored_row_matches_revectorized_query(trained_system, monkeypatch):
+    row = trained_system.resolve_title('The Conjuring')
+    stored = trained_system.feature_matrix[trained_system._matrix_row(row)]
+
+    source = make_movies().iloc[row]
+    weights = trained_system.field_weights
+    revectorized = transform_fields(trained_system.vectorizer, _fields(source, weights),
+                                    tuple(weights.values()))
+    assert np.allclose(stored.toarray(), revectorized.toarray())
+
+    # Trained rows never go back through the vectorizer
+    def _fail(*args, **kwargs):
+        raise AssertionError('vectorizer called for a trained row')
+    monkeypatch.setattr(trained_system, '_vectorize_fields', _fail)
+    assert trained_system.get_recommendations('The Conjuring', 3)
+
+
+def test_rows_outside_sample_are_vectorized(tmbd_csv):
+    system = MovieRecommendationSystem(dataset_path=tmbd_csv)
+    assert system.load_data()
+    assert system.train_model(sample_size=60)
+    assert system.feature_matrix.shape[0] == 60
+
+    outside = int(np.flatnonzero(system._matrix_rows < 0)[0])
+    assert system._matrix_row(outside) is None
+    recommendations = system.get_recommendations(
+        system.title_at(outside), 5, matched_row=outside)
+    assert len(recommendations) == 5
+
+    inside = int(system.train_rows[0])
+    assert system._matrix_row(inside) == 0
+    # Popularity-based sample keeps the most popular (first) synthetic rows
+    assert system.title_at(inside) == 'Avatar'
+
+
+def test_training_dataframes_are_dropped(trained_system):
+    assert trained_system.movies_data is None
+    assert trained_system.full_movies_data is None
+    catalog = trained_system.catalog
+    assert len(catalog) == trained_system.num_movies == 240
+    assert catalog.titles[1] == 'The Notebook'
+    assert catalog.ids[1] == 1001
+    assert catalog.years[1] == 1981
+    assert catalog.popularity[0] == 240
+
+
+def test_streaming_load_pins_columns_and_dtypes(tmbd_csv, monkeypatch):
+    from ml_engine import movie_recommendation_optimized as mro
+    monkeypatch.setattr(mro, 'CSV_CHUNK_ROWS', 37)
+    system = MovieRecommendationSystem(dataset_path=tmbd_csv)
+    assert system.load_data(limit=200)
+
+    movies = system.movies_data
+    assert len(movies) == 200
+    assert 'budget' not in movies.columns
+    assert list(movies.columns[:3]) == ['id', 'imdb_id', 'title']
+    assert isinstance(movies['original_language'].dtype, pd.CategoricalDtype)
+    assert set(movies['original_language']) == {'en', 'fr'}
+
+
+def test_chunked_training_matches_single_pass(tmbd_csv, trained_system, monkeypatch):
+    from ml_engine import movie_recommendation_optimized as mro
+    monkeypatch.setattr(mro, 'CSV_CHUNK_ROWS', 37)
+    system = MovieRecommendationSystem(dataset_path=tmbd_csv)
+    assert system.load_data()
+    assert system.train_model()
+
+    a, b = system.feature_matrix, trained_system.feature_matrix
+    assert system.vectorizer.vocabulary_ == trained_system.vectorizer.vocabulary_
+    assert np.array_equal(a.indptr, b.indptr) and np.array_equal(a.indices, b.indices)
+    assert np.array_equal(a.data, b.data)
+
+
+def test_parallel_training_matches_serial(tmbd_csv, trained_system):
+    system = MovieRecommendationSystem(dataset_path=tmbd_csv)
+    assert system.load_data()
+    assert system.train_model(n_jobs=2)
+
+    assert system.vectorizer.vocabulary_ == trained_system.vectorizer.vocabulary_
+    assert (system.feature_matrix != trained_system.feature_matrix).nnz == 0
+    assert system.build_config() == trained_system.build_config()
+
+
+def test_extended_model_appends_rows_without_refitting(tmbd_csv):
+    base = MovieRecommendationSystem(dataset_path=tmbd_csv)
+    assert base.load_data(limit=100)
+    assert base.train_model()
+    assert base.extended(80) is None
+
+    extended = base.extended(240)
+    assert extended.num_movies == len(extended.catalog) == 240
+    assert extended.vectorizer is base.vectorizer
+    assert extended.fit_limit == 100 and extended.load_limit == 240
+    assert extended.build_config() != base.build_config()
+
+    # Existing rows are untouched, new rows use the Phase 1 vocabulary
+    assert (extended.feature_matrix[:100] != base.feature_matrix).nnz == 0
+    source = make_movies().iloc[200]
+    assert np.allclose(extended.feature_matrix[200].toarray(),
+                       base._vectorize_fields(_fields(source, base.field_weights)).toarray())
+
+    assert extended.resolve_movie('1200') == 200
+    assert extended.resolve_movie('tt1000239') == 239
+    assert extended.resolve_title('Movie Number 150') == 150
+    recommendations = extended.get_recommendations('Movie Number 150', 5)
+    assert len(recommendations) == 5
+
+    # End of file: nothing more to read, but the larger limit is recorded
+    assert extended.extended(1000).num_movies == 240
+
+
+def test_batch_reads_the_catalog_once(trained_system, monkeypatch):
+    import ml_engine.movie_recommendation_optimized as mro
+    monkeypatch.setattr(mro, 'BATCH_SCORE_CELLS', 1 << 22)
+    calls = []
+    original = trained_system.feature_matrix.__class__.__getitem__
+
+    def counting_slice(matrix, key):
+        if isinstance(key, slice):
+            calls.append(key)
+        return original(matrix, key)
+
+    monkeypatch.setattr(trained_system.feature_matrix.__class__, '__getitem__', counting_slice)
+    trained_system._batch_candidates(trained_system.feature_matrix[[0, 1, 3, 7, 9]], 18)
+    assert calls == [slice(0, 240)]
+
+
+def test_batch_matches_single_queries(tmbd_csv, trained_system, monkeypatch):
+    import ml_engine.movie_recommendation_optimized as mro
+    monkeypatch.setattr(mro, 'BATCH_SCORE_CELLS', 4 * 30)  # 30-row catalog blocks for 4 seeds
+    titles = ['Avatar', 'The Notebook', 'qqqqqqqq', 'The Conjuring', 'Movie Number 150']
+    batch = trained_system.get_recommendations_batch(titles, 6)
+    assert len(batch) == len(titles) and batch[2] == []
+    for title, recommendations in zip(titles, batch):
+        if title != titles[2]:
+            single = trained_system.get_recommendations(title, 6)
+            assert [r['similarity_score'] for r in recommendations] == pytest.approx(
+                [r['similarity_score'] for r in single])
+
+    # Movies outside the training sample are vectorized into the same batch
+    sampled = MovieRecommendationSystem(dataset_path=tmbd_csv)
+    assert sampled.load_data()
+    assert sampled.train_model(sample_size=120)
+    row = int(np.flatnonzero(sampled._matrix_rows < 0)[0])
+    [recommendations] = sampled.get_recommendations_batch([None], 5, matched_rows=[row])
+    single = sampled.get_recommendations(None, 5, matched_row=row)
+    assert [r['similarity_score'] for r in recommendations] == pytest.approx(
+        [r['similarity_score'] for r in single])
+
+
+def test_profile_is_the_weighted_centroid(trained_system):
+    notebook = trained_system.resolve_title('The Notebook')
+    conjuring = trained_system.resolve_title('The Conjuring')
+
+    # A single seed is searched like its own recommendations, minus the re-rank
+    [top] = trained_system.get_profile_recommendations([notebook], num_recommendations=1)
+    assert top['title'] != 'The Notebook' and top['because'] == 'The Notebook'
+
+    # Weight shifts the profile towards a seed
+    towards = trained_system.get_profile_recommendations([notebook, conjuring], [1.0, 1e-3], 5)
+    single = trained_system.get_profile_recommendations([notebook], None, 5)
+    assert [r['similarity_score'] for r in towards] == pytest.approx(
+        [r['similarity_score'] for r in single], abs=1e-2)
+    assert trained_system.get_profile_recommendations([], None, 5) == []
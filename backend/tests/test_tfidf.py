@@ -0,0 +1,107 @@
+"""
+Tests for chunked TF-IDF fitting against TfidfVectorizer.fit_transform
+"""
+
+import random
+
+import numpy as np
+import pytest
+
+from ml_engine.movie_recommendation_optimized import make_vectorizer
+from ml_engine.tfidf import TermCounter, count_chunk, fit_transform_chunks, transform_fields
+
+
+def _corpus(count=3000, seed=0):
+    rng = random.Random(seed)
+    words = [f"term{i}" for i in range(800)] + ['science fiction', 'the', 'and']
+    return [' '.join(rng.choice(words[:rng.randint(5, len(words))])
+                     for _ in range(rng.randint(0, 30))) for _ in range(count)]
+
+
+@pytest.mark.parametrize('params', [
+    {},
+    {'max_features': 100},
+    {'max_features': None, 'min_df': 1},
+    {'min_df': 0.01, 'max_df': 40},
+    {'binary': True, 'sublinear_tf': True},
+])
+def test_chunked_fit_is_identical(params):
+    docs = _corpus()
+    reference = make_vectorizer(params)
+    expected = reference.fit_transform(docs)
+
+    chunked = make_vectorizer(params)
+    actual = fit_transform_chunks(chunked, [docs[i:i + 450] for i in range(0, len(docs), 450)])
+
+    assert chunked.vocabulary_ == reference.vocabulary_
+    assert np.array_equal(chunked.idf_, reference.idf_)
+    assert actual.dtype == expected.dtype
+    assert np.array_equal(actual.indptr, expected.indptr)
+    assert np.array_equal(actual.indices, expected.indices)
+    assert np.array_equal(actual.data, expected.data)
+    assert np.array_equal(chunked.transform(docs[:20]).toarray(),
+                          reference.transform(docs[:20]).toarray())
+
+
+def test_empty_corpus_raises():
+    with pytest.raises(ValueError):
+        fit_transform_chunks(make_vectorizer(), [['the and'], []])
+
+
+def test_merged_chunks_number_terms_like_serial_counting():
+    docs = _corpus(600)
+    vectorizer = make_vectorizer()
+    serial = TermCounter(vectorizer.build_analyzer())
+    merged = TermCounter(vectorizer.build_analyzer())
+    for start in range(0, len(docs), 150):
+        serial.update(docs[start:start + 150])
+        merged.merge(*count_chunk(vectorizer, None, docs[start:start + 150]))
+
+    assert list(merged.vocabulary.items()) == list(serial.vocabulary.items())
+    assert (merged.count_matrix() != serial.count_matrix()).nnz == 0
+
+
+@pytest.mark.parametrize('params', [{}, {'max_features': 100}])
+def test_parallel_fit_is_identical(params):
+    docs = _corpus()
+    reference = make_vectorizer(params)
+    expected = reference.fit_transform(docs)
+
+    parallel = make_vectorizer(params)
+    actual = fit_transform_chunks(parallel, [docs[i:i + 300] for i in range(0, len(docs), 300)],
+                                  n_jobs=2)
+
+    assert parallel.vocabulary_ == reference.vocabulary_
+    assert np.array_equal(parallel.idf_, reference.idf_)
+    assert (actual != expected).nnz == 0
+
+
+def test_weighted_fields_equal_repeated_text_for_unigrams():
+    docs = _corpus(800)
+    first, second = docs[:400], docs[400:]
+    params = {'ngram_range': (1, 1), 'min_df': 1}
+    reference = make_vectorizer(params)
+    expected = reference.fit_transform([f"{a} {a} {a} {b}" for a, b in zip(first, second)])
+
+    weighted = make_vectorizer(params)
+    chunks = [(first[i:i + 100], second[i:i + 100]) for i in range(0, 400, 100)]
+    actual = fit_transform_chunks(weighted, chunks, weights=(3, 1))
+
+    assert weighted.vocabulary_ == reference.vocabulary_
+    assert np.allclose(weighted.idf_, reference.idf_)
+    assert np.allclose(actual.toarray(), expected.toarray())
+    # Query-time vectorization reproduces the stored rows
+    assert np.allclose(transform_fields(weighted, (first[:5], second[:5]), (3, 1)).toarray(),
+                       actual[:5].toarray())
+
+
+def test_weighted_fields_parallel_fit_is_identical():
+    docs = _corpus(1200)
+    chunks = [(docs[i:i + 200], docs[::-1][i:i + 200]) for i in range(0, 1200, 200)]
+    serial = make_vectorizer()
+    expected = fit_transform_chunks(serial, chunks, weights=(2, 0.5))
+    parallel = make_vectorizer()
+    actual = fit_transform_chunks(parallel, chunks, n_jobs=2, weights=(2, 0.5))
+
+    assert parallel.vocabulary_ == serial.vocabulary_
+    assert (actual != expected).nnz == 0
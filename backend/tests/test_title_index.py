@@ -0,0 +1,75 @@
+"""
+Tests for the title resolution index
+"""
+
+import numpy as np
+
+from ml_engine.title_index import TitleIndex, normalize_title
+
+
+TITLES = [
+    'Avatar',
+    'The Dark Knight',
+    'The Dark Knight Rises',
+    'Inception',
+    'Avatar: The Way of Water',
+    'Up',
+]
+
+
+def test_normalize_title():
+    assert normalize_title('  The   DARK knight ') == 'the dark knight'
+    assert normalize_title(None) == ''
+
+
+def test_exact_match_ignores_case_and_spacing():
+    index = TitleIndex(TITLES)
+    assert index.exact('the dark  knight') == 1
+    assert index.resolve('AVATAR ') == 0
+    assert index.exact('Tenet') is None
+
+
+def test_fuzzy_match_uses_trigram_shortlist():
+    index = TitleIndex(TITLES)
+    assert index.resolve('Incepton') == 3
+    assert index.resolve('dark knight rise') == 2
+
+
+def test_substring_and_prefix_fallback():
+    index = TitleIndex(TITLES)
+    # Below the fuzzy cutoff but contained in a title
+    assert index.resolve('way of water', cutoff=0.99) == 4
+    assert index.resolve('u', cutoff=0.99) == 5
+    assert index.resolve('zzzz') is None
+
+
+def test_recommendations_resolve_through_index(trained_system):
+    assert trained_system.title_index is not None
+    recommendations = trained_system.get_recommendations('avatar', 5)
+    assert len(recommendations) == 5
+    assert all(rec['title'] != 'Avatar' for rec in recommendations)
+
+
+def test_search_ranks_exact_match_first():
+    index = TitleIndex(TITLES)
+    rows = index.search('avatar', n=2)
+    assert rows[0] == 0
+    assert 4 in rows or len(rows) == 1
+
+
+def test_model_search_and_matched_row(trained_system):
+    assert trained_system.search_titles('The Notebok', limit=1) == ['The Notebook']
+    row = trained_system.resolve_title('the notebook')
+    by_row = trained_system.get_recommendations('ignored', 5, matched_row=row)
+    by_title = trained_system.get_recommendations('The Notebook', 5)
+    assert by_row == by_title
+
+
+def test_extended_index_matches_full_build():
+    titles = TITLES + ['Up', 'Inception 2', 'avatar', 'Dark']
+    extended = TitleIndex(TITLES[:4]).extended(titles[4:])
+    full = TitleIndex(titles)
+    for name, array in full.to_arrays().items():
+        assert np.array_equal(extended.to_arrays()[name], array), name
+    assert extended.rows('up') == [5, 6]
+    assert extended.resolve('Inceptoin 2') == 7
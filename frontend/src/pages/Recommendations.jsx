@@ -1,6 +1,7 @@
 import { useEffect, useState } from "react";
-import { getSimilarByTitle, getMovieByTitle, getMLStatus } from "../services/api";
+import { getSimilarBatch, getUserRecommendations, getMovieByTitle, getMLStatus } from "../services/api";
 import { useMovieContext } from "../contexts/MovieContext";
+import { useAuth } from "../context/AuthContext";
 import MovieCard from "../components/MovieCard";
 import { Sparkles, Search, Heart, Info } from "lucide-react";
 import "../css/Recommendations.css";
@@ -15,6 +16,7 @@ function Recommendations() {
         recommendationsCache,
         setRecommendationsCache
     } = useMovieContext();
+    const { user } = useAuth();
 
     // Fetch ML status periodically
     useEffect(() => {
@@ -77,18 +79,26 @@ function Recommendations() {
                 return;
             }
 
-            // Parallel fetch with timeout
-            const recommendationPromises = favoriteTitles.map(title =>
-                Promise.race([
-                    getSimilarByTitle(title, 6).catch(err => {
-                        // console.warn(`Recommendation error for ${title}:`, err);
-                        return { success: false, similar_movies: [] };
-                    }),
-                    new Promise(resolve => setTimeout(() => resolve({ success: false, similar_movies: [] }), 8000))
-                ])
-            );
+            // Logged in: one profile built server-side from all saved favourites
+            let recommendationResults = [];
+            if (user) {
+                const profile = await Promise.race([
+                    getUserRecommendations(30).catch(() => null),
+                    new Promise(resolve => setTimeout(() => resolve(null), 8000))
+                ]);
+                if (profile?.success) {
+                    recommendationResults = [{ success: true, similar_movies: profile.recommendations }];
+                }
+            }
 
-            const recommendationResults = await Promise.all(recommendationPromises);
+            // Otherwise one batch request for the local favourites, with timeout
+            if (recommendationResults.length === 0) {
+                const batch = await Promise.race([
+                    getSimilarBatch(favoriteTitles, 6).catch(() => ({ success: false, results: [] })),
+                    new Promise(resolve => setTimeout(() => resolve({ success: false, results: [] }), 8000))
+                ]);
+                recommendationResults = Array.isArray(batch?.results) ? batch.results : [];
+            }
 
             const allTitles = new Set();
             const allRecs = [];
@@ -34,9 +34,9 @@ export const getPopularMovies = async () => {
 };
 
 // ML endpoints - minimal integration
-export const getUserRecommendations = async (userId, limit = 10) => {
-    const url = `${BACKEND_URL}/api/ml/recommendations/user?user_id=${encodeURIComponent(userId)}&limit=${limit}`;
-    const res = await fetch(url);
+// Recommendations from the logged-in user's favourites (session cookie, same origin as /api/favorites)
+export const getUserRecommendations = async (limit = 10) => {
+    const res = await fetch(`/api/ml/recommendations/user?limit=${limit}`, { credentials: 'include' });
     if (!res.ok) throw new Error("Failed to fetch recommendations");
     return res.json();
 };
@@ -56,6 +56,25 @@ export const getSimilarByTitle = async (title, limit = 10) => {
     }
 };
 
+// Similar movies for several titles in one request (scored together on the backend)
+export const getSimilarBatch = async (titles, limit = 10) => {
+    const url = `${BACKEND_URL}/api/ml/recommendations/similar/batch`;
+    try {
+        const res = await fetch(url, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ titles, limit }),
+        });
+        const data = await res.json().catch(() => null);
+        if (!res.ok) {
+            return data || { success: false, error: `HTTP ${res.status}`, results: [] };
+        }
+        return data;
+    } catch (err) {
+        return { success: false, error: err?.message || 'Network error', results: [] };
+    }
+};
+
 export const getMovieByTitle = async (title) => {
     const res = await fetch(`${BASE_URL}/?apikey=${API_KEY}&t=${encodeURIComponent(title)}`);
     const data = await res.json();